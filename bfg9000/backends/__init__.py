@@ -1,25 +1,67 @@
 from collections import OrderedDict
-from pkg_resources import iter_entry_points, DistributionNotFound
 
+from ..iterutils import first
 from ..objutils import memoize
+from ..plugins import builtin_entry_points, get_entry_point, list_entry_points
+
+entry_point_group = 'bfg9000.backends'
+
+
+def _load(entry):
+    try:
+        return entry.load()
+    # An ImportError can be thrown by the MSBuild backend if its dependencies
+    # (i.e. lxml) aren't installed.
+    except ImportError:
+        return None
 
 
 @memoize
 def list_backends():
     backends = []
-    for i in iter_entry_points('bfg9000.backends'):
-        try:
-            backend = i.load()
+    for i in list_entry_points(entry_point_group):
+        backend = _load(i)
+        if backend:
             backends.append((i.name, backend))
-        # An ImportError can be thrown by the MSBuild backend when bfg9000 was
-        # installed as a Wheel with setuptools < 34.0.2. We'd require 34.0.2 or
-        # better, but setuptools < 11.0 won't let you upgrade setuptools during
-        # bfg's installation. Since Ubuntu 14.04 is supported until 2019 and
-        # has setuptools 2.2 by default, we're stuck with this for a while.
-        except (DistributionNotFound, ImportError):
-            pass
 
-    def sort_key(x):
-        return x[1].priority if x[1].version() else 0
-    backends.sort(key=sort_key, reverse=True)
+    # Don't check the backends' versions here; that requires running each of
+    # them, which is slow. See `default_backend()` instead.
+    backends.sort(key=lambda x: x[1].priority, reverse=True)
     return OrderedDict(backends)
+
+
+@memoize
+def get_backend(name):
+    # Unlike `list_backends()`, this doesn't need to look at any third-party
+    # backends if `name` is one of ours.
+    entry = get_entry_point(entry_point_group, name)
+    backend = _load(entry) if entry else None
+    if backend is None:
+        raise ValueError('unknown backend {!r}'.format(name))
+    return backend
+
+
+@memoize
+def backend_version(name):
+    return get_backend(name).version()
+
+
+@memoize
+def default_backend():
+    # Pick the highest-priority backend that's actually installed. Try our own
+    # backends first (they're already in order of priority), so that we only
+    # need to look for third-party backends if none of ours are usable.
+    for name in builtin_entry_points.get(entry_point_group, {}):
+        try:
+            if backend_version(name):
+                return name
+        except ValueError:
+            pass
+
+    # Since the backends are sorted by priority, we can stop as soon as we
+    # find one.
+    backends = list_backends()
+    for name in backends:
+        if backend_version(name):
+            return name
+    return first(backends)
@@ -2,7 +2,6 @@ import re
 from collections import namedtuple
 from enum import Enum
 from six import iteritems, string_types
-from six.moves import cStringIO as StringIO
 
 from ... import path
 from ... import safe_str
@@ -35,90 +34,149 @@ def _escape_backslashes(s):
     return s.replace('\\', '\\\\'), True
 
 
-class Writer(object):
-    # Don't escape ":" if we're using Windows paths.
-    __extra_escapes = '' if platform_name() == 'windows' else ':'
-    __target_ex = re.compile(r'(\\*)([#?*\[\]~\s%{}])'.format(__extra_escapes))
-    __dep_ex = re.compile(r'(\\*)([#?*\[\]~\s|%{}])'.format(__extra_escapes))
+def _escape_ex(ex):
+    def repl(match):
+        return match.group(1) * 2 + '\\' + match.group(2)
 
-    def __init__(self, stream):
-        self.stream = stream
+    return lambda string: ex.sub(repl, string)
+
+
+class _Escaper(object):
+    """Escape strings and paths for a particular syntax. Paths tend to be
+    written several times (e.g. as the target of one rule and a dependency of
+    another), so this keeps the escaped form of every path it's seen. Each
+    Writer has its own escapers, so this cache only lasts as long as the file
+    being written."""
 
-    @classmethod
-    def escape_str(cls, string, syntax):
-        def repl(match):
-            return match.group(1) * 2 + '\\' + match.group(2)
+    def __init__(self, syntax):
+        try:
+            self._escape = _escape_fns[syntax]
+        except KeyError:
+            raise ValueError("unknown syntax '{}'".format(syntax))
+        self.shelly = syntax in [Syntax.function, Syntax.shell]
+        self._paths = {}
 
+    def escape_str(self, string):
         if '\n' in string:
             raise ValueError('illegal newline')
         result = string.replace('$', '$$')
-
-        if syntax == Syntax.target:
-            return cls.__target_ex.sub(repl, result)
-        elif syntax == Syntax.dependency:
-            return cls.__dep_ex.sub(repl, result)
-        elif syntax == Syntax.function:
-            return result.replace(',', '$,')
-        elif syntax in [Syntax.shell, Syntax.clean]:
+        return self._escape(result) if self._escape else result
+
+    def stringify(self, thing, shell_quote):
+        # Return the escaped form of `thing` and whether it was shell-escaped.
+        if isinstance(thing, path.Path):
+            try:
+                return self._paths[thing]
+            except KeyError:
+                pass
+
+            string, escaped = self.stringify(_realize(thing, self.shelly),
+                                             pshell.escape)
+            if self.shelly and escaped:
+                string = pshell.quote_escaped(string)
+            result = self._paths[thing] = (string, escaped)
             return result
-        else:
-            raise ValueError("unknown syntax '{}'".format(syntax))
-
-    def write_literal(self, string):
-        self.stream.write(string)
-
-    def write(self, thing, syntax, shell_quote=pshell.quote_info):
-        thing = safe_str.safe_str(thing)
-        shelly = syntax in [Syntax.function, Syntax.shell]
-        escaped = False
-
-        if isinstance(thing, safe_str.literal):
-            escaped = True
-            self.write_literal(thing.string)
-        elif isinstance(thing, safe_str.shell_literal):
-            escaped = True
-            self.write_literal(self.escape_str(thing.string, syntax))
         elif isinstance(thing, string_types):
-            if shelly and shell_quote:
+            escaped = False
+            if self.shelly and shell_quote:
                 thing, escaped = shell_quote(thing)
-            self.write_literal(self.escape_str(thing, syntax))
+            return self.escape_str(thing), escaped
+        elif isinstance(thing, safe_str.literal):
+            return thing.string, True
+        elif isinstance(thing, safe_str.shell_literal):
+            return self.escape_str(thing.string), True
         elif isinstance(thing, safe_str.jbos):
+            strings = []
+            escaped = False
             for i in thing.bits:
-                escaped |= self.write(i, syntax, shell_quote)
-        elif isinstance(thing, path.Path):
-            out = Writer(StringIO())
-            thing = thing.realize(path_vars, shelly)
-            escaped = out.write(thing, syntax, pshell.escape)
-
-            thing = out.stream.getvalue()
-            if shelly and escaped:
-                thing = pshell.quote_escaped(thing)
-            self.write_literal(thing)
-        else:
+                string, esc = self.stringify(i, shell_quote)
+                strings.append(string)
+                escaped |= esc
+            return ''.join(strings), escaped
+
+        safe = safe_str.safe_str(thing)
+        if safe is thing:
             raise TypeError(type(thing))
+        return self.stringify(safe, shell_quote)
+
+    def stringify_each(self, things, delim, prefix, suffix, shell_quote):
+        strings = [self.stringify(i, shell_quote)[0] for i in things]
+        if not strings:
+            return ''
+
+        result = self.stringify(delim, shell_quote)[0].join(strings)
+        if prefix is not None:
+            result = self.stringify(prefix, shell_quote)[0] + result
+        if suffix is not None:
+            result += self.stringify(suffix, shell_quote)[0]
+        return result
+
+
+class _Buffer(list):
+    """A stream that just collects everything written to it; joining the result
+    at the end is much faster than lots of small writes to a real stream."""
 
+    write = list.append
+
+    def getvalue(self):
+        return ''.join(self)
+
+
+class Writer(object):
+    def __init__(self, stream):
+        self.stream = stream
+        self._write = stream.write
+        self._escapers = {}
+
+    @staticmethod
+    def escape_str(string, syntax):
+        return _Escaper(syntax).escape_str(string)
+
+    def _escaper(self, syntax):
+        try:
+            return self._escapers[syntax]
+        except KeyError:
+            result = self._escapers[syntax] = _Escaper(syntax)
+            return result
+
+    def write_literal(self, string):
+        self._write(string)
+
+    def write(self, thing, syntax, shell_quote=pshell.quote_info):
+        string, escaped = self._escaper(syntax).stringify(thing, shell_quote)
+        self._write(string)
         return escaped
 
     def write_each(self, things, syntax, delim=safe_str.literal(' '),
                    prefix=None, suffix=None, shell_quote=pshell.quote_info):
-        for i in iterutils.tween(things, delim, prefix, suffix):
-            self.write(i, syntax, shell_quote)
+        self._write(self._escaper(syntax).stringify_each(
+            things, delim, prefix, suffix, shell_quote
+        ))
 
-    def write_shell(self, thing, syntax=Syntax.shell):
+    def shell_str(self, thing, syntax=Syntax.shell):
+        """Return `thing` as it would be written by `write_shell()`."""
+
+        prefix = ''
         if isinstance(thing, Silent):
-            self.write_literal('@')
+            prefix = '@'
             thing = thing.data
 
+        escaper = self._escaper(syntax)
         if iterutils.isiterable(thing):
-            self.write_each(thing, syntax)
-        else:
-            # Since Make uses an sh-style shell even on Windows, we want to
-            # escape backslashes when writing an already "escaped" command
-            # line. Otherwise, Windows users would be pretty surprised to find
-            # that all the paths they specified like C:\foo\bar are broken!
-            shell_quote = (_escape_backslashes if platform_name() == 'windows'
-                           else None)
-            self.write(thing, syntax, shell_quote=shell_quote)
+            return prefix + escaper.stringify_each(
+                thing, safe_str.literal(' '), None, None, pshell.quote_info
+            )
+
+        # Since Make uses an sh-style shell even on Windows, we want to escape
+        # backslashes when writing an already "escaped" command line.
+        # Otherwise, Windows users would be pretty surprised to find that all
+        # the paths they specified like C:\foo\bar are broken!
+        shell_quote = (_escape_backslashes if platform_name() == 'windows'
+                       else None)
+        return prefix + escaper.stringify(thing, shell_quote)[0]
+
+    def write_shell(self, thing, syntax=Syntax.shell):
+        self._write(self.shell_str(thing, syntax))
 
 
 class Entity(object):
@@ -196,14 +254,16 @@ class Function(NamedEntity):
         self.quoted = kwargs.get('quoted', False)
 
     def use(self):
-        lit = safe_str.literal
-        kwargs = {'shell_quote': None} if self.quoted else {}
-
-        out = Writer(StringIO())
-        prefix = '$(' + self.name + ' '
-        for i in iterutils.tween(self.args, lit(','), lit(prefix), lit(')')):
-            out.write_each(iterutils.iterate(i), Syntax.function, **kwargs)
-        result = out.stream.getvalue()
+        result = ''
+        # With no arguments, this expands to nothing at all.
+        if self.args:
+            shell_quote = None if self.quoted else pshell.quote_info
+            escaper = _Escaper(Syntax.function)
+            args = ','.join(escaper.stringify_each(
+                iterutils.iterate(i), safe_str.literal(' '), None, None,
+                shell_quote
+            ) for i in self.args)
+            result = '$(' + self.name + ' ' + args + ')'
 
         if self.quoted:
             result = pshell.quote_escaped(result)
@@ -229,6 +289,21 @@ path_vars.update({i: Variable(i.name) for i in path.InstallRoot})
 # Only use destdir on platforms that actually support it (e.g. not Windows).
 if platform_info().destdir:
     path_vars[path.DestDir.destdir] = Variable('DESTDIR')
+_realize = path.realizer(path_vars)
+
+# Don't escape ":" if we're using Windows paths.
+_extra_escapes = '' if platform_name() == 'windows' else ':'
+_escape_fns = {
+    Syntax.target: _escape_ex(
+        re.compile(r'(\\*)([#?*\[\]~\s%{}])'.format(_extra_escapes))
+    ),
+    Syntax.dependency: _escape_ex(
+        re.compile(r'(\\*)([#?*\[\]~\s|%{}])'.format(_extra_escapes))
+    ),
+    Syntax.function: lambda string: string.replace(',', '$,'),
+    Syntax.shell: None,
+    Syntax.clean: None,
+}
 
 
 class Makefile(object):
@@ -336,9 +411,16 @@ class Makefile(object):
 
     def _write_rule(self, out, rule):
         if rule.variables:
+            # Target-specific variables have to be set for each target
+            # separately, but we only need to stringify their values once.
+            variables = [': ' + name.name + ' := ' + out.shell_str(value) +
+                         '\n' for name, value in iteritems(rule.variables)]
             for target in rule.targets:
-                for name, value in iteritems(rule.variables):
-                    self._write_variable(out, name, value, target=target)
+                target = out._escaper(Syntax.target).stringify(
+                    target, pshell.quote_info
+                )[0]
+                for i in variables:
+                    out.write_literal(target + i)
 
         if rule.phony:
             out.write_literal('.PHONY: ')
@@ -362,7 +444,11 @@ class Makefile(object):
         out.write_literal('\n\n')
 
     def write(self, out):
-        out = Writer(out)
+        buf = _Buffer()
+        self._write_contents(Writer(buf))
+        out.write(buf.getvalue())
+
+    def _write_contents(self, out):
         out.write_literal(_comment_tmpl.format(self._bfgfile) + '\n\n')
 
         # Don't let make use built-in suffix rules.
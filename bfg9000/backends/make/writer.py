@@ -60,7 +60,7 @@ def write(env, build_inputs):
     for i in _post_rules:
         i(build_inputs, buildfile, env)
 
-    with open(filepath.string(env.base_dirs), 'w') as out:
+    with path.write_if_changed(filepath.string(env.base_dirs)) as out:
         buildfile.write(out)
 
 
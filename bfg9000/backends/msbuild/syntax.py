@@ -177,6 +177,7 @@ _path_vars = {
         path.Root.builddir: '$(OutDir)',
     },
 }
+_realizers = {k: path.realizer(v) for k, v in iteritems(_path_vars)}
 
 
 def textify(thing, quoted=False, out=True):
@@ -188,7 +189,7 @@ def textify(thing, quoted=False, out=True):
     elif isinstance(thing, safe_str.jbos):
         return ''.join(textify(i, quoted, out) for i in thing.bits)
     elif isinstance(thing, path.Path):
-        return ntpath.normpath(thing.realize(_path_vars[out]))
+        return ntpath.normpath(_realizers[out](thing))
     else:
         raise TypeError(type(thing))
 
@@ -4,7 +4,6 @@ import subprocess
 
 from ... import path
 from ... import shell
-from .syntax import *
 from ...versioning import Version
 
 
@@ -35,6 +34,9 @@ def rule_handler(*args):
 
 
 def write(env, build_inputs):
+    # Only load the MSBuild syntax (and thus lxml) once we actually need it.
+    from .syntax import Solution, UuidMap
+
     uuids = UuidMap(env.builddir.append('.bfg_uuid').string())
     solution = Solution(uuids)
 
@@ -45,10 +47,10 @@ def write(env, build_inputs):
     # also means we'd need to support aliases so that we can have multiple
     # builds be the default.
     sln_file = path.Path(build_inputs['project'].name + '.sln')
-    with open(sln_file.string(env.base_dirs), 'w') as out:
+    with path.write_if_changed(sln_file.string(env.base_dirs)) as out:
         solution.write(out)
     for p in solution:
         path.makedirs(p.path.parent().string(env.base_dirs), exist_ok=True)
-        with open(p.path.string(env.base_dirs), 'w') as out:
+        with path.write_if_changed(p.path.string(env.base_dirs)) as out:
             p.write(out)
     uuids.save()
@@ -3,7 +3,6 @@ from collections import namedtuple, OrderedDict
 from enum import Enum
 from itertools import chain
 from six import iteritems, string_types
-from six.moves import cStringIO as StringIO
 
 from ... import path
 from ... import safe_str
@@ -18,9 +17,9 @@ __all__ = ['NinjaFile', 'Section', 'Syntax', 'Writer', 'Variable', 'var',
            'Commands', 'path_vars']
 
 Rule = namedtuple('Rule', ['command', 'depfile', 'deps', 'generator', 'pool',
-                           'restat'])
+                           'restat', 'rspfile', 'rspfile_content'])
 Build = namedtuple('Build', ['outputs', 'rule', 'inputs', 'implicit',
-                             'order_only', 'variables'])
+                             'order_only', 'variables', 'pool'])
 
 Syntax = Enum('Syntax', ['output', 'input', 'shell', 'clean'])
 Section = Enum('Section', ['path', 'command', 'flags', 'other'])
@@ -32,63 +31,133 @@ _comment_tmpl = """
 """.strip()
 
 
+# The characters to escape for each syntax. `$` must come first so we don't
+# escape the escape characters!
+_escape_chars = {
+    Syntax.output: ['$', ':', ' '],
+    Syntax.input: ['$', ' '],
+    Syntax.shell: ['$'],
+    Syntax.clean: ['$'],
+}
+
+
+def _escape_chars_for(syntax):
+    try:
+        return _escape_chars[syntax]
+    except KeyError:
+        raise ValueError("unknown syntax '{}'".format(syntax))
+
+
+def _escape_str(string, chars):
+    if '\n' in string:
+        raise ValueError('illegal newline')
+    for i in chars:
+        if i in string:
+            string = string.replace(i, '$' + i)
+    return string
+
+
+class _Escaper(object):
+    """Escape strings and paths for a particular syntax. Paths tend to be
+    written several times (e.g. as the output of one build edge and the input
+    of another), so this keeps the escaped form of every path it's seen. Each
+    Writer has its own escapers, so this cache only lasts as long as the file
+    being written."""
+
+    def __init__(self, syntax):
+        self.shelly = syntax == Syntax.shell
+        self._chars = _escape_chars_for(syntax)
+        self._paths = {}
+
+    def escape_str(self, string):
+        return _escape_str(string, self._chars)
+
+    def stringify(self, thing, shell_quote):
+        # Return the escaped form of `thing` and whether it was shell-escaped.
+        if isinstance(thing, path.Path):
+            try:
+                return self._paths[thing]
+            except KeyError:
+                pass
+
+            string, escaped = self.stringify(_realize(thing, self.shelly),
+                                             shell.escape)
+            if self.shelly and escaped:
+                string = shell.quote_escaped(string)
+            result = self._paths[thing] = (string, escaped)
+            return result
+        elif isinstance(thing, string_types):
+            escaped = False
+            if self.shelly and shell_quote:
+                thing, escaped = shell_quote(thing)
+            return self.escape_str(thing), escaped
+        elif isinstance(thing, safe_str.literal):
+            return thing.string, True
+        elif isinstance(thing, safe_str.shell_literal):
+            return self.escape_str(thing.string), True
+        elif isinstance(thing, safe_str.jbos):
+            strings = []
+            escaped = False
+            for i in thing.bits:
+                string, esc = self.stringify(i, shell_quote)
+                strings.append(string)
+                escaped |= esc
+            return ''.join(strings), escaped
+
+        safe = safe_str.safe_str(thing)
+        if safe is thing:
+            raise TypeError(type(thing))
+        return self.stringify(safe, shell_quote)
+
+
+class _Buffer(list):
+    """A stream that just collects everything written to it; joining the result
+    at the end is much faster than lots of small writes to a real stream."""
+
+    write = list.append
+
+    def getvalue(self):
+        return ''.join(self)
+
+
 class Writer(object):
     def __init__(self, stream):
         self.stream = stream
+        self._write = stream.write
+        self._escapers = {}
 
     @staticmethod
     def escape_str(string, syntax):
-        if '\n' in string:
-            raise ValueError('illegal newline')
-
-        if syntax == Syntax.output:
-            return re.sub(r'([:$ ])', r'$\1', string)
-        elif syntax == Syntax.input:
-            return re.sub(r'([$ ])', r'$\1', string)
-        elif syntax in [Syntax.shell, Syntax.clean]:
-            return string.replace('$', '$$')
-        else:
-            raise ValueError("unknown syntax '{}'".format(syntax))
+        return _escape_str(string, _escape_chars_for(syntax))
+
+    def _escaper(self, syntax):
+        try:
+            return self._escapers[syntax]
+        except KeyError:
+            result = self._escapers[syntax] = _Escaper(syntax)
+            return result
 
     def write_literal(self, string):
-        self.stream.write(string)
+        self._write(string)
 
     def write(self, thing, syntax, shell_quote=shell.quote_info):
-        thing = safe_str.safe_str(thing)
-        shelly = syntax == Syntax.shell
-        escaped = False
-
-        if isinstance(thing, safe_str.literal):
-            escaped = True
-            self.write_literal(thing.string)
-        elif isinstance(thing, safe_str.shell_literal):
-            escaped = True
-            self.write_literal(self.escape_str(thing.string, syntax))
-        elif isinstance(thing, string_types):
-            if shelly and shell_quote:
-                thing, escaped = shell_quote(thing)
-            self.write_literal(self.escape_str(thing, syntax))
-        elif isinstance(thing, safe_str.jbos):
-            for i in thing.bits:
-                escaped |= self.write(i, syntax, shell_quote)
-        elif isinstance(thing, path.Path):
-            out = Writer(StringIO())
-            thing = thing.realize(path_vars, shelly)
-            escaped = out.write(thing, syntax, shell.escape)
-
-            thing = out.stream.getvalue()
-            if shelly and escaped:
-                thing = shell.quote_escaped(thing)
-            self.write_literal(thing)
-        else:
-            raise TypeError(type(thing))
-
+        string, escaped = self._escaper(syntax).stringify(thing, shell_quote)
+        self._write(string)
         return escaped
 
     def write_each(self, things, syntax, delim=safe_str.literal(' '),
                    prefix=None, suffix=None):
-        for i in iterutils.tween(things, delim, prefix, suffix):
-            self.write(i, syntax)
+        stringify = self._escaper(syntax).stringify
+        quote = shell.quote_info
+        strings = [stringify(i, quote)[0] for i in things]
+        if not strings:
+            return
+
+        if prefix is not None:
+            self._write(stringify(prefix, quote)[0])
+        self._write(stringify(delim, quote)[0].join(strings))
+        if suffix is not None:
+            self._write(stringify(suffix, quote)[0])
 
     def write_shell(self, thing, syntax=Syntax.shell):
         if iterutils.isiterable(thing):
@@ -138,7 +207,7 @@ class Commands(object):
         self.environ = environ or {}
 
     def use(self):
-        out = Writer(StringIO())
+        out = Writer(_Buffer())
         if self.needs_shell and platform_name() == 'windows':
             out.write_literal('cmd /s /c "')
 
@@ -182,6 +251,7 @@ path_vars.update({i: Variable(i.name) for i in path.InstallRoot})
 # Only use destdir on platforms that actually support it (e.g. not Windows).
 if platform_info().destdir:
     path_vars[path.DestDir.destdir] = Variable('DESTDIR')
+_realize = path.realizer(path_vars)
 
 
 class NinjaFile(object):
@@ -194,6 +264,7 @@ class NinjaFile(object):
         self._var_table = set()
         self._variables = {i: [] for i in Section}
 
+        self._pools = OrderedDict()
         self._rules = OrderedDict()
 
         self._builds = []
@@ -222,18 +293,37 @@ class NinjaFile(object):
     def has_variable(self, name):
         return var(name) in self._var_table
 
+    def pool(self, name, depth):
+        # The name and depth are checked by `Pool` when it's created.
+        if self.has_pool(name):
+            if self._pools[name] != depth:
+                raise ValueError("pool '{}' already exists".format(name))
+        else:
+            self.min_version('1.1')
+            self._pools[name] = depth
+
+    def has_pool(self, name):
+        return name in self._pools
+
+    def _check_pool(self, pool):
+        if pool == 'console':
+            self.min_version('1.5')
+        elif not self.has_pool(pool):
+            raise ValueError("unknown pool '{}'".format(pool))
+
     def rule(self, name, command, depfile=None, deps=None, generator=False,
-             pool=None, restat=False):
+             pool=None, restat=False, rspfile=None, rspfile_content=None):
         command = objectify(command, Commands, in_type=object)
         command.convert_args(self.cmd_var)
         if not command.needs_shell:
             command = command.commands[0]
 
         if pool is not None:
-            if pool == 'console':
-                self.min_version('1.5')
-            else:
-                raise ValueError("unknown pool '{}'".format(pool))
+            self._check_pool(pool)
+
+        if (rspfile is None) != (rspfile_content is None):
+            raise ValueError('rspfile and rspfile_content must be specified ' +
+                             'together')
 
         if re.search('\W', name):
             raise ValueError('rule name contains invalid characters')
@@ -242,15 +332,17 @@ class NinjaFile(object):
             raise ValueError("rule '{}' already exists".format(name))
 
         self._rules[name] = Rule(command, depfile, deps, generator, pool,
-                                 restat)
+                                 restat, rspfile, rspfile_content)
 
     def has_rule(self, name):
         return name in self._rules
 
     def build(self, output, rule, inputs=None, implicit=None, order_only=None,
-              variables=None):
+              variables=None, pool=None):
         if rule != 'phony' and not self.has_rule(rule):
             raise ValueError("unknown rule '{}'".format(rule))
+        if pool is not None:
+            self._check_pool(pool)
 
         variables = {var(k): v for k, v in iteritems(variables or {})}
 
@@ -262,7 +354,7 @@ class NinjaFile(object):
         self._builds.append(Build(
             outputs, rule, iterutils.listify(inputs),
             iterutils.listify(implicit), iterutils.listify(order_only),
-            variables
+            variables, pool
         ))
 
     def has_build(self, name):
@@ -290,6 +382,10 @@ class NinjaFile(object):
             self._write_variable(out, var('pool'), rule.pool, indent=1)
         if rule.restat:
             self._write_variable(out, var('restat'), '1', indent=1)
+        if rule.rspfile:
+            self._write_variable(out, var('rspfile'), rule.rspfile, indent=1)
+            self._write_variable(out, var('rspfile_content'),
+                                 rule.rspfile_content, indent=1)
 
     def _write_build(self, out, build):
         out.write_literal('build ')
@@ -302,12 +398,18 @@ class NinjaFile(object):
         out.write_each(build.order_only, Syntax.input, prefix=lit(' || '))
         out.write_literal('\n')
 
+        if build.pool:
+            self._write_variable(out, var('pool'), build.pool, indent=1)
         if build.variables:
             for k, v in iteritems(build.variables):
                 self._write_variable(out, k, v, indent=1)
 
     def write(self, out):
-        out = Writer(out)
+        buf = _Buffer()
+        self._write_contents(Writer(buf))
+        out.write(buf.getvalue())
+
+    def _write_contents(self, out):
         out.write_literal(_comment_tmpl.format(self._bfgfile) + '\n\n')
 
         if self._min_version:
@@ -325,6 +427,11 @@ class NinjaFile(object):
             if self._variables[section]:
                 out.write_literal('\n')
 
+        for name, depth in iteritems(self._pools):
+            out.write_literal('pool ' + name + '\n')
+            self._write_variable(out, var('depth'), str(depth), indent=1)
+            out.write_literal('\n')
+
         for name, rule in iteritems(self._rules):
             self._write_rule(out, name, rule)
             out.write_literal('\n')
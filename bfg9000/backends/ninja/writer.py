@@ -56,7 +56,7 @@ def write(env, build_inputs):
     for i in _post_rules:
         i(build_inputs, buildfile, env)
 
-    with open(filepath.string(env.base_dirs), 'w') as out:
+    with path.write_if_changed(filepath.string(env.base_dirs)) as out:
         buildfile.write(out)
 
 
@@ -67,7 +67,8 @@ def flags_vars(name, value, buildfile):
 
 
 def command_build(buildfile, env, output, inputs=None, implicit=None,
-                  order_only=None, commands=None, environ=None, console=True):
+                  order_only=None, commands=None, environ=None, console=True,
+                  pool=None):
     if console:
         rule_name = 'console_command'
         extra_implicit = ['PHONY']
@@ -97,5 +98,6 @@ def command_build(buildfile, env, output, inputs=None, implicit=None,
         inputs=inputs,
         implicit=iterutils.listify(implicit) + extra_implicit,
         order_only=order_only,
-        variables={'cmd': cmds}
+        variables={'cmd': cmds},
+        pool=pool
     )
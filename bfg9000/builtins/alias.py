@@ -1,5 +1,6 @@
 from . import builtin
 from ..backends.make import writer as make
+from ..backends.msbuild import writer as msbuild
 from ..backends.ninja import writer as ninja
 from ..build_inputs import Edge
 from ..file_types import Phony
@@ -33,16 +34,13 @@ def ninja_alias(rule, build_inputs, buildfile, env):
     )
 
 
-try:
-    from ..backends.msbuild import writer as msbuild
+@msbuild.rule_handler(Alias)
+def msbuild_alias(rule, build_inputs, solution, env):
+    from ..backends.msbuild.syntax import NoopProject
 
-    @msbuild.rule_handler(Alias)
-    def msbuild_alias(rule, build_inputs, solution, env):
-        output = rule.output[0]
-        project = msbuild.NoopProject(
-            env, name=output.path,
-            dependencies=solution.dependencies(rule.extra_deps),
-        )
-        solution[output] = project
-except:
-    pass
+    output = rule.output[0]
+    project = NoopProject(
+        env, name=output.path,
+        dependencies=solution.dependencies(rule.extra_deps),
+    )
+    solution[output] = project
@@ -0,0 +1,7 @@
+from . import builtin, optbuiltin
+
+
+@builtin.getter('env')
+@optbuiltin.getter('env')
+def build_type(env):
+    return env.build_type
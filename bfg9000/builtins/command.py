@@ -3,8 +3,10 @@ from six.moves import cStringIO as StringIO
 
 from . import builtin
 from .file_types import source_file
+from .pool import check_pool
 from .. import safe_str
 from ..backends.make import writer as make
+from ..backends.msbuild import writer as msbuild
 from ..backends.ninja import writer as ninja
 from ..build_inputs import Edge
 from ..file_types import File, Node, Phony
@@ -16,7 +18,7 @@ from ..tools import common as tools
 
 class BaseCommand(Edge):
     def __init__(self, build, env, name, outputs, cmd=None, cmds=None,
-                 environment=None, extra_deps=None):
+                 environment=None, pool=None, extra_deps=None):
         if (cmd is None) == (cmds is None):
             raise ValueError('exactly one of "cmd" or "cmds" must be ' +
                              'specified')
@@ -31,6 +33,7 @@ class BaseCommand(Edge):
         self.cmds = cmds
         self.inputs = inputs
         self.env = environment or {}
+        self.pool = check_pool(pool)
         Edge.__init__(self, build, outputs, extra_deps=extra_deps)
 
 
@@ -91,7 +94,16 @@ def make_command(rule, build_inputs, buildfile, env):
             return tools.Command.convert_args(args, buildfile.cmd_var)
         return args
 
-    cmds = (convert(i) for i in rule.cmds)
+    cmds = rule.cmds
+    if rule.pool:
+        # Make doesn't have job pools, so run each command via the jobpool
+        # tool instead. Commands given as strings are meant for the shell, so
+        # have the jobpool pass them along to it as-is.
+        jobpool = env.tool('jobpool')
+        cmds = [jobpool(rule.pool, i, shell=not isiterable(i)) for i in cmds]
+
+    cmds = (convert(i) for i in cmds)
+
     for line in pshell.join_commands(chain(env_vars, cmds)):
         out.write_shell(line)
 
@@ -111,21 +123,19 @@ def ninja_command(rule, build_inputs, buildfile, env):
         inputs=rule.inputs + rule.extra_deps,
         commands=rule.cmds,
         environ=rule.env,
-        console=isinstance(rule, Command)
+        console=isinstance(rule, Command),
+        pool=rule.pool.name if rule.pool else None
     )
 
 
-try:
-    from ..backends.msbuild import writer as msbuild
-
-    @msbuild.rule_handler(Command, BuildStep)
-    def msbuild_command(rule, build_inputs, solution, env):
-        # XXX: Support environment variables
-        project = msbuild.ExecProject(
-            env, name=rule.name,
-            commands=rule.cmds,
-            dependencies=solution.dependencies(rule.extra_deps),
-        )
-        solution[rule.output[0]] = project
-except:
-    pass
+@msbuild.rule_handler(Command, BuildStep)
+def msbuild_command(rule, build_inputs, solution, env):
+    from ..backends.msbuild.syntax import ExecProject
+
+    # XXX: Support environment variables
+    project = ExecProject(
+        env, name=rule.name,
+        commands=rule.cmds,
+        dependencies=solution.dependencies(rule.extra_deps),
+    )
+    solution[rule.output[0]] = project
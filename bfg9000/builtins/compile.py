@@ -1,24 +1,95 @@
+import os.path
 import warnings
 from collections import defaultdict
 from six import string_types
 
 from . import builtin
 from .file_types import local_file
+from .. import path
 from ..backends.make import writer as make
+from ..backends.msbuild import writer as msbuild
 from ..backends.ninja import writer as ninja
 from ..build_inputs import build_input, Edge
+from ..environment import lto_modes
 from ..file_types import *
 from ..iterutils import first, iterate, listify, uniques
 from ..path import Path, Root
 from ..shell import posix as pshell
 
 build_input('compile_options')(lambda build_inputs, env: defaultdict(list))
+build_input('unity')(lambda build_inputs, env: [])
+
+# Languages whose source files can be #included into a unity source file.
+_unity_langs = ('c', 'c++', 'objc', 'objc++')
+
+
+def _unity_sources(builtins, files, batch_size, lang=None):
+    """Group the source files in `files` into unity source files, each of
+    which includes up to `batch_size` sources of the same language. Anything
+    that can't be grouped (e.g. object files or generated sources) is passed
+    through as-is."""
+
+    result = []
+    batches = {}
+    for i in iterate(files):
+        if isinstance(i, string_types + (SourceFile,)):
+            i = builtins['source_file'](i, lang=lang)
+            # Generated sources need to be built before they're compiled, so
+            # leave them out of the batches; otherwise, the unity file would
+            # need to depend on them.
+            if i.lang in _unity_langs and not i.creator:
+                batch = batches.get(i.lang)
+                if batch is None or len(batch) == batch_size:
+                    batch = batches[i.lang] = []
+                    result.append(batch)
+                batch.append(i)
+                continue
+        result.append(i)
+
+    def unity_file(batch):
+        if not isinstance(batch, list):
+            return batch
+        if len(batch) == 1:
+            return batch[0]
+
+        # Name the unity file after the first source in the batch; since each
+        # source can only be compiled once, this is unique.
+        head = batch[0].path
+        unity = SourceFile(Path(head.stripext('.unity' + head.ext()).suffix),
+                           batch[0].lang)
+        unity.unity_sources = batch
+        return unity
+
+    return [unity_file(i) for i in result]
+
+
+def check_lto(lto):
+    if lto is not None and lto not in lto_modes:
+        raise ValueError('invalid LTO mode {!r}'.format(lto))
+    return lto
+
+
+def lto_options(tool, lto, env):
+    # The LTO flags for the environment are already in the global flags, so
+    # we only need to add flags when a step overrides them.
+    if lto is None or lto == env.lto or not hasattr(tool, 'lto_flags'):
+        return []
+    return tool.lto_flags(lto)
 
 
 class ObjectFiles(list):
-    def __init__(self, builtins, build, env, files, **kwargs):
+    def __init__(self, builtins, build, env, files, unity=None, **kwargs):
+        if unity is None:
+            unity = env.unity_batch_size
+        if unity and unity > 1:
+            files = _unity_sources(builtins, files, unity, kwargs.get('lang'))
+
         list.__init__(self, (builtins['_make_object_file'](i, **kwargs)
                              for i in iterate(files)))
+        build['unity'].extend(
+            i.creator for i in self if i.creator and
+            getattr(i.creator.file, 'unity_sources', None)
+        )
 
     def __getitem__(self, key):
         if isinstance(key, string_types):
@@ -28,7 +99,12 @@ class ObjectFiles(list):
 
         if isinstance(key, Path):
             for i in self:
-                if i.creator and i.creator.file.path == key:
+                if not i.creator:
+                    continue
+                source = i.creator.file
+                if ( source.path == key or
+                     any(j.path == key for j in
+                         getattr(source, 'unity_sources', [])) ):
                     return i
             raise ValueError("{!r} not found".format(key))
         else:
@@ -38,7 +114,7 @@ class ObjectFiles(list):
 class Compile(Edge):
     def __init__(self, builtins, build, env, name, includes=None, include=None,
                  pch=None, libs=None, packages=None, options=None, lang=None,
-                 extra_deps=None):
+                 lto=None, extra_deps=None):
         # XXX: Remove this after 0.3 is released.
         if include is not None:
             warnings.warn("'include' keyword argument is deprecated; use " +
@@ -57,12 +133,13 @@ class Compile(Edge):
 
         self.packages = [builtins['package'](i) for i in iterate(packages)]
         self.user_options = pshell.listify(options)
+        self.lto = check_lto(lto)
 
         if pch and not self.compiler.accepts_pch:
             raise TypeError('pch not supported for this compiler')
         self.pch = builtins['precompiled_header'](
             pch, file=pch, includes=includes, packages=self.packages,
-            options=self.user_options, lang=lang
+            options=self.user_options, lang=lang, lto=lto
         ) if pch else None
 
         if hasattr(self.compiler, 'pre_build'):
@@ -76,7 +153,8 @@ class Compile(Edge):
 
         self._internal_options = (
             self.compiler.flags(self, output) +
-            sum((i.cflags(self.compiler, output) for i in self.packages), [])
+            sum((i.cflags(self.compiler, output) for i in self.packages), []) +
+            lto_options(self.compiler, lto, env)
         )
 
         Edge.__init__(self, build, output, public_output, extra_deps)
@@ -163,6 +241,26 @@ def global_options(build, options, lang):
         build['compile_options'][i].extend(pshell.listify(options))
 
 
+@builtin.post('build_inputs', 'env')
+def write_unity_files(build, env):
+    # Write these out now (instead of during the build) so that they're only
+    # touched when the set of sources in a batch changes.
+    for rule in build['unity']:
+        lines = []
+        # MSVC requires the precompiled header to be the first thing included
+        # by the source file being compiled.
+        header_name = getattr(rule.pch, 'header_name', None)
+        if header_name:
+            lines.append('#include "{}"'.format(header_name))
+        lines.extend('#include "{}"'.format(i.path.string(env.base_dirs))
+                     for i in rule.file.unity_sources)
+
+        filename = rule.file.path.string(env.base_dirs)
+        path.makedirs(os.path.dirname(filename), exist_ok=True)
+        with path.write_if_changed(filename) as out:
+            out.write('\n'.join(lines) + '\n')
+
+
 def _get_flags(backend, rule, build_inputs, buildfile):
     variables = {}
     cmd_kwargs = {}
@@ -178,9 +276,23 @@ def _get_flags(backend, rule, build_inputs, buildfile):
         if rule.options:
             variables[cflags] = [global_cflags] + rule.options
 
+    # Only wrap the compiler itself with the launcher (e.g. ccache), not the
+    # PCH compiler.
+    launcher = getattr(rule.compiler, 'launcher', None)
+    if launcher:
+        cmd_kwargs['cmd'] = [launcher, rule.compiler]
+
     return variables, cmd_kwargs
 
 
+def _pgo_deps(rule, build_inputs):
+    # Recompile everything when the profile data changes.
+    profile = build_inputs['pgo'].profile
+    if profile and rule.compiler.flavor == 'cc':
+        return [profile]
+    return []
+
+
 @make.rule_handler(CompileSource, CompileHeader)
 def make_compile(rule, build_inputs, buildfile, env):
     compiler = rule.compiler
@@ -202,9 +314,14 @@ def make_compile(rule, build_inputs, buildfile, env):
 
         # Only GCC-style depfiles are supported by Make.
         if compiler.deps_flavor == 'gcc':
-            depfixer = env.tool('depfixer')
             cmd_kwargs['deps'] = deps = first(output_vars) + '.d'
-            recipe_extra = [make.Silent(depfixer(deps))]
+            # Make needs every dependency to be a target too. If the compiler
+            # can do this itself, let it; otherwise, run the depfixer.
+            if compiler.phony_deps:
+                cmd_kwargs['phony_deps'] = True
+            else:
+                depfixer = env.tool('depfixer')
+                recipe_extra = [make.Silent(depfixer(deps))]
 
             buildfile.include(rule.output[0].path.addext('.d'), optional=True)
 
@@ -221,6 +338,7 @@ def make_compile(rule, build_inputs, buildfile, env):
     deps.extend(rule.header_files)
     if compiler.depends_on_libs:
         deps.extend(rule.libs)
+    deps.extend(_pgo_deps(rule, build_inputs))
 
     dirs = uniques(i.path.parent() for i in rule.output)
     make.multitarget_rule(
@@ -275,6 +393,7 @@ def ninja_compile(rule, build_inputs, buildfile, env):
     implicit_deps.extend(rule.header_files)
     if compiler.depends_on_libs:
         implicit_deps.extend(rule.libs)
+    implicit_deps.extend(_pgo_deps(rule, build_inputs))
 
     # Ninja doesn't support multiple outputs and deps-parsing at the same time,
     # so just use the first output and set up an alias if necessary. Aliases
@@ -299,12 +418,7 @@ def ninja_compile(rule, build_inputs, buildfile, env):
     )
 
 
-try:
-    from ..backends.msbuild import writer as msbuild
-
-    @msbuild.rule_handler(CompileSource, CompileHeader)
-    def msbuild_compile(rule, build_inputs, solution, env):
-        # MSBuild does compilation and linking in one unit; see link.py.
-        pass
-except:
+@msbuild.rule_handler(CompileSource, CompileHeader)
+def msbuild_compile(rule, build_inputs, solution, env):
+    # MSBuild does compilation and linking in one unit; see link.py.
     pass
@@ -0,0 +1,96 @@
+import json
+from six import string_types
+
+from .compile import Compile, CompileHeader
+from .. import path
+from .. import safe_str
+from ..backends.make import writer as make
+from ..backends.ninja import writer as ninja
+from ..tools.common import Command
+
+filepath = path.Path('compile_commands.json')
+
+# Compilation databases are only meaningful for C-family compilers.
+_flavors = ('cc', 'msvc')
+
+
+def _arg_string(arg, env):
+    arg = safe_str.safe_str(arg)
+    if isinstance(arg, string_types):
+        return arg
+    elif isinstance(arg, path.Path):
+        return arg.string(env.base_dirs)
+    elif isinstance(arg, safe_str.literal_types):
+        return arg.string
+    elif isinstance(arg, safe_str.jbos):
+        return ''.join(_arg_string(i, env) for i in arg.bits)
+    raise TypeError(type(arg))
+
+
+def _compile_sources(rule):
+    if isinstance(rule, CompileHeader) and rule.pch_source:
+        return [rule.pch_source]
+    # Tools reading the database look up entries by the file being edited, so
+    # list each source in a unity file separately, as though it were compiled
+    # on its own.
+    return getattr(rule.file, 'unity_sources', None) or [rule.file]
+
+
+def _compile_command(rule, source, build_inputs, env):
+    # Build the same command that the Make/Ninja compile rules use, but with
+    # all the flag variables expanded.
+    compiler = rule.compiler
+    cmd_kwargs = {}
+    if hasattr(compiler, 'flags_var'):
+        cmd_kwargs['flags'] = (
+            compiler.global_flags +
+            build_inputs['compile_options'][compiler.lang] +
+            rule.options
+        )
+
+    if len(rule.output) == 1 or compiler.num_outputs == 1:
+        output = rule.output[0]
+    else:
+        output = rule.output[:compiler.num_outputs]
+
+    cmd = Command.convert_args(compiler(source, output, **cmd_kwargs),
+                               lambda x: x.command)
+    return [_arg_string(i, env) for i in cmd]
+
+
+def write_compile_commands(build_inputs, env):
+    """Write a JSON compilation database (`compile_commands.json`) for all the
+    C-family sources in the build. Like the build files themselves, the
+    database is only rewritten if its contents have changed."""
+
+    builddir = env.builddir.string()
+    with path.write_if_changed(filepath.string(env.base_dirs)) as out:
+        out.write('[')
+        first = True
+        for edge in build_inputs.edges():
+            if ( not isinstance(edge, Compile) or
+                 edge.compiler.flavor not in _flavors ):
+                continue
+
+            output = edge.output[0]
+            for source in _compile_sources(edge):
+                out.write('\n' if first else ',\n')
+                first = False
+                json.dump({
+                    'directory': builddir,
+                    'file': source.path.string(env.base_dirs),
+                    'output': output.path.string(env.base_dirs),
+                    'arguments': _compile_command(edge, source, build_inputs,
+                                                  env),
+                }, out, sort_keys=True)
+        out.write('\n]\n')
+
+
+@make.pre_rule
+def make_compile_commands(build_inputs, buildfile, env):
+    write_compile_commands(build_inputs, env)
+
+
+@ninja.pre_rule
+def ninja_compile_commands(build_inputs, buildfile, env):
+    write_compile_commands(build_inputs, env)
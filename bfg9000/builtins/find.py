@@ -1,9 +1,19 @@
 import fnmatch
+import functools
+import hashlib
+import json
 import os
 import posixpath
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from enum import IntEnum
 
+try:
+    from os import scandir
+except ImportError:
+    from scandir import scandir
+
 from . import builtin
 from ..file_types import File, Directory
 from ..iterutils import iterate, listify
@@ -11,12 +21,15 @@ from ..backends.make import writer as make
 from ..backends.ninja import writer as ninja
 from ..backends.make.syntax import Writer, Syntax
 from ..build_inputs import build_input
-from ..path import Path, Root
+from ..path import Path, pushd, Root, write_if_changed
 from ..platforms import known_platforms
 
 build_input('find_dirs')(lambda build_inputs, env: set())
 depfile_name = '.bfg_find_deps'
+cache_name = '.bfg_find_cache'
 exclude_globs = ['.*#', '*~', '#*#']
+vcs_dirs = {'.bzr', '.git', '.hg', '.svn', '_darcs', 'CVS'}
+walk_threads = 8
 
 
 @builtin
@@ -26,8 +39,97 @@ class FindResult(IntEnum):
     exclude = 2
 
 
+class FindCache(object):
+    """A persistent index of the directories we've walked. Each directory
+    stores its mtime, its listing, and the filtered results of each query run
+    against it; if the mtime hasn't changed, we can reuse all of these."""
+
+    version = 2
+
+    # Directories modified this recently (in seconds) might be modified again
+    # without their mtime changing, so don't cache them.
+    racy_window = 2
+
+    def __init__(self, path):
+        self._path = path
+        self._seen = set()
+        self._keys = set()
+        self._dirty = False
+        try:
+            self._dirs = self._load(path)
+        except (IOError, ValueError):
+            self._dirs = {}
+
+    @classmethod
+    def _load(cls, path):
+        with open(path) as inp:
+            state = json.load(inp)
+        if state['version'] > cls.version:
+            raise ValueError('saved version exceeds expected version')
+        # Listings from older versions may have left out some directories;
+        # just walk them again.
+        if state['version'] < cls.version:
+            return {}
+        return state['dirs']
+
+    def listdir(self, path, skip_dirs=None):
+        self._seen.add(path)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return _listdir(path, skip_dirs)
+
+        entry = self._dirs.get(path)
+        if entry and entry['mtime'] == mtime:
+            return entry['listing']
+
+        self._dirty = True
+        listing = _listdir(path, skip_dirs)
+        if time.time() - mtime > self.racy_window:
+            self._dirs[path] = {'mtime': mtime, 'listing': listing,
+                                'filtered': {}}
+        else:
+            self._dirs.pop(path, None)
+        return listing
+
+    def filtered(self, path, key):
+        self._keys.add(key)
+        entry = self._dirs.get(path)
+        return entry['filtered'].get(key) if entry else None
+
+    def set_filtered(self, path, key, value):
+        entry = self._dirs.get(path)
+        if entry:
+            self._dirty = True
+            entry['filtered'][key] = value
+
+    def save(self):
+        if not self._dirty:
+            return
+
+        with open(self._path, 'w') as out:
+            # Only save the directories and queries we saw this time.
+            dirs = {}
+            for k, v in self._dirs.items():
+                if k in self._seen:
+                    dirs[k] = dict(v, filtered={
+                        kk: vv for kk, vv in v['filtered'].items()
+                        if kk in self._keys
+                    })
+            json.dump({
+                'version': self.version,
+                'dirs': dirs,
+            }, out)
+        self._dirty = False
+
+
+build_input('find_cache')(lambda build_inputs, env: FindCache(
+    env.builddir.append(cache_name).string()
+))
+
+
 def write_depfile(env, path, output, seen_dirs, makeify=False):
-    with open(path.string(env.base_dirs), 'w') as f:
+    with write_if_changed(path.string(env.base_dirs)) as f:
         # Since this file is in the build dir, we can use relative dirs for
         # deps also in the build dir.
         roots = env.base_dirs.copy()
@@ -46,36 +148,86 @@ def write_depfile(env, path, output, seen_dirs, makeify=False):
                 out.write_literal(':\n')
 
 
-def _listdir(path):
-    dirs, nondirs = [], []
+def _listdir(path, skip_dirs=None):
+    # Use the file type info from scandir where possible so that we don't need
+    # to stat every file. Returns the subdirectories, the non-directories, and
+    # the subdirectories that we should recurse into (i.e. not symlinks).
+    dirs, nondirs, subdirs = [], [], []
     try:
-        names = os.listdir(path)
-        for name in names:
+        for entry in scandir(path):
             # Use POSIX paths so that the result is platform-agnostic.
-            curpath = posixpath.join(path, name)
-            if os.path.isdir(curpath):
-                dirs.append((name, curpath))
+            curpath = posixpath.join(path, entry.name)
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+
+            if is_dir:
+                if skip_dirs and os.path.abspath(curpath) in skip_dirs:
+                    continue
+                dirs.append((entry.name, curpath))
+                # Version control metadata directories can still be matched,
+                # but we never look inside them.
+                if entry.name not in vcs_dirs and not entry.is_symlink():
+                    subdirs.append(curpath)
             else:
-                nondirs.append((name, curpath))
-    except:
+                nondirs.append((entry.name, curpath))
+    except OSError:
         pass
-    return dirs, nondirs
+    return dirs, nondirs, subdirs
 
 
-def _walk_flat(top):
+def _walk_flat(top, skip_dirs=None, listdir=_listdir):
     if os.path.exists(top):
-        yield (top,) + _listdir(top)
+        yield (top,) + tuple(listdir(top, skip_dirs)[0:2])
+
+
+def _walk_subtree(top, skip_dirs=None, listdir=_listdir):
+    result = []
+    stack = [top]
+    while stack:
+        path = stack.pop()
+        dirs, nondirs, subdirs = listdir(path, skip_dirs)
+        result.append((path, dirs, nondirs))
+        stack.extend(reversed(subdirs))
+    return result
 
 
-def _walk_recursive(top):
+def _walk_recursive(top, skip_dirs=None, listdir=_listdir):
     if not os.path.exists(top):
         return
-    dirs, nondirs = _listdir(top)
-    yield top, dirs, nondirs
-    for name, path in dirs:
-        if not os.path.islink(path):
-            for i in _walk_recursive(path):
+
+    # Expand the tree breadth-first until we have enough subtrees to keep a
+    # thread pool busy (scandir releases the GIL while it's waiting on the
+    # filesystem), and then walk each of those subtrees in parallel.
+    listings = {}
+    frontier = [top]
+    while frontier and len(frontier) < walk_threads:
+        next_frontier = []
+        for i in frontier:
+            listings[i] = listdir(i, skip_dirs)
+            next_frontier.extend(listings[i][2])
+        frontier = next_frontier
+
+    subtrees = {}
+    if frontier:
+        with ThreadPoolExecutor(max_workers=walk_threads) as executor:
+            subtrees = dict(zip(frontier, executor.map(
+                lambda i: _walk_subtree(i, skip_dirs, listdir), frontier
+            )))
+
+    # Yield the results in the same order as a simple top-down walk would, so
+    # that our output is stable.
+    stack = [top]
+    while stack:
+        path = stack.pop()
+        if path in subtrees:
+            for i in subtrees[path]:
                 yield i
+        else:
+            dirs, nondirs, subdirs = listings[path]
+            yield path, dirs, nondirs
+            stack.extend(reversed(subdirs))
 
 
 def _filter_from_glob(match_type, matches, extra, exclude):
@@ -95,31 +247,60 @@ def _filter_from_glob(match_type, matches, extra, exclude):
     return fn
 
 
-def _find_files(paths, filter, flat, as_object):
+def _make_filter(type, name, extra, exclude, filter):
+    glob_filter = _filter_from_glob(type, name, extra, exclude)
+    if not filter:
+        return glob_filter
+
+    def final_filter(name, path, type):
+        return max(filter(name, path, type), glob_filter(name, path, type))
+    return final_filter
+
+
+def _find_files(paths, filter, flat, as_object, skip_dirs=None, cache=None,
+                cache_key=None, digest=None):
     # "Does the walker choose the path, or the path the walker?" - Garth Nix
     walker = _walk_flat if flat else _walk_recursive
+    listdir = cache.listdir if cache else _listdir
 
     results, dist_results, seen_dirs = [], [], []
     filetype = File if isinstance(as_object, bool) else as_object
 
-    def do_filter(files, type):
-        cls = filetype if type == 'f' else lambda p: Directory(p, None)
+    def get_matches(files, type):
         for name, path in files:
-            fileobj = cls(Path(path, Root.srcdir))
             matched = filter(name, path, type)
+            if matched != FindResult.exclude:
+                yield name, path, type, matched
+
+    def add_matches(matches):
+        for name, path, type, matched in matches:
+            if digest:
+                digest.update('{}\0{}\0{}\n'.format(path, type, int(matched))
+                              .encode('utf-8'))
+            if type == 'f':
+                fileobj = filetype(Path(path, Root.srcdir))
+            else:
+                fileobj = Directory(Path(path, Root.srcdir), None)
+            dist_results.append(fileobj)
             if matched == FindResult.include:
-                dist_results.append(fileobj)
                 results.append(fileobj if as_object else path)
-            elif matched == FindResult.not_now:
-                dist_results.append(fileobj)
 
-    do_filter(( (os.path.basename(p), p) for p in paths ), 'd')
+    add_matches(get_matches(( (os.path.basename(p), p) for p in paths ), 'd'))
     for p in paths:
-        for base, dirs, files in walker(p):
+        for base, dirs, files in walker(p, skip_dirs, listdir):
             seen_dirs.append(Path(base, Root.srcdir))
-
-            do_filter(dirs, 'd')
-            do_filter(files, 'f')
+            if digest:
+                digest.update('{}\n'.format(base).encode('utf-8'))
+
+            matches = None
+            if cache_key is not None:
+                matches = cache.filtered(base, cache_key)
+            if matches is None:
+                matches = (list(get_matches(dirs, 'd')) +
+                           list(get_matches(files, 'f')))
+                if cache_key is not None:
+                    cache.set_filtered(base, cache_key, matches)
+            add_matches(matches)
 
     return results, dist_results, seen_dirs
 
@@ -136,23 +317,41 @@ def filter_by_platform(env, name, path, type):
     return FindResult.not_now if re.search(ex, path) else FindResult.include
 
 
+def _skip_dirs(env):
+    # Don't bother looking in the build directory (if it's inside the source
+    # directory).
+    return {os.path.abspath(env.builddir.string())}
+
+
 @builtin.globals('builtins', 'build_inputs', 'env')
 def find_files(builtins, build_inputs, env, path='.', name='*', type='*',
                extra=None, exclude=exclude_globs, filter=filter_by_platform,
                flat=False, cache=True, dist=True, as_object=False):
-    glob_filter = _filter_from_glob(type, name, extra, exclude)
-    if filter:
-        if filter == filter_by_platform:
-            filter = builtins['filter_by_platform']
-
-        def final_filter(name, path, type):
-            return max(filter(name, path, type), glob_filter(name, path, type))
-    else:
-        final_filter = glob_filter
+    # We can only reuse the filtered results from previous runs (or replay
+    # this query when checking if we need to regenerate) if we know that the
+    # filter itself hasn't changed.
+    cache_key = None
+    if filter in (None, filter_by_platform, builtins['filter_by_platform']):
+        cache_key = json.dumps([
+            type, listify(name), listify(extra), listify(exclude),
+            filter is not None,
+        ])
+
+    if filter == filter_by_platform:
+        filter = builtins['filter_by_platform']
+    final_filter = _make_filter(type, name, extra, exclude, filter)
 
     paths = [i.path.string(env.base_dirs) if isinstance(i, File) else i
              for i in iterate(path)]
-    found, dist, seen_dirs = _find_files(paths, final_filter, flat, as_object)
+    digest = hashlib.sha1()
+    found, dist, seen_dirs = _find_files(
+        paths, final_filter, flat, as_object, _skip_dirs(env),
+        build_inputs['find_cache'], cache_key, digest
+    )
+    build_inputs['regenerate'].add_find_query(
+        cache_key and {'paths': paths, 'flat': flat, 'key': cache_key,
+                       'digest': digest.hexdigest()}
+    )
 
     if cache:
         build_inputs['find_dirs'].update(seen_dirs)
@@ -163,8 +362,35 @@ def find_files(builtins, build_inputs, env, path='.', name='*', type='*',
     return found
 
 
+def replay_find_queries(env, queries):
+    """Re-run the find_files() queries recorded in a previous run and return
+    whether all their results are the same as before."""
+    cache = FindCache(env.builddir.append(cache_name).string())
+    try:
+        with pushd(env.srcdir.string()):
+            for query in queries:
+                type, name, extra, exclude, use_filter = json.loads(
+                    query['key']
+                )
+                filter = (functools.partial(filter_by_platform, env)
+                          if use_filter else None)
+                digest = hashlib.sha1()
+                _find_files(
+                    query['paths'],
+                    _make_filter(type, name, extra, exclude, filter),
+                    query['flat'], False, _skip_dirs(env), cache,
+                    query['key'], digest
+                )
+                if digest.hexdigest() != query['digest']:
+                    return False
+        return True
+    finally:
+        cache.save()
+
+
 @make.post_rule
 def make_find_dirs(build_inputs, buildfile, env):
+    build_inputs['find_cache'].save()
     if build_inputs['find_dirs']:
         write_depfile(env, Path(depfile_name), make.filepath,
                       build_inputs['find_dirs'], makeify=True)
@@ -173,6 +399,7 @@ def make_find_dirs(build_inputs, buildfile, env):
 
 @ninja.post_rule
 def ninja_find_dirs(build_inputs, buildfile, env):
+    build_inputs['find_cache'].save()
     if build_inputs['find_dirs']:
         write_depfile(env, Path(depfile_name), ninja.filepath,
                       build_inputs['find_dirs'])
@@ -16,17 +16,21 @@ from ..iterutils import iterate
 class InstallOutputs(object):
     def __init__(self, build_inputs, env):
         self._outputs = []
+        self._seen = set()
 
     def add(self, item):
         for i in item.all:
-            if i not in self._outputs:
-                if not isinstance(i, File):
-                    raise TypeError('expected a file or directory')
-                if i.external:
-                    raise ValueError('external files are not installable')
-
-                self._outputs.append(i)
-
+            # Skip anything we've already added, along with its dependencies,
+            # so that shared dependencies are only walked once.
+            if i in self._seen:
+                continue
+            if not isinstance(i, File):
+                raise TypeError('expected a file or directory')
+            if i.external:
+                raise ValueError('external files are not installable')
+
+            self._seen.add(i)
+            self._outputs.append(i)
             for j in i.install_deps:
                 self.add(j)
 
@@ -3,13 +3,18 @@ import re
 import warnings
 from collections import defaultdict
 from itertools import chain
-from six import string_types
+from six import iteritems, string_types
 from six.moves import reduce, filter as ifilter
 
 from . import builtin
-from .compile import Compile, ObjectFiles
+from .. import path
+from .. import safe_str
+from .compile import (check_lto, Compile, CompileHeader, lto_options,
+                      ObjectFiles)
 from .file_types import local_file
+from .pool import check_pool
 from ..backends.make import writer as make
+from ..backends.msbuild import writer as msbuild
 from ..backends.ninja import writer as ninja
 from ..build_inputs import build_input, Edge
 from ..file_types import *
@@ -17,6 +22,7 @@ from ..iterutils import (first, iterate, listify, merge_dicts, merge_into_dict,
                          uniques)
 from ..path import Path, Root
 from ..shell import posix as pshell
+from ..shell import windows as wshell
 
 build_input('link_options')(lambda build_inputs, env: defaultdict(list))
 
@@ -25,6 +31,42 @@ _modes = {
     'static_library': 'STATIC',
 }
 
+# The (approximate) length of a link command, in characters, past which we
+# pass its inputs to the linker via a response file. This is just under the
+# length of the longest command that cmd.exe accepts.
+_default_rsp_threshold = 8000
+
+
+def _uniques_last(iterable):
+    # Like `uniques`, but keep the *last* instance of each item. When linking
+    # static libraries, a library needs to come after everything that uses it.
+    return list(reversed(uniques(reversed(list(iterable)))))
+
+
+def _forward_closure(lib):
+    """Get the transitive set of options forwarded by a static library. This
+    returns a list of the libraries whose `forward_opts` apply (starting with
+    `lib`) and the list of libraries to link to. The result is cached on the
+    library so that each library is only walked once, no matter how many paths
+    lead to it."""
+
+    if isinstance(lib, WholeArchive):
+        lib = lib.library
+    try:
+        return lib._forward_closure
+    except AttributeError:
+        pass
+
+    own_libs = lib.forward_opts.get('libs', [])
+    children = [_forward_closure(i) for i in own_libs
+                if hasattr(i, 'forward_opts')]
+    lib._forward_closure = (
+        uniques(chain([lib], chain.from_iterable(n for n, _ in children))),
+        _uniques_last(chain(own_libs,
+                            chain.from_iterable(l for _, l in children))),
+    )
+    return lib._forward_closure
+
 
 def library_macro(name, mode):
     if mode not in _modes:
@@ -49,8 +91,10 @@ class Link(Edge):
     def __init__(self, builtins, build, env, name, files=None, includes=None,
                  include=None, pch=None, libs=None, packages=None,
                  compile_options=None, link_options=None, entry_point=None,
-                 lang=None, extra_deps=None):
+                 lang=None, pool=None, unity=None, lto=None, extra_deps=None):
         self.name = self.__name(name)
+        self.pool = check_pool(pool)
+        self.lto = check_lto(lto)
 
         self.user_libs = [
             builtins['library'](i, kind=self._preferred_lib, lang=lang)
@@ -67,7 +111,7 @@ class Link(Edge):
         self.user_files = builtins['object_files'](
             files, includes=includes, include=include, pch=pch,
             libs=self.user_libs, packages=self.user_packages,
-            options=compile_options, lang=lang
+            options=compile_options, lang=lang, unity=unity, lto=lto
         )
         self.files = sum(
             (getattr(i, 'extra_objects', []) for i in self.user_files),
@@ -121,6 +165,14 @@ class Link(Edge):
             public_output = self.linker.post_build(build, self, output)
 
         self._fill_options(env, output)
+        self._internal_options.extend(lto_options(self.linker, lto, env))
+
+        if self.pool is None and self._use_link_pool:
+            # LTO links can use a lot of memory, so they get their own pool.
+            if self._uses_lto(env):
+                self.pool = build['pools'].lto
+            else:
+                self.pool = build['pools'].link
 
         Edge.__init__(self, build, output, public_output, extra_deps)
 
@@ -135,17 +187,24 @@ class Link(Edge):
 
     @staticmethod
     def __get_forward_opts(libs):
-        result = {}
-
-        def accumulate(libs):
-            for i in libs:
-                if hasattr(i, 'forward_opts'):
-                    merge_into_dict(result, i.forward_opts)
-                    accumulate(i.forward_opts.get('libs', []))
+        forwarders = [i for i in libs if hasattr(i, 'forward_opts')]
+        closures = [_forward_closure(i) for i in forwarders]
 
-        accumulate(libs)
+        result = {}
+        for i in uniques(chain.from_iterable(n for n, _ in closures)):
+            merge_into_dict(result, {k: v for k, v in iteritems(i.forward_opts)
+                                     if k != 'libs'})
+        if forwarders:
+            result['libs'] = _uniques_last(chain.from_iterable(
+                l for _, l in closures
+            ))
         return result
 
+    def _uses_lto(self, env):
+        mode = env.lto if self.lto is None else self.lto
+        return (mode != 'off' and hasattr(self.linker, 'lto_flags') and
+                bool(self.linker.lto_flags(mode)))
+
     def __find_linker(self, env, format, langs):
         for i in langs:
             linker = env.builder(i).linker(self.mode)
@@ -159,6 +218,7 @@ class DynamicLink(Link):
     msbuild_mode = 'Application'
     _preferred_lib = 'shared'
     _prefix = ''
+    _use_link_pool = True
 
     @property
     def options(self):
@@ -204,16 +264,26 @@ class StaticLink(Link):
     msbuild_mode = 'StaticLibrary'
     _preferred_lib = 'static'
     _prefix = 'lib'
+    _use_link_pool = False
+
+    def __init__(self, *args, **kwargs):
+        self.thin = kwargs.pop('thin', False)
+        Link.__init__(self, *args, **kwargs)
 
     @property
     def options(self):
-        # Don't pass any options to the static linker. XXX: We used to support
-        # this for users via `link_options`, but that's used for forwarding
-        # options to a dynamic linker now. Should we add support for static
-        # link options back in under a different name?
-        return []
+        # Don't pass any user options to the static linker. XXX: We used to
+        # support this for users via `link_options`, but that's used for
+        # forwarding options to a dynamic linker now. Should we add support for
+        # static link options back in under a different name?
+        return self._internal_options
 
     def _fill_options(self, env, output):
+        if hasattr(self.linker, 'flags'):
+            self._internal_options = self.linker.flags(self, output)
+        else:
+            self._internal_options = []
+
         primary = first(output)
         primary.forward_opts = {
             'options': self.user_options,
@@ -313,6 +383,9 @@ def library(builtins, build, env, name, files=None, **kwargs):
         # XXX: Try to detect if a string refers to a shared lib?
         return local_file(build, file_type, name, params, **kwargs)
 
+    # `thin` only applies to the static version of the library.
+    thin = kwargs.pop('thin', False)
+
     if kind == 'dual':
         shared = SharedLink(builtins, build, env, name, files, **kwargs)
         if not shared.linker.builder.can_dual_link:
@@ -321,13 +394,13 @@ def library(builtins, build, env, name, files=None, **kwargs):
             return shared.public_output
 
         static = DualedStaticLink(builtins, build, env, name, shared.files,
-                                  **kwargs)
+                                  thin=thin, **kwargs)
         return DualUseLibrary(shared.public_output, static.public_output)
     elif kind == 'shared':
         return SharedLink(builtins, build, env, name, files,
                           **kwargs).public_output
     else:  # kind == 'static'
-        return DualedStaticLink(builtins, build, env, name, files,
+        return DualedStaticLink(builtins, build, env, name, files, thin=thin,
                                 **kwargs).public_output
 
 
@@ -379,6 +452,45 @@ def _get_flags(backend, rule, build_inputs, buildfile):
     return variables, cmd_kwargs
 
 
+def _arg_length(arg, env):
+    arg = safe_str.safe_str(arg)
+    if isinstance(arg, Path):
+        return len(arg.string(env.base_dirs))
+    elif isinstance(arg, safe_str.literal_types):
+        return len(arg.string)
+    elif isinstance(arg, safe_str.jbos):
+        return sum(_arg_length(i, env) for i in arg.bits)
+    return len(arg)
+
+
+def _use_response_file(rule, env):
+    if not rule.linker.accepts_response_file:
+        return False
+
+    # Only the input files go in the response file, but the options and
+    # libraries count towards the length of the command line too.
+    threshold = int(env.getvar('BFG9000_RSP_THRESHOLD',
+                               _default_rsp_threshold))
+    length = 0
+    for i in chain(rule.files, rule.options, getattr(rule, 'lib_options', [])):
+        length += _arg_length(i, env) + 1
+        if length > threshold:
+            return True
+    return False
+
+
+def _write_response_file(filename, linker, files, env):
+    # Response files are parsed by the linker, not by the shell, so quote them
+    # the way the linker expects: MSVC's tools use Windows command-line rules,
+    # while GCC-style tools (including ar) use POSIX-like rules on every
+    # platform.
+    quote = wshell.quote if linker.flavor == 'msvc' else pshell.quote
+    path.makedirs(os.path.dirname(filename), exist_ok=True)
+    with path.write_if_changed(filename) as out:
+        for i in files:
+            out.write(quote(i.path.string(env.base_dirs)) + '\n')
+
+
 @make.rule_handler(StaticLink, DynamicLink, SharedLink, DualedStaticLink)
 def make_link(rule, build_inputs, buildfile, env):
     linker = rule.linker
@@ -403,6 +515,17 @@ def make_link(rule, build_inputs, buildfile, env):
     files = rule.files
     if hasattr(rule.linker, 'transform_input'):
         files = rule.linker.transform_input(files)
+    elif _use_response_file(rule, env):
+        # Make has no notion of response files, so write ours out now, while
+        # we're generating the Makefile.
+        rspfile = rule.output[0].path.addext('.rsp')
+        _write_response_file(rspfile.string(env.base_dirs), linker, files,
+                             env)
+        files = [linker.response_file(rspfile)]
+
+    recipe = make.Call(recipename, files, *output_params)
+    if rule.pool:
+        recipe = [env.tool('jobpool')(rule.pool, recipe)]
 
     manifest = listify(getattr(rule, 'manifest', None))
     dirs = uniques(i.path.parent() for i in rule.output)
@@ -411,17 +534,34 @@ def make_link(rule, build_inputs, buildfile, env):
         targets=rule.output,
         deps=rule.files + rule.libs + manifest + rule.extra_deps,
         order_only=[i.append(make.dir_sentinel) for i in dirs if i],
-        recipe=make.Call(recipename, files, *output_params),
+        recipe=recipe,
         variables=variables
     )
 
 
+def _toc_file(lib, env):
+    # Get the "table of contents" file that we write alongside a shared library
+    # we built. Dependents link against the library, but only depend on its
+    # TOC, which Ninja restats so they're relinked only when the library's
+    # exported symbols change.
+    while isinstance(lib, LinkLibrary):
+        lib = lib.library
+
+    creator = getattr(lib, 'creator', None)
+    if ( not env.shared_toc or not isinstance(creator, SharedLink) or
+         creator.linker.flavor != 'cc' or
+         env.platform.object_format != 'elf' ):
+        return None
+    return lib.path.addext('.TOC')
+
+
 @ninja.rule_handler(StaticLink, DynamicLink, SharedLink, DualedStaticLink)
 def ninja_link(rule, build_inputs, buildfile, env):
     linker = rule.linker
     variables, cmd_kwargs = _get_flags(ninja, rule, build_inputs, buildfile)
+    toc = _toc_file(first(rule.output), env)
 
-    if len(rule.output) == 1:
+    if len(rule.output) == 1 and not toc:
         output_vars = ninja.var('out')
     elif linker.num_outputs == 1:
         output_vars = ninja.var('output')
@@ -433,129 +573,163 @@ def ninja_link(rule, build_inputs, buildfile, env):
             output_vars.append(v)
             variables[v] = rule.output[i]
 
+    rule_name = linker.rule_name
+    rsp_kwargs = {}
     if hasattr(rule.linker, 'transform_input'):
         input_var = ninja.var('input')
         variables[input_var] = rule.linker.transform_input(rule.files)
     else:
         input_var = ninja.var('in')
-
-    if not buildfile.has_rule(linker.rule_name):
-        buildfile.rule(name=linker.rule_name, command=[linker(
-            input_var, output_vars, **cmd_kwargs
-        )])
+        if _use_response_file(rule, env):
+            rule_name += '_rsp'
+            rsp_kwargs = {'rspfile': first(output_vars) + '.rsp',
+                          'rspfile_content': input_var}
+            input_var = linker.response_file(rsp_kwargs['rspfile'])
+
+    command = [linker(input_var, output_vars, **cmd_kwargs)]
+    toc_output = []
+    if toc:
+        rule_name += '_toc'
+        toc_var = ninja.var('toc')
+        variables[toc_var] = toc
+        toc_output = [toc]
+        command.append(env.tool('tocgen')(output_vars, toc_var))
+
+    if not buildfile.has_rule(rule_name):
+        buildfile.rule(name=rule_name, command=command, restat=bool(toc),
+                       **rsp_kwargs)
+
+    # Depend on the TOCs of any shared libraries that have them instead of the
+    # libraries themselves; we still need the libraries to be built first
+    # though.
+    libs, order_only = [], []
+    for i in rule.libs:
+        lib_toc = _toc_file(i, env)
+        if lib_toc:
+            libs.append(lib_toc)
+            order_only.append(i)
+        else:
+            libs.append(i)
 
     manifest = listify(getattr(rule, 'manifest', None))
     buildfile.build(
-        output=rule.output,
-        rule=linker.rule_name,
+        output=rule.output + toc_output,
+        rule=rule_name,
         inputs=rule.files,
-        implicit=rule.libs + manifest + rule.extra_deps,
-        variables=variables
+        implicit=libs + manifest + rule.extra_deps,
+        order_only=order_only,
+        variables=variables,
+        pool=rule.pool.name if rule.pool else None
     )
 
 
-try:
-    from .compile import CompileHeader
-    from ..backends.msbuild import writer as msbuild
+def _reduce_compile_options(files, global_cflags):
+    from ..backends.msbuild.syntax import textify_each
 
-    def _reduce_compile_options(files, global_cflags):
-        creators = [i.creator for i in files if i.creator]
-        compilers = uniques(i.linker for i in creators)
+    creators = [i.creator for i in files if i.creator]
+    compilers = uniques(i.linker for i in creators)
 
-        return reduce(merge_dicts, chain(
-            (i.parse_flags(msbuild.textify_each(
-                i.global_flags + global_cflags[i.lang]
-            )) for i in compilers),
-            (i.linker.parse_flags(msbuild.textify_each(
-                i.options
-            )) for i in creators)
-        ))
+    return reduce(merge_dicts, chain(
+        (i.parse_flags(textify_each(
+            i.global_flags + global_cflags[i.lang]
+        )) for i in compilers),
+        (i.linker.parse_flags(textify_each(
+            i.options
+        )) for i in creators)
+    ))
 
-    def _parse_common_cflags(compiler, global_cflags):
-        return compiler.parse_flags(msbuild.textify_each(
-            compiler.global_flags + global_cflags[compiler.lang]
-        ))
 
-    def _parse_file_cflags(file, per_compiler_cflags):
-        cflags = file.creator.compiler.parse_flags(
-            msbuild.textify_each(file.creator.options)
-        )
-        if not per_compiler_cflags:
-            return cflags
-        key = file.creator.compiler.command_var
-        return merge_dicts(per_compiler_cflags[key], cflags)
-
-    @msbuild.rule_handler(DynamicLink, SharedLink, StaticLink,
-                          DualedStaticLink)
-    def msbuild_link(rule, build_inputs, solution, env):
-        if ( any(i not in ['c', 'c++'] for i in rule.langs) or
-             rule.linker.flavor != 'msvc' ):
-            raise ValueError('msbuild backend currently only supports c/c++ ' +
-                             'with msvc')
-
-        output = rule.output[0]
-
-        # Parse compilation flags; if there's only one set of them (i.e. the
-        # command_var is the same for every compiler), we can apply these to
-        # all the files at once. Otherwise, we need to apply them to each file
-        # individually so they all get the correct options.
-        obj_creators = [i.creator for i in rule.files]
-        compilers = uniques(i.compiler for i in obj_creators)
-
-        per_compiler_cflags = {}
-        for c in compilers:
-            key = c.command_var
-            if key not in per_compiler_cflags:
-                per_compiler_cflags[key] = c.parse_flags(msbuild.textify_each(
-                    c.global_flags + build_inputs['compile_options'][c.lang]
-                ))
-
-        if len(per_compiler_cflags) == 1:
-            common_cflags = per_compiler_cflags.popitem()[1]
-        else:
-            common_cflags = None
+def _parse_common_cflags(compiler, global_cflags):
+    from ..backends.msbuild.syntax import textify_each
 
-        # Parse linking flags.
-        ldflags = rule.linker.parse_flags(msbuild.textify_each(
-            (rule.linker.global_flags +
-             build_inputs['link_options'][rule.linker.family] + rule.options)
-        ))
-        ldflags['libs'] = (
-            getattr(rule.linker, 'global_libs', []) +
-            getattr(rule, 'lib_options', [])
-        )
-        if hasattr(output, 'import_lib'):
-            ldflags['import_lib'] = output.import_lib
-
-        deps = chain(
-            (i.creator.file for i in rule.files),
-            chain.from_iterable(i.creator.header_files for i in rule.files),
-            chain.from_iterable(i.creator.extra_deps for i in rule.files),
-            ifilter(None, (getattr(i.creator, 'pch_source', None)
-                          for i in rule.files)),
-            rule.libs, rule.extra_deps
-        )
+    return compiler.parse_flags(textify_each(
+        compiler.global_flags + global_cflags[compiler.lang]
+    ))
 
-        def get_source(file):
-            # Get the source file for this compilation rule; it's either a
-            # regular source file or a PCH source file.
-            if isinstance(file.creator, CompileHeader):
-                return file.creator.pch_source
-            return file.creator.file
-
-        # Create the project file.
-        project = msbuild.VcxProject(
-            env, name=rule.name,
-            mode=rule.msbuild_mode,
-            output_file=output,
-            files=[{
-                'name': get_source(i),
-                'options': _parse_file_cflags(i, per_compiler_cflags),
-            } for i in rule.files],
-            compile_options=common_cflags,
-            link_options=ldflags,
-            dependencies=solution.dependencies(deps),
-        )
-        solution[output] = project
-except:
-    pass
+
+def _parse_file_cflags(file, per_compiler_cflags):
+    from ..backends.msbuild.syntax import textify_each
+
+    cflags = file.creator.compiler.parse_flags(
+        textify_each(file.creator.options)
+    )
+    if not per_compiler_cflags:
+        return cflags
+    key = file.creator.compiler.command_var
+    return merge_dicts(per_compiler_cflags[key], cflags)
+
+
+@msbuild.rule_handler(DynamicLink, SharedLink, StaticLink,
+                      DualedStaticLink)
+def msbuild_link(rule, build_inputs, solution, env):
+    from ..backends.msbuild.syntax import textify_each, VcxProject
+
+    if ( any(i not in ['c', 'c++'] for i in rule.langs) or
+         rule.linker.flavor != 'msvc' ):
+        raise ValueError('msbuild backend currently only supports c/c++ ' +
+                         'with msvc')
+
+    output = rule.output[0]
+
+    # Parse compilation flags; if there's only one set of them (i.e. the
+    # command_var is the same for every compiler), we can apply these to
+    # all the files at once. Otherwise, we need to apply them to each file
+    # individually so they all get the correct options.
+    obj_creators = [i.creator for i in rule.files]
+    compilers = uniques(i.compiler for i in obj_creators)
+
+    per_compiler_cflags = {}
+    for c in compilers:
+        key = c.command_var
+        if key not in per_compiler_cflags:
+            per_compiler_cflags[key] = c.parse_flags(textify_each(
+                c.global_flags + build_inputs['compile_options'][c.lang]
+            ))
+
+    if len(per_compiler_cflags) == 1:
+        common_cflags = per_compiler_cflags.popitem()[1]
+    else:
+        common_cflags = None
+
+    # Parse linking flags.
+    ldflags = rule.linker.parse_flags(textify_each(
+        (rule.linker.global_flags +
+         build_inputs['link_options'][rule.linker.family] + rule.options)
+    ))
+    ldflags['libs'] = (
+        getattr(rule.linker, 'global_libs', []) +
+        getattr(rule, 'lib_options', [])
+    )
+    if hasattr(output, 'import_lib'):
+        ldflags['import_lib'] = output.import_lib
+
+    deps = chain(
+        (i.creator.file for i in rule.files),
+        chain.from_iterable(i.creator.header_files for i in rule.files),
+        chain.from_iterable(i.creator.extra_deps for i in rule.files),
+        ifilter(None, (getattr(i.creator, 'pch_source', None)
+                      for i in rule.files)),
+        rule.libs, rule.extra_deps
+    )
+
+    def get_source(file):
+        # Get the source file for this compilation rule; it's either a
+        # regular source file or a PCH source file.
+        if isinstance(file.creator, CompileHeader):
+            return file.creator.pch_source
+        return file.creator.file
+
+    # Create the project file.
+    project = VcxProject(
+        env, name=rule.name,
+        mode=rule.msbuild_mode,
+        output_file=output,
+        files=[{
+            'name': get_source(i),
+            'options': _parse_file_cflags(i, per_compiler_cflags),
+        } for i in rule.files],
+        compile_options=common_cflags,
+        link_options=ldflags,
+        dependencies=solution.dependencies(deps),
+    )
+    solution[output] = project
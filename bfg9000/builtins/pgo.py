@@ -0,0 +1,87 @@
+import os.path
+
+from . import builtin
+from .. import safe_str
+from ..backends.make import writer as make
+from ..backends.ninja import writer as ninja
+from ..build_inputs import build_input
+from ..file_types import File
+from ..tools.cc import clang_profdata
+from ..tools.common import Command
+
+
+@build_input('pgo')
+class PgoInputs(object):
+    def __init__(self, build_inputs, env):
+        self.training = []
+        self.mode = env.pgo
+        self.stamp = None
+        self.profile = None
+
+        if self.mode == 'off':
+            return
+
+        # `pgo-train` touches this file once it's finished, so we can use it
+        # as a dependency for everything built with the profile data.
+        self.stamp = File(env.pgo_dir.append('profile.stamp'))
+        if self.mode == 'use':
+            if not os.path.exists(self.stamp.path.string()):
+                raise ValueError(
+                    "no profile data in '{}'; build with --pgo=generate and "
+                    "run `pgo-train` first".format(env.pgo_dir.string())
+                )
+            self.profile = self.stamp
+
+
+@builtin.globals('build_inputs')
+def pgo_train(build, *args):
+    if len(args) == 0:
+        raise ValueError('expected at least one argument')
+    build['pgo'].training.extend(args)
+
+
+def _train_commands(build_inputs, env):
+    pgo = build_inputs['pgo']
+    commands = []
+
+    # Clang writes raw profiles that need to be merged before they can be
+    # used.
+    if any(getattr(getattr(i, 'compiler', None), 'brand', None) == 'clang'
+           for i in build_inputs.edges()):
+        raw = safe_str.jbos(env.pgo_dir,
+                            safe_str.shell_literal('/*.profraw'))
+        commands.append(env.tool('llvm_profdata')(
+            env.pgo_dir.append(clang_profdata), raw
+        ))
+
+    commands.append(env.tool('touch')(pgo.stamp))
+    return commands
+
+
+@make.post_rule
+def make_pgo_rule(build_inputs, buildfile, env):
+    pgo = build_inputs['pgo']
+    if pgo.mode != 'generate':
+        return
+
+    buildfile.rule(
+        target='pgo-train',
+        deps=pgo.training,
+        recipe=[Command.convert_args(i, buildfile.cmd_var)
+                for i in _train_commands(build_inputs, env)],
+        phony=True
+    )
+
+
+@ninja.post_rule
+def ninja_pgo_rule(build_inputs, buildfile, env):
+    pgo = build_inputs['pgo']
+    if pgo.mode != 'generate':
+        return
+
+    ninja.command_build(
+        buildfile, env,
+        output='pgo-train',
+        inputs=pgo.training,
+        commands=_train_commands(build_inputs, env),
+    )
@@ -0,0 +1,117 @@
+import ctypes
+import os
+import re
+from collections import OrderedDict
+from six import itervalues
+
+from . import builtin
+from ..backends.ninja import writer as ninja
+from ..build_inputs import build_input
+from ..path import Path
+from ..platforms import platform_name
+
+# The (rough) amount of memory a single LTO link can use. We use this to size
+# the pool for LTO links so that running several at once doesn't exhaust the
+# system's memory.
+_lto_link_memory = 2 * 1024 ** 3
+
+
+def _total_memory():
+    if platform_name() == 'windows':
+        class MemoryStatusEx(ctypes.Structure):
+            _fields_ = [('dwLength', ctypes.c_ulong),
+                        ('dwMemoryLoad', ctypes.c_ulong),
+                        ('ullTotalPhys', ctypes.c_ulonglong),
+                        ('ullAvailPhys', ctypes.c_ulonglong),
+                        ('ullTotalPageFile', ctypes.c_ulonglong),
+                        ('ullAvailPageFile', ctypes.c_ulonglong),
+                        ('ullTotalVirtual', ctypes.c_ulonglong),
+                        ('ullAvailVirtual', ctypes.c_ulonglong),
+                        ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+
+        status = MemoryStatusEx()
+        status.dwLength = ctypes.sizeof(status)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullTotalPhys
+        return None
+
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+class Pool(object):
+    def __init__(self, name, depth):
+        if not re.match(r'^\w+$', name):
+            raise ValueError('pool name contains invalid characters')
+        if name == 'console':
+            raise ValueError("'console' is a reserved pool name")
+        if depth < 1:
+            raise ValueError('pool depth must be positive')
+
+        self.name = name
+        self.depth = depth
+
+    @property
+    def lockfile(self):
+        # The base name of the lock files used to emulate this pool with the
+        # Make backend.
+        return Path('.bfg_pool_' + self.name)
+
+    def __repr__(self):
+        return '<Pool({!r}, {!r})>'.format(self.name, self.depth)
+
+
+@build_input('pools')
+class Pools(object):
+    def __init__(self, build_inputs, env):
+        self._pools = OrderedDict()
+        self._link_jobs = env.link_jobs
+        self.link = self.add('link', env.link_jobs) if env.link_jobs else None
+
+    @property
+    def lto(self):
+        # Only create this pool when we actually have an LTO link. We size it
+        # based on the total (not currently-free) memory so that the build
+        # files don't change each time we regenerate them.
+        if 'lto' not in self._pools:
+            memory = _total_memory()
+            if not memory:
+                return self.link
+            depth = max(memory // _lto_link_memory, 1)
+            if self._link_jobs:
+                depth = min(depth, self._link_jobs)
+            self.add('lto', depth)
+        return self._pools['lto']
+
+    def add(self, name, depth):
+        if name in self._pools:
+            pool = self._pools[name]
+            if pool.depth != depth:
+                raise ValueError("pool '{}' already exists with depth {}"
+                                 .format(name, pool.depth))
+            return pool
+
+        pool = self._pools[name] = Pool(name, depth)
+        return pool
+
+    def __iter__(self):
+        return itervalues(self._pools)
+
+
+def check_pool(pool):
+    if pool is not None and not isinstance(pool, Pool):
+        raise TypeError('expected a Pool')
+    return pool
+
+
+@builtin.globals('build_inputs')
+def pool(build, name, depth):
+    return build['pools'].add(name, depth)
+
+
+@ninja.pre_rule
+def ninja_pools(build_inputs, buildfile, env):
+    for i in build_inputs['pools']:
+        buildfile.pool(i.name, i.depth)
@@ -1,7 +1,17 @@
+import hashlib
+import json
+import os
+
+from .find import replay_find_queries
 from ..backends.make import writer as make
+from ..backends.make.syntax import Silent
 from ..backends.ninja import writer as ninja
+from ..build import bfgfile, optsfile
 from ..build_inputs import build_input
-from ..path import Path
+from ..path import Path, Root
+
+state_name = '.bfg_regenerate'
+state_version = 1
 
 
 @build_input('regenerate')
@@ -9,32 +19,97 @@ class Regenerate(object):
     def __init__(self, build_inputs, env):
         self.outputs = []
         self.depfile = None
+        # The find_files() queries to replay when checking if we need to
+        # regenerate; None if any of them can't be replayed.
+        self.find_queries = []
+
+    def add_find_query(self, query):
+        if query is None:
+            self.find_queries = None
+        elif self.find_queries is not None:
+            self.find_queries.append(query)
+
+
+def _input_hashes(env):
+    result = {}
+    for i in (bfgfile, optsfile):
+        try:
+            with open(Path(i, Root.srcdir).string(env.base_dirs), 'rb') as f:
+                result[i] = hashlib.sha1(f.read()).hexdigest()
+        except IOError:
+            result[i] = None
+    return result
+
+
+def _save_state(build_inputs, env):
+    path = env.builddir.append(state_name).string()
+    queries = build_inputs['regenerate'].find_queries
+    if queries is None:
+        # We can't tell if the results of find_files() changed, so always
+        # regenerate.
+        if os.path.exists(path):
+            os.remove(path)
+        return
+
+    with open(path, 'w') as out:
+        json.dump({
+            'version': state_version,
+            'inputs': _input_hashes(env),
+            'find_queries': queries,
+        }, out)
+
+
+def inputs_unchanged(env):
+    """Check if the inputs for generating the build files (build.bfg,
+    build.opts, and the results of any find_files() calls) are the same as
+    when we last generated them."""
+
+    try:
+        with open(env.builddir.append(state_name).string()) as inp:
+            state = json.load(inp)
+        if state['version'] > state_version:
+            return False
+    except (IOError, ValueError):
+        return False
+
+    return ( state['inputs'] == _input_hashes(env) and
+             replay_find_queries(env, state['find_queries']) )
 
 
 @make.post_rule
 def make_regenerate_rule(build_inputs, buildfile, env):
     bfg9000 = env.tool('bfg9000')
+    touch = env.tool('touch')
+    outputs = [Path('Makefile')] + build_inputs['regenerate'].outputs
 
     make.multitarget_rule(
         buildfile,
-        targets=[Path('Makefile')] + build_inputs['regenerate'].outputs,
+        targets=outputs,
         deps=[build_inputs.bfgpath],
-        recipe=[bfg9000(Path('.'))]
+        # The build files are only rewritten if they've changed, and Make has
+        # no equivalent to Ninja's `restat`, so touch them to show that
+        # they're up to date.
+        recipe=[bfg9000(Path('.'), check=True),
+                Silent(touch(outputs))]
     )
+    _save_state(build_inputs, env)
 
 
 @ninja.post_rule
 def ninja_regenerate_rule(build_inputs, buildfile, env):
     bfg9000 = env.tool('bfg9000')
+    outputs = [Path('build.ninja')] + build_inputs['regenerate'].outputs
 
     buildfile.rule(
         name='regenerate',
-        command=[bfg9000(Path('.'))],
+        command=[bfg9000(Path('.'), check=True)],
         generator=True,
+        restat=True,
         depfile=build_inputs['regenerate'].depfile,
     )
     buildfile.build(
-        output=[Path('build.ninja')] + build_inputs['regenerate'].outputs,
+        output=outputs,
         rule='regenerate',
         implicit=[build_inputs.bfgpath]
     )
+    _save_state(build_inputs, env)
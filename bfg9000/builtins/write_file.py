@@ -1,4 +1,5 @@
 from ..backends.make import writer as make
+from ..backends.msbuild import writer as msbuild
 from ..backends.ninja import writer as ninja
 from ..build_inputs import Edge
 from ..iterutils import listify
@@ -42,18 +43,15 @@ def ninja_write_file(rule, build_inputs, buildfile, env):
     )
 
 
-try:
-    from ..backends.msbuild import writer as msbuild
+@msbuild.rule_handler(WriteFile)
+def msbuild_write_file(rule, build_inputs, solution, env):
+    from ..backends.msbuild.syntax import ExecProject
 
-    @msbuild.rule_handler(WriteFile)
-    def msbuild_write_file(rule, build_inputs, solution, env):
-        printf = env.tool('printf')
-        output = rule.output[0]
-        project = msbuild.ExecProject(
-            env, name=output.path.suffix,
-            commands=[printf('%s\\n', rule.text, output.path)],
-            dependencies=solution.dependencies(rule.extra_deps),
-        )
-        solution[output] = project
-except:
-    pass
+    printf = env.tool('printf')
+    output = rule.output[0]
+    project = ExecProject(
+        env, name=output.path.suffix,
+        commands=[printf('%s\\n', rule.text, output.path)],
+        dependencies=solution.dependencies(rule.extra_deps),
+    )
+    solution[output] = project
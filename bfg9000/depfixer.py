@@ -1,3 +1,4 @@
+import re
 import sys
 
 from enum import Enum
@@ -10,8 +11,8 @@ from .app_version import version
 # don't get an error if a dep is removed. For a more-detailed discussion of why
 # this is necessary, see <http://scottmcpeak.com/autodepend/autodepend.html>.
 
-Token = Enum('Token', ['char', 'colon', 'space', 'newline'])
-State = Enum('State', ['target', 'between_targets', 'dep', 'between_deps'])
+Token = Enum('Token', ['word', 'colon', 'space', 'newline'])
+State = Enum('State', ['target', 'between_targets', 'between_deps'])
 
 
 class ParseError(ValueError):
@@ -23,96 +24,91 @@ class UnexpectedTokenError(ParseError):
         ParseError.__init__(self, "unexpected token '{}'".format(tok))
 
 
+# The depfile syntax is a bit weird, since it seems no one quite understands
+# the correct ways to escape characters for Make in all cases (made worse by
+# the fact that even GNU Make's behavior varies across versions). For our
+# purposes though, we only need to recognize when unescaped colons (always
+# followed by whitespace in the depfile generators) and unescaped spaces are
+# emitted. Everything else (including escaped characters) is part of a word.
+_token_ex = re.compile(r"""
+    (?P<word> (?: \\[\s\S]? | :(?![ \t\n]|$) | [^:\s\\] )+ ) |
+    (?P<colon> : ) |
+    (?P<space> [ \t]+ ) |
+    (?P<newline> \n )
+""", re.VERBOSE)
+_escaped_newline_ex = re.compile(r'\\\n')
+
+
 def tokenize(s):
-    # The depfile syntax is a bit weird, since it seems no one quite
-    # understands the correct ways to escape characters for Make in all cases
-    # (made worse by the fact that even GNU Make's behavior varies across
-    # versions). For our purposes though, we only need to recognize when
-    # unescaped colons (always followed by whitespace in the depfile
-    # generators) and unescaped spaces are emitted.
-
-    s = iter(s)
-    while True:
-        c = next(s, None)
-        if c is None:
-            return
-
-        if c == ':':
-            c = next(s)
-            if c in ' \t\n':
-                yield (Token.colon, None)
-                if c == '\n':
-                    yield (Token.newline, None)
-                continue
-            else:
-                yield (Token.char, ':')
-
-        if c == '\\':
-            c = next(s)
-            if c != '\n':  # Swallow escaped newlines.
-                yield (Token.char, '\\')
-                yield (Token.char, c)
-        elif c in ' \t':
-            yield (Token.space, None)
-        elif c == '\n':
-            yield (Token.newline, None)
+    for m in _token_ex.finditer(s):
+        kind = m.lastgroup
+        if kind == 'word':
+            # Swallow escaped newlines.
+            value = _escaped_newline_ex.sub('', m.group())
+            if value:
+                yield (Token.word, value)
         else:
-            yield (Token.char, c)
+            yield (Token[kind], None)
 
 
-def emit_deps(instream, outstream):
+def fix_deps(s):
     state = State.target
+    result = []
 
-    for tok, value in tokenize(instream.read()):
+    for tok, value in tokenize(s):
         if state == State.target:
-            if tok == Token.space:
+            if tok == Token.word:
                 state = State.between_targets
             elif tok == Token.colon:
                 state = State.between_deps
-            elif tok != Token.char:
-                raise UnexpectedTokenError(tok)
         elif state == State.between_targets:
-            if tok == Token.char:
-                state = State.target
-            elif tok == Token.colon:
-                state = State.between_deps
-            elif tok != Token.space:
-                raise UnexpectedTokenError(tok)
-        elif state == State.dep:
-            if tok == Token.char:
-                outstream.write(value)
-            elif tok == Token.space:
-                outstream.write(':\n')
+            if tok == Token.colon:
                 state = State.between_deps
             elif tok == Token.newline:
-                outstream.write(':\n')
-                state = State.target
-            else:
                 raise UnexpectedTokenError(tok)
         else:  # state == State.between_deps
-            if tok == Token.char:
-                state = State.dep
-                outstream.write(value)
+            if tok == Token.word:
+                result.append(value + ':\n')
             elif tok == Token.newline:
                 state = State.target
-            elif tok != Token.space:
+            elif tok == Token.colon:
                 raise UnexpectedTokenError(tok)
 
     if state != State.target:
         raise ParseError('unexpected end of file')
+    return ''.join(result)
+
+
+def emit_deps(instream, outstream):
+    outstream.write(fix_deps(instream.read()))
+
+
+def fix_depfiles(depfiles):
+    for i in depfiles:
+        with open(i) as f:
+            deps = fix_deps(f.read())
+        with open(i, 'a') as f:
+            f.write(deps)
 
 
 def main():
     parser = argparse.ArgumentParser(
         prog='bfg9000-depfixer',
         description='Read in a depfile (in Makefile syntax) on stdin and ' +
-                    'output all the dependencies as targets on stdout.'
+                    'output all the dependencies as targets on stdout. If ' +
+                    'any depfiles are specified, append the targets to ' +
+                    'each of them instead.'
     )
     parser.add_argument('--version', action='version',
                         version='%(prog)s ' + version)
-    parser.parse_args()
+    parser.add_argument('depfiles', nargs='*', metavar='DEPFILE',
+                        help='depfiles to fix in place')
+    args = parser.parse_args()
 
     try:
-        emit_deps(sys.stdin, sys.stdout)
+        if args.depfiles:
+            fix_depfiles(args.depfiles)
+        else:
+            emit_deps(sys.stdin, sys.stdout)
     except Exception as e:
         parser.error(e)
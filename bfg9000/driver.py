@@ -5,8 +5,11 @@ from . import build
 from . import log
 from . import path
 from .arguments import parser as argparse
-from .backends import list_backends
-from .environment import Environment, EnvVersionError
+from .backends import (backend_version, default_backend, get_backend,
+                       list_backends)
+from .builtins import regenerate
+from .environment import (build_types, Environment, EnvVersionError,
+                          linkers, lto_modes, pgo_modes)
 from .platforms import platform_info
 from .app_version import version
 
@@ -42,15 +45,25 @@ def environment_from_args(args, extra_args=None):
     # Get the bin directory holding bfg's executables.
     bfgdir = path.abspath(sys.argv[0]).parent()
 
-    backend = list_backends()[args.backend]
+    backend_name = args.backend or default_backend()
+    backend = get_backend(backend_name)
     env = Environment(
         bfgdir=bfgdir,
-        backend=args.backend,
-        backend_version=backend.version(),
+        backend=backend_name,
+        backend_version=backend_version(backend_name),
         srcdir=args.srcdir,
         builddir=args.builddir,
         install_dirs={i: getattr(args, i.name) for i in path.InstallRoot},
         library_mode=(args.shared, args.static),
+        link_jobs=args.link_jobs,
+        unity_batch_size=args.unity_batch_size,
+        compiler_launcher=args.compiler_launcher,
+        build_type=args.build_type,
+        lto=args.lto,
+        pgo=args.pgo,
+        pgo_dir=args.pgo_dir or args.builddir.append('pgo-data'),
+        linker=args.linker,
+        shared_toc=args.shared_toc,
         extra_args=extra_args,
     )
 
@@ -71,6 +84,27 @@ class Directory(object):
         return path.abspath(string)
 
 
+def positive_int(string):
+    value = int(string)
+    if value < 1:
+        raise ValueError("'{}' is not positive".format(string))
+    return value
+
+
+class BackendChoices(object):
+    # Listing every backend means looking for third-party ones, which can be
+    # slow, so only do so if we need the full list (e.g. for `--help`).
+    def __contains__(self, name):
+        try:
+            get_backend(name)
+            return True
+        except ValueError:
+            return False
+
+    def __iter__(self):
+        return iter(list_backends())
+
+
 def directory_pair(srcname, buildname):
     class DirectoryPair(argparse.Action):
         def __call__(self, parser, namespace, values, option_string=None):
@@ -121,21 +155,50 @@ def add_generic_args(parser):
 
 
 def add_configure_args(parser):
-    backends = list_backends()
-
     parser.add_argument('-h', '--help', action=ConfigureHelp,
                         help='show this help message and exit')
 
     build = parser.add_argument_group('build arguments')
     build.add_argument('--backend', metavar='BACKEND',
-                       choices=list(backends.keys()),
-                       default=list(backends.keys())[0],
+                       choices=BackendChoices(),
                        help=('build backend (one of %(choices)s; default: ' +
-                             '%(default)s)'))
+                             'the first one installed)'))
     build.add_argument('--shared', action='enable', default=True,
                        help='build shared libraries (default: enabled)')
     build.add_argument('--static', action='enable', default=False,
                        help='build static libraries (default: disabled)')
+    build.add_argument('--link-jobs', metavar='N', type=positive_int,
+                       help=('maximum number of link steps to run at once ' +
+                             '(default: no limit)'))
+    build.add_argument('--unity-batch-size', metavar='N', type=positive_int,
+                       help=('combine up to N source files into each ' +
+                             'compilation (default: 1)'))
+    build.add_argument('--compiler-launcher', metavar='CMD',
+                       help=('command to run compilers with, e.g. ccache; ' +
+                             "pass 'auto' to use ccache or sccache if found"))
+    build.add_argument('--build-type', choices=build_types,
+                       help=('the kind of build to configure, which sets ' +
+                             'the optimization and debugging flags ' +
+                             '(default: none)'))
+    build.add_argument('--lto', choices=lto_modes, default='off',
+                       help=('the kind of link-time optimization to use ' +
+                             '(default: %(default)s)'))
+    build.add_argument('--pgo', choices=pgo_modes, default='off',
+                       help=('the stage of profile-guided optimization to ' +
+                             "build for; 'generate' builds instrumented " +
+                             "binaries, and 'use' builds with the profile " +
+                             'data (default: %(default)s)'))
+    build.add_argument('--pgo-dir', type=Directory(), metavar='PATH',
+                       help=('the directory to store profile data in ' +
+                             '(default: BUILDDIR/pgo-data)'))
+    build.add_argument('--linker', choices=linkers,
+                       help=('the linker for the compiler to use; ' +
+                             "'auto' picks the fastest one available " +
+                             '(default: the compiler\'s default)'))
+    build.add_argument('--shared-toc', action='enable', default=False,
+                       help=('only relink dependents of a shared library ' +
+                             'when its exported symbols change (Ninja ' +
+                             'backend only; default: disabled)'))
 
     install_dirs = platform_info().install_dirs
     common_path_help = 'installation path for {} (default: %(default)r)'
@@ -176,6 +239,7 @@ def configure(parser, args, extra):
         argv = build.parse_user_args(env)
         build_inputs = build.execute_script(env, argv)
         backend.write(env, build_inputs)
+        env.probe_cache.save()
     except Exception as e:
         logger.exception(e)
         return 1
@@ -191,11 +255,14 @@ def refresh(parser, args, extra):
 
     try:
         env = Environment.load(args.builddir.string())
+        if args.check and regenerate.inputs_unchanged(env):
+            return
 
-        backend = list_backends()[env.backend]
+        backend = get_backend(env.backend)
         argv = build.parse_user_args(env)
         build_inputs = build.execute_script(env, argv)
         backend.write(env, build_inputs)
+        env.probe_cache.save()
     except Exception as e:
         msg = 'Unable to reload environment'
         if str(e):
@@ -245,6 +312,9 @@ def main():
     refresh_p.add_argument('builddir', type=Directory(must_exist=True),
                            metavar='BUILDDIR', nargs='?', default='.',
                            help='build directory')
+    refresh_p.add_argument('--check', action='store_true',
+                           help=('only regenerate if the build inputs have ' +
+                                 'changed'))
 
     help_p = subparsers.add_parser(
         'help', help='show this help message and exit', add_help=False
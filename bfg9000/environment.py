@@ -6,32 +6,51 @@ from six import iteritems
 
 from . import platforms
 from . import tools
-from .backends import list_backends
+from .backends import backend_version
 from .file_types import Executable, Node
 from .iterutils import first, isiterable, listify
-from .path import InstallRoot, Path, Root
+from .path import InstallRoot, Path, Root, write_if_changed
+from .tools.probe_cache import ProbeCache
 from .versioning import Version
 
 LibraryMode = namedtuple('LibraryMode', ['shared', 'static'])
 
+# The build types that can be passed to `--build-type`; each toolchain maps
+# these to its own optimization, debug-info, and assertion flags.
+build_types = ('debug', 'release', 'relwithdebinfo', 'minsize')
+
+# The kinds of link-time optimization that can be passed to `--lto`.
+lto_modes = ('off', 'full', 'thin')
+
+# The stages of profile-guided optimization that can be passed to `--pgo`.
+pgo_modes = ('off', 'generate', 'use')
+
+# The linkers that can be passed to `--linker`; 'auto' picks the fastest one
+# that the compiler driver accepts.
+linkers = ('auto', 'bfd', 'gold', 'lld', 'mold')
+
 
 class EnvVersionError(RuntimeError):
     pass
 
 
 class Environment(object):
-    version = 11
+    version = 19
     envfile = '.bfg_environ'
+    probe_cache_file = '.bfg_probe_cache'
 
     def __new__(cls, *args, **kwargs):
         env = object.__new__(cls)
         tools.init()
         env.__builders = {}
         env.__tools = {}
+        env.__probe_cache = None
         return env
 
     def __init__(self, bfgdir, backend, backend_version, srcdir, builddir,
-                 install_dirs, library_mode, extra_args):
+                 install_dirs, library_mode, link_jobs, unity_batch_size,
+                 compiler_launcher, build_type, lto, pgo, pgo_dir,
+                 linker, shared_toc, extra_args):
         self.bfgdir = bfgdir
         self.backend = backend
         self.backend_version = backend_version
@@ -40,6 +59,15 @@ class Environment(object):
         self.builddir = builddir
         self.install_dirs = install_dirs
         self.library_mode = LibraryMode(*library_mode)
+        self.link_jobs = link_jobs
+        self.unity_batch_size = unity_batch_size
+        self.compiler_launcher = compiler_launcher
+        self.build_type = build_type
+        self.lto = lto
+        self.pgo = pgo
+        self.pgo_dir = pgo_dir
+        self.linker = linker
+        self.shared_toc = shared_toc
 
         self.extra_args = extra_args
 
@@ -58,6 +86,17 @@ class Environment(object):
     def getvar(self, key, default=None):
         return self.variables.get(key, default)
 
+    @property
+    def probe_cache(self):
+        if self.__probe_cache is None:
+            path = None
+            if self.builddir:
+                path = self.builddir.append(self.probe_cache_file).string()
+            self.__probe_cache = ProbeCache(
+                path, self.getvar('BFG9000_PROBE_CACHE')
+            )
+        return self.__probe_cache
+
     def builder(self, lang):
         if lang not in self.__builders:
             self.__builders[lang] = tools.get_builder(self, lang)
@@ -100,7 +139,7 @@ class Environment(object):
         return line
 
     def save(self, path):
-        with open(os.path.join(path, self.envfile), 'w') as out:
+        with write_if_changed(os.path.join(path, self.envfile)) as out:
             json.dump({
                 'version': self.version,
                 'data': {
@@ -114,6 +153,16 @@ class Environment(object):
                         for k, v in iteritems(self.install_dirs)
                     },
                     'library_mode': self.library_mode,
+                    'link_jobs': self.link_jobs,
+                    'unity_batch_size': self.unity_batch_size,
+                    'compiler_launcher': self.compiler_launcher,
+                    'build_type': self.build_type,
+                    'lto': self.lto,
+                    'pgo': self.pgo,
+                    'pgo_dir': (self.pgo_dir.to_json() if self.pgo_dir
+                                else None),
+                    'linker': self.linker,
+                    'shared_toc': self.shared_toc,
                     'extra_args': self.extra_args,
                     'variables': self.variables,
                     'platform': self.platform.name,
@@ -138,8 +187,7 @@ class Environment(object):
         # v6 adds persistence for the backend's version and converts bfgpath to
         # a Path object internally.
         if version < 6:
-            backend = list_backends()[data['backend']]
-            data['backend_version'] = str(backend.version())
+            data['backend_version'] = str(backend_version(data['backend']))
             data['bfgpath'] = Path(data['bfgpath']).to_json()
 
         # v7 replaces bfgpath with bfgdir.
@@ -170,6 +218,40 @@ class Environment(object):
             for i in data['install_dirs']:
                 data['install_dirs'][i] += (False,)
 
+        # v12 adds the option to limit the number of concurrent link jobs.
+        if version < 12:
+            data['link_jobs'] = None
+
+        # v13 adds the option to build sources in unity batches.
+        if version < 13:
+            data['unity_batch_size'] = None
+
+        # v14 adds the option to wrap compilers with a launcher like ccache.
+        if version < 14:
+            data['compiler_launcher'] = None
+
+        # v15 adds the build type (e.g. debug or release).
+        if version < 15:
+            data['build_type'] = None
+
+        # v16 adds link-time optimization.
+        if version < 16:
+            data['lto'] = 'off'
+
+        # v17 adds profile-guided optimization.
+        if version < 17:
+            data['pgo'] = 'off'
+            data['pgo_dir'] = None
+
+        # v18 adds the option to choose which linker to use.
+        if version < 18:
+            data['linker'] = None
+
+        # v19 adds the option to generate tables of contents for shared
+        # libraries.
+        if version < 19:
+            data['shared_toc'] = False
+
         # Now that we've upgraded, initialize the Environment object.
         env = Environment.__new__(Environment)
 
@@ -179,12 +261,16 @@ class Environment(object):
             data['variables'] = {str(k): str(v) for k, v in
                                  iteritems(data['variables'])}
 
-        for i in ('backend', 'extra_args', 'variables'):
+        for i in ('backend', 'link_jobs', 'unity_batch_size',
+                  'compiler_launcher', 'build_type', 'lto', 'pgo',
+                  'linker', 'shared_toc', 'extra_args', 'variables'):
             setattr(env, i, data[i])
 
         for i in ('bfgdir', 'srcdir', 'builddir'):
             setattr(env, i, Path.from_json(data[i]))
 
+        env.pgo_dir = (Path.from_json(data['pgo_dir']) if data['pgo_dir']
+                       else None)
         env.backend_version = Version(data['backend_version'])
         env.install_dirs = {
             InstallRoot[k]: Path.from_json(v) if v else None
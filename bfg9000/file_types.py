@@ -1,7 +1,9 @@
 import copy as _copy
+from itertools import chain as _chain
 from six import iteritems as _iteritems
 
-from .iterutils import listify as _listify
+from .iterutils import (iterate as _iterate, listify as _listify,
+                        uniques as _uniques)
 from .languages import src2lang as _src2lang, hdr2lang as _hdr2lang
 from .path import InstallRoot as _InstallRoot, install_path as _install_path
 from .safe_str import safe_str as _safe_str
@@ -16,6 +18,28 @@ def installify(file, destdir=True):
     return file
 
 
+def _recursive_deps(file, attr):
+    # Cache the results on each file so that walking a long chain of libraries
+    # (or many links against the same library) only visits each one once.
+    cache = file.__dict__.setdefault('_recursive_deps', {})
+    if attr not in cache:
+        cache[attr] = _uniques(_chain.from_iterable(
+            _chain([i], _recursive_deps(i, attr)) for i in getattr(file, attr)
+        ))
+    return cache[attr]
+
+
+def recursive_deps(files, attr='runtime_deps'):
+    """Return the files that `files` depend on, directly or indirectly, via
+    `attr` (e.g. `runtime_deps` or `linktime_deps`). Each dependency appears
+    once, in depth-first order. Since the results are cached, only call this
+    once the files' dependencies are final."""
+
+    return _uniques(_chain.from_iterable(
+        _recursive_deps(i, attr) for i in _iterate(files)
+    ))
+
+
 class Node(object):
     private = False
 
@@ -0,0 +1,76 @@
+import errno
+import subprocess
+import time
+
+from .arguments import parser as argparse
+from .app_version import version
+from .platforms import platform_name
+
+# Emulate Ninja's job pools for backends that don't support them (i.e. Make).
+# Each pool of depth N has N lock files; to run a command, we wait until we can
+# lock one of them, and then hold onto it until the command finishes. Since the
+# OS releases the lock when we exit, a crashed job can't wedge the pool.
+
+if platform_name() == 'windows':
+    import msvcrt
+
+    def _try_lock(f):
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except IOError:
+            return False
+else:
+    import fcntl
+
+    def _try_lock(f):
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except IOError as e:
+            if e.errno in (errno.EAGAIN, errno.EACCES, errno.EWOULDBLOCK):
+                return False
+            raise
+
+
+def acquire(name, depth, interval=0.05):
+    while True:
+        for i in range(depth):
+            f = open('{}.{}'.format(name, i), 'a+')
+            f.seek(0)
+            if _try_lock(f):
+                return f
+            f.close()
+        time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='bfg9000-jobpool',
+        description=('Run a command once there are fewer than DEPTH other ' +
+                     'commands running in the pool NAME.')
+    )
+    parser.add_argument('--version', action='version',
+                        version='%(prog)s ' + version)
+    parser.add_argument('-j', '--depth', type=int, default=1, metavar='DEPTH',
+                        help='the maximum number of concurrent commands')
+    parser.add_argument('--shell', action='store_true',
+                        help='run COMMAND with the system shell')
+    parser.add_argument('name', metavar='NAME',
+                        help='the base name of the lock files for the pool')
+    parser.add_argument('command', nargs=argparse.REMAINDER, metavar='COMMAND',
+                        help='the command to execute')
+    args = parser.parse_args()
+
+    if args.depth < 1:
+        parser.error('depth must be positive')
+    if args.command[:1] == ['--']:
+        args.command = args.command[1:]
+    if not args.command:
+        parser.error('no command specified')
+
+    command = args.command
+    if args.shell:
+        command = ' '.join(command)
+    with acquire(args.name, args.depth):
+        return subprocess.call(command, shell=args.shell)
@@ -1,8 +1,9 @@
 import errno
 import os
+import weakref
 from enum import Enum
 from itertools import chain
-from six import iteritems, string_types
+from six import iteritems, string_types, StringIO
 from contextlib import contextmanager
 
 from . import safe_str
@@ -17,26 +18,69 @@ DestDir = Enum('DestDir', ['destdir'])
 
 
 class Path(safe_str.safe_string):
+    """An immutable path relative to some root. Paths are interned, so
+    creating the same path twice (even if it's spelled differently) returns
+    the same object."""
+
+    __slots__ = ('suffix', 'root', 'destdir', '_hash', '_string',
+                 '__weakref__')
+
     __repr_variables = dict(
         [(i, '$({})'.format(i.name)) for i in chain(Root, InstallRoot)] +
         [(DestDir.destdir, '$(DESTDIR)')]
     )
 
-    def __init__(self, path, root=Root.builddir, destdir=False):
+    # Map both the arguments used to create a path and its normalized form to
+    # the (unique) Path object.
+    __interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, path, root=Root.builddir, destdir=False):
+        key = (path, root, destdir)
+        try:
+            return cls.__interned[key]
+        except KeyError:
+            pass
+
         if destdir and root not in InstallRoot:
             raise ValueError('destdir only applies to install paths')
-        self.destdir = destdir
 
-        self.suffix = os.path.normpath(path)
-        if self.suffix == '.':
-            self.suffix = ''
+        suffix = os.path.normpath(path)
+        if suffix == '.':
+            suffix = ''
 
         if os.path.isabs(path):
-            self.root = Root.absolute
+            root = Root.absolute
         elif root == Root.absolute:
             raise ValueError("'{}' is not absolute".format(path))
-        else:
-            self.root = root
+
+        normkey = (suffix, root, destdir)
+        self = cls.__interned.get(normkey)
+        if self is None:
+            self = safe_str.safe_string.__new__(cls)
+            setattr_ = super(Path, self).__setattr__
+            setattr_('suffix', suffix)
+            setattr_('root', root)
+            setattr_('destdir', destdir)
+            setattr_('_hash', hash(normkey))
+            setattr_('_string', None)
+            cls.__interned[normkey] = self
+        cls.__interned[key] = self
+        return self
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Path objects are immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('Path objects are immutable')
+
+    def __reduce__(self):
+        return (Path, (self.suffix, self.root, self.destdir))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def parent(self):
         if not self.suffix:
@@ -107,6 +151,11 @@ class Path(safe_str.safe_string):
         return root + (os.path.sep + self.suffix)
 
     def string(self, variables=None):
+        # Absolute paths (and paths without any variables) get realized all
+        # the time, so cache them.
+        if variables is None and self._string is not None:
+            return self._string
+
         path = self
         result = ''
 
@@ -121,6 +170,8 @@ class Path(safe_str.safe_string):
                 result = real + result
                 break
 
+        if variables is None:
+            super(Path, self).__setattr__('_string', result)
         return result
 
     def __str__(self):
@@ -130,10 +181,16 @@ class Path(safe_str.safe_string):
         return '`{}`'.format(self.realize(self.__repr_variables))
 
     def __hash__(self):
-        return hash(self.suffix)
+        return self._hash
 
     def __eq__(self, rhs):
-        return self.root == rhs.root and self.suffix == rhs.suffix
+        return self is rhs or (
+            isinstance(rhs, Path) and self.root == rhs.root and
+            self.suffix == rhs.suffix and self.destdir == rhs.destdir
+        )
+
+    def __ne__(self, rhs):
+        return not (self == rhs)
 
     def __nonzero__(self):
         return self.__bool__()
@@ -148,6 +205,24 @@ class Path(safe_str.safe_string):
         return safe_str.jbos(lhs, self)
 
 
+def realizer(variables):
+    """Return a function that realizes paths with `variables`, caching the
+    results. `variables` must not change after this is called. The cache only
+    holds weak references to the paths, so it doesn't keep them alive."""
+
+    caches = {False: weakref.WeakKeyDictionary(),
+              True: weakref.WeakKeyDictionary()}
+
+    def realize(path, executable=False):
+        cache = caches[executable]
+        try:
+            return cache[path]
+        except KeyError:
+            result = cache[path] = path.realize(variables, executable)
+            return result
+    return realize
+
+
 def abspath(path):
     return Path(os.path.abspath(path), Root.absolute)
 
@@ -211,6 +286,40 @@ def pushd(dirname, makedirs=False, mode=0o777, exist_ok=False):
     os.chdir(old)
 
 
+def _replace(src, dst):
+    try:
+        os.replace(src, dst)
+    except AttributeError:  # pragma: no cover
+        # Python 2 has no os.replace, and Windows won't rename over an existing
+        # file.
+        if platform_name() == 'windows' and os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+
+@contextmanager
+def write_if_changed(filename):
+    """Yield a stream to write the contents of `filename` into. Once done, the
+    file is atomically replaced, but only if the new contents differ from the
+    old ones; this way, the file's mtime only changes when it needs to."""
+
+    out = StringIO()
+    yield out
+    data = out.getvalue()
+
+    try:
+        with open(filename) as inp:
+            if inp.read() == data:
+                return
+    except IOError:
+        pass
+
+    tmpname = filename + '.tmp'
+    with open(tmpname, 'w') as f:
+        f.write(data)
+    _replace(tmpname, filename)
+
+
 def which(names, env=os.environ, resolve=False, kind='executable'):
     paths = env.get('PATH', os.defpath).split(os.pathsep)
     exts = ['']
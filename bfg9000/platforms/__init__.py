@@ -1,8 +1,8 @@
 import platform
 import subprocess
-from pkg_resources import get_entry_info, DistributionNotFound
 
 from ..objutils import memoize
+from ..plugins import builtin_entry_points, EntryPoint
 
 known_platforms = ['posix', 'linux', 'darwin', 'cygwin', 'windows']
 
@@ -48,9 +48,8 @@ def platform_info(name=None):
 
 @memoize
 def _get_platform_info(name):
-    entry = get_entry_info('bfg9000', 'bfg9000.platforms', name)
-    if entry is None:
-        # Fall back to a generic POSIX system if we don't recognize the
-        # platform name.
-        entry = get_entry_info('bfg9000', 'bfg9000.platforms', 'posix')
+    entries = builtin_entry_points['bfg9000.platforms']
+    # Fall back to a generic POSIX system if we don't recognize the platform
+    # name.
+    entry = EntryPoint(name, entries.get(name, entries['posix']))
     return entry.load()(name)
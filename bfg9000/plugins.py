@@ -0,0 +1,127 @@
+import importlib
+import re
+from collections import OrderedDict
+
+from .objutils import memoize
+
+__all__ = ['builtin_entry_points', 'EntryPoint', 'get_entry_point',
+           'list_entry_points']
+
+# The entry points that bfg9000 itself provides. These should match the ones in
+# `setup.py`; we keep a copy here so that we can look them up without asking
+# `pkg_resources`, which is quite slow to import. The backends are listed in
+# order of priority (see `default_backend()`).
+builtin_entry_points = {
+    'bfg9000.backends': OrderedDict([
+        ('ninja', 'bfg9000.backends.ninja.writer'),
+        ('make', 'bfg9000.backends.make.writer'),
+        ('msbuild', 'bfg9000.backends.msbuild.writer [msbuild]'),
+    ]),
+    'bfg9000.platforms': OrderedDict([
+        ('cygwin', 'bfg9000.platforms.windows:CygwinPlatform'),
+        ('darwin', 'bfg9000.platforms.posix:DarwinPlatform'),
+        ('linux', 'bfg9000.platforms.posix:LinuxPlatform'),
+        ('posix', 'bfg9000.platforms.posix:PosixPlatform'),
+        ('windows', 'bfg9000.platforms.windows:WindowsPlatform'),
+    ]),
+}
+
+# The modules required by each of our extras (see `extras_require` in
+# `setup.py`).
+extra_modules = {
+    'msbuild': ['lxml'],
+}
+
+
+class EntryPoint(object):
+    _pattern = re.compile(r'^\s*([\w.]+)\s*(?::\s*([\w.]+))?\s*' +
+                          r'(?:\[\s*([\w.,\s-]*)\])?\s*$')
+
+    def __init__(self, name, value):
+        m = self._pattern.match(value)
+        if not m:
+            raise ValueError('invalid entry point {!r}'.format(value))
+
+        self.name = name
+        self.module = m.group(1)
+        self.attrs = m.group(2).split('.') if m.group(2) else []
+        self.extras = [i.strip() for i in (m.group(3) or '').split(',')
+                       if i.strip()]
+
+    def load(self):
+        # Make sure the extras are installed first, just like pkg_resources
+        # would do.
+        for i in self.extras:
+            for m in extra_modules.get(i, []):
+                importlib.import_module(m)
+
+        result = importlib.import_module(self.module)
+        for i in self.attrs:
+            result = getattr(result, i)
+        return result
+
+    def __repr__(self):
+        return '<EntryPoint({!r}, {!r})>'.format(self.name, self.module)
+
+
+def _external_entry_points(group):
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        try:
+            from importlib_metadata import entry_points
+        except ImportError:
+            entry_points = None
+
+    if entry_points:
+        eps = entry_points()
+        if hasattr(eps, 'select'):
+            return eps.select(group=group)
+        return eps.get(group, [])
+
+    # As a last resort, ask pkg_resources. This is slow, but it's only needed
+    # on old Pythons when listing every plugin.
+    import pkg_resources
+
+    class Wrapper(object):
+        def __init__(self, ep):
+            self.name = ep.name
+            self._ep = ep
+
+        def load(self):
+            try:
+                return self._ep.load()
+            except pkg_resources.DistributionNotFound as e:
+                raise ImportError(str(e))
+
+    return [Wrapper(i) for i in pkg_resources.iter_entry_points(group)]
+
+
+def get_entry_point(group, name):
+    """Look up the entry point `name` in `group`, checking bfg9000's own entry
+    points first so that we only need to scan the installed packages if
+    `name` comes from a third-party package. Returns None if no entry point
+    was found."""
+
+    builtins = builtin_entry_points.get(group, {})
+    if name in builtins:
+        return EntryPoint(name, builtins[name])
+    for i in _external_entry_points(group):
+        if i.name == name:
+            return i
+    return None
+
+
+@memoize
+def list_entry_points(group):
+    """Return a list of every entry point in `group`, including third-party
+    ones; bfg9000's own entry points come first."""
+
+    builtins = builtin_entry_points.get(group, {})
+    result = [EntryPoint(k, v) for k, v in builtins.items()]
+    seen = set(builtins)
+    for i in _external_entry_points(group):
+        if i.name not in seen:
+            seen.add(i.name)
+            result.append(i)
+    return result
@@ -4,7 +4,7 @@ from . import iterutils
 
 
 class safe_string(object):
-    pass
+    __slots__ = ()
 
 
 def safe_str(s):
@@ -34,7 +34,7 @@ class Writer(object):
                 escaped |= self.write(i, syntax, shell_quote)
         elif isinstance(thing, path.Path):
             out = Writer(StringIO())
-            thing = thing.realize(path_vars, shelly)
+            thing = _realize(thing, shelly)
             escaped = out.write(thing, syntax, pshell.escape)
 
             thing = out.stream.getvalue()
@@ -82,3 +82,4 @@ class Variable(object):
 
 
 path_vars = {i: Variable(i.name) for i in path.InstallRoot}
+_realize = path.realizer(path_vars)
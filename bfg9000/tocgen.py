@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+
+from .arguments import parser as argparse
+from .app_version import version
+from .path import write_if_changed
+
+# Write a "table of contents" for an ELF shared library: its soname and the
+# dynamic symbols it defines (without their addresses or sizes). Since the file
+# is only rewritten when this changes, the Ninja backend can restat it and skip
+# relinking everything that depends on the library when only the library's
+# implementation changed.
+
+
+def soname(readelf, library):
+    output = subprocess.check_output([readelf, '-dW', library],
+                                     universal_newlines=True)
+    return [i.split('(SONAME)', 1)[1].strip() for i in output.splitlines()
+            if '(SONAME)' in i]
+
+
+def symbols(nm, library):
+    output = subprocess.check_output(
+        [nm, '--dynamic', '--extern-only', '--defined-only', '-P', library],
+        universal_newlines=True
+    )
+    return [' '.join(i.split()[0:2]) for i in output.splitlines() if i]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='bfg9000-tocgen',
+        description=('Write the soname and exported symbols of the shared ' +
+                     'library LIBRARY to a file, touching the file only if ' +
+                     'they changed.')
+    )
+    parser.add_argument('--version', action='version',
+                        version='%(prog)s ' + version)
+    parser.add_argument('-o', required=True, dest='output', metavar='OUTPUT',
+                        help='the output file to write the table of contents')
+    parser.add_argument('--readelf', default='readelf', metavar='CMD',
+                        help='the readelf command to use')
+    parser.add_argument('--nm', default='nm', metavar='CMD',
+                        help='the nm command to use')
+    parser.add_argument('library', metavar='LIBRARY',
+                        help='the shared library to read')
+    args = parser.parse_args()
+
+    try:
+        lines = (soname(args.readelf, args.library) +
+                 symbols(args.nm, args.library))
+    except subprocess.CalledProcessError as e:
+        return e.returncode
+    except OSError as e:
+        # We can't read the library's symbols, so fall back to recording its
+        # mtime; this way, dependents are relinked whenever it changes, just
+        # like they would be without a table of contents.
+        sys.stderr.write('{}: unable to read symbols: {}\n'
+                         .format(parser.prog, e))
+        lines = ['mtime: {!r}'.format(os.path.getmtime(args.library))]
+
+    with write_if_changed(args.output) as out:
+        for i in lines:
+            out.write(i + '\n')
@@ -1,18 +1,22 @@
 import os
 from itertools import chain
 
+from .. import safe_str
 from .. import shell
 from .common import BuildCommand, check_which
 from ..file_types import StaticLibrary
 from ..iterutils import iterate
 from ..objutils import memoize
-from ..path import Path
+from ..path import install_path, Path
 from ..versioning import detect_version
 
 
 class ArLinker(BuildCommand):
-    def __init__(self, builder, env):
-        cmd = check_which(env.getvar('AR', 'ar'), env.variables,
+    def __init__(self, builder, env, lto_ar=None):
+        # If we're using LTO, prefer the compiler's wrapper for `ar` (e.g.
+        # `gcc-ar`), falling back to plain `ar` if it's not installed.
+        default = [lto_ar, 'ar'] if lto_ar else 'ar'
+        cmd = check_which(env.getvar('AR', default), env.variables,
                           kind='static linker')
         global_flags = shell.split(env.getvar('ARFLAGS', 'cru'))
         BuildCommand.__init__(self, builder, env, 'ar', 'ar', cmd,
@@ -21,7 +25,7 @@ class ArLinker(BuildCommand):
     @memoize
     def _check_version(self):
         try:
-            output = shell.execute(
+            output = self.env.probe_cache.execute(
                 self.command + ['--version'], env=self.env.variables,
                 stderr=shell.Mode.devnull
             )
@@ -39,6 +43,25 @@ class ArLinker(BuildCommand):
     def version(self):
         return self._check_version()[1]
 
+    @memoize
+    def _check_thin(self):
+        # Older versions of GNU ar only support thin archives via the `T`
+        # modifier, which we can't add to ARFLAGS, so look for `--thin`.
+        if self.brand != 'gnu':
+            return False
+        try:
+            output = self.env.probe_cache.execute(
+                self.command + ['--help'], env=self.env.variables,
+                stderr=shell.Mode.devnull
+            )
+            return '--thin' in output
+        except (OSError, shell.CalledProcessError):
+            return False
+
+    @property
+    def supports_thin(self):
+        return self._check_thin()
+
     @property
     def flavor(self):
         return 'ar'
@@ -60,11 +83,38 @@ class ArLinker(BuildCommand):
         # and only define the macros if it does.
         return self.env.platform.has_import_library
 
+    @property
+    def accepts_response_file(self):
+        # Only GNU ar is known to support reading arguments from a file.
+        return self.brand == 'gnu'
+
+    def response_file(self, name):
+        return safe_str.jbos('@', name)
+
     def _call(self, cmd, input, output, flags=None):
         return list(chain(
             cmd, iterate(flags), [output], iterate(input)
         ))
 
+    def _thin(self, options):
+        return options.thin and self.supports_thin
+
+    def flags(self, options, output, pkg=False):
+        return ['--thin'] if self._thin(options) else []
+
+    def post_install(self, output):
+        # Thin archives only refer to their members by path, so an installed
+        # copy would be useless. Replace it with a real archive instead.
+        rule = output.creator
+        if not self._thin(rule):
+            return None
+
+        path = install_path(output.path, output.install_root)
+        return shell.shell_list(chain(
+            self.env.tool('rm')(path), [safe_str.shell_literal('&&')],
+            self(rule.files, path, self.global_flags)
+        ))
+
     def output_file(self, name, options):
         head, tail = os.path.split(name)
         path = os.path.join(head, 'lib' + tail + '.a')
@@ -1,6 +1,9 @@
 import os.path
 import re
+import shutil
 import subprocess
+import tempfile
+import warnings
 from itertools import chain
 from six.moves import filter as ifilter
 
@@ -8,7 +11,7 @@ from . import pkg_config
 from .. import safe_str
 from .. import shell
 from .ar import ArLinker
-from .common import BuildCommand, darwin_install_name
+from .common import BuildCommand, compiler_launcher, darwin_install_name
 from .ld import LdLinker
 from ..builtins.symlink import Symlink
 from ..exceptions import PackageResolutionError
@@ -17,13 +20,23 @@ from ..iterutils import default_sentinel, first, iterate, listify, uniques
 from ..path import install_path, Path, Root
 from ..versioning import detect_version, SpecifierSet
 
+# The optimization, debug-info, and assertion flags for each build type.
+_build_type_flags = {
+    'debug'         : ['-O0', '-g'],
+    'release'       : ['-O2', '-DNDEBUG'],
+    'relwithdebinfo': ['-O2', '-g', '-DNDEBUG'],
+    'minsize'       : ['-Os', '-DNDEBUG'],
+}
 
-def recursive_deps(lib):
-    for i in lib.runtime_deps:
-        yield i
-        for i in lib.runtime_deps:
-            for j in recursive_deps(i):
-                yield j
+# Languages that we can use link-time optimization with.
+_lto_langs = ('c', 'c++', 'objc', 'objc++')
+
+# The name of the merged profile data file for Clang, relative to the profile
+# directory.
+clang_profdata = 'default.profdata'
+
+# The linkers that `--linker=auto` will try to use, fastest first.
+_fast_linkers = ('mold', 'lld', 'gold')
 
 
 class CcBuilder(object):
@@ -45,12 +58,16 @@ class CcBuilder(object):
         ldflags = shell.split(env.getvar('LDFLAGS', ''))
         ldlibs = shell.split(env.getvar('LDLIBS', ''))
 
+        # The flags to select (and configure) the linker go ahead of the user's
+        # LDFLAGS so that an explicit `-fuse-ld` there still takes precedence.
+        linker_flags = self._use_linker_flags(env, command, ldflags)
+
         # macOS's ld doesn't support --version, but we can still try it out and
         # grab the command line.
         ld_command = None
         try:
-            stdout, stderr = shell.execute(
-                command + ldflags + ['-v', '-Wl,--version'],
+            stdout, stderr = env.probe_cache.execute(
+                command + linker_flags + ldflags + ['-v', '-Wl,--version'],
                 stderr=shell.Mode.pipe, returncode='any'
             )
 
@@ -62,6 +79,17 @@ class CcBuilder(object):
         except (OSError, shell.CalledProcessError):
             pass
 
+        raw_linker = None
+        if ld_command:
+            raw_linker = LdLinker(self, env, ld_command, stdout)
+            if env.linker:
+                linker_flags += ['-Wl,' + i for i in raw_linker.thread_flags]
+        ldflags = linker_flags + ldflags
+
+        self.env = env
+        self._lto_command = command + ldflags
+        self._lto_support = {}
+
         self.compiler = CcCompiler(self, env, name, command, cflags_name,
                                    cflags)
         try:
@@ -77,18 +105,43 @@ class CcBuilder(object):
             'shared_library': CcSharedLibraryLinker(
                 self, env, name, command, ldflags, ldlibs
             ),
-            'static_library': ArLinker(self, env),
+            'static_library': ArLinker(self, env, self._lto_ar),
         }
-        if ld_command:
-            self._linkers['raw'] = LdLinker(self, env, ld_command, stdout)
+        if raw_linker:
+            self._linkers['raw'] = raw_linker
 
         self.packages = CcPackageResolver(self, env, command, ldflags)
         self.runner = None
 
     @staticmethod
     def check_command(env, command):
-        return shell.execute(command + ['--version'], env=env.variables,
-                             stderr=shell.Mode.devnull)
+        return env.probe_cache.execute(
+            command + ['--version'], env=env.variables,
+            stderr=shell.Mode.devnull
+        )
+
+    @staticmethod
+    def _use_linker_flags(env, command, ldflags):
+        if not env.linker:
+            return []
+
+        candidates = _fast_linkers if env.linker == 'auto' else [env.linker]
+        for i in candidates:
+            flags = ['-fuse-ld=' + i]
+            try:
+                env.probe_cache.execute(
+                    command + ldflags + flags + ['-Wl,--version'],
+                    env=env.variables, stdout=shell.Mode.devnull,
+                    stderr=shell.Mode.devnull
+                )
+                return flags
+            except (OSError, shell.CalledProcessError):
+                pass
+
+        if env.linker != 'auto':
+            warnings.warn(("'{}' does not support the {} linker; using the " +
+                           'default linker').format(command[0], env.linker))
+        return []
 
     @property
     def flavor(self):
@@ -105,10 +158,94 @@ class CcBuilder(object):
     def linker(self, mode):
         return self._linkers[mode]
 
+    @property
+    def _lto_ar(self):
+        # When using LTO, archives need to be created with an `ar` that can
+        # load the compiler's LTO plugin so that the symbol index is filled.
+        if self.env.lto == 'off' or not self.supports_lto(self.env.lto):
+            return None
+        return {'gcc': 'gcc-ar', 'clang': 'llvm-ar'}.get(self.brand)
+
+    def _lto_mode_flags(self, mode):
+        if self.brand == 'clang':
+            return ['-flto=thin'] if mode == 'thin' else ['-flto']
+        # GCC doesn't have ThinLTO, but it already splits the LTO step into
+        # partitions, which `-flto=auto` (GCC 10+) optimizes in parallel.
+        if ( self.brand == 'gcc' and self.version and
+             self.version in SpecifierSet('>=10') ):
+            return ['-flto=auto']
+        return ['-flto']
+
+    def supports_lto(self, mode):
+        # Cache this on the builder itself (rather than with `memoize`) so
+        # that we don't keep every builder, and its environment, alive.
+        if mode not in self._lto_support:
+            self._lto_support[mode] = self._check_lto(mode)
+        return self._lto_support[mode]
+
+    def _check_lto(self, mode):
+        if self.lang not in _lto_langs:
+            return False
+
+        # Make sure that we can actually compile *and* link with LTO, since
+        # linking requires the linker to be able to load the LTO plugin.
+        flags = self._lto_mode_flags(mode)
+        tmpdir = tempfile.mkdtemp()
+        try:
+            src = os.path.join(tmpdir, 'lto.c')
+            with open(src, 'w') as f:
+                f.write('int main() { return 0; }\n')
+            args = self._lto_command + flags + ['-x', 'c']
+            self.env.probe_cache.execute(
+                args + [src, '-o', os.path.join(tmpdir, 'lto')],
+                key_args=args + ['lto.c'], env=self.env.variables,
+                stdout=shell.Mode.devnull, stderr=shell.Mode.devnull
+            )
+            return True
+        except (OSError, shell.CalledProcessError):
+            warnings.warn("'{}' does not support link-time optimization"
+                          .format(self._lto_command[0]))
+            return False
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def lto_flags(self, mode):
+        if mode == 'off':
+            return ['-fno-lto']
+        return self._lto_mode_flags(mode) if self.supports_lto(mode) else []
+
+    def pgo_flags(self, mode, link=False):
+        if mode == 'off':
+            return []
+
+        pgo_dir = self.env.pgo_dir.string()
+        if self.brand == 'clang':
+            if mode == 'generate':
+                # Use `%m` so that each instrumented binary merges the
+                # profiles from all its runs into a single file.
+                return ['-fprofile-instr-generate=' +
+                        os.path.join(pgo_dir, '%m.profraw')]
+            # The `.profraw` files are merged into this by `pgo-train`.
+            return [] if link else ['-fprofile-instr-use=' +
+                                    os.path.join(pgo_dir, clang_profdata)]
+
+        if mode == 'generate':
+            return ['-fprofile-generate=' + pgo_dir]
+        # Multithreaded programs can produce slightly inconsistent profiles;
+        # tell GCC to fix them up instead of failing.
+        return [] if link else ['-fprofile-use=' + pgo_dir,
+                                '-fprofile-correction']
+
 
 class CcBaseCompiler(BuildCommand):
     def __init__(self, builder, env, rule_name, command_var, command,
                  cflags_name, cflags):
+        # Put the build type's flags first so that the user's flags can
+        # override them.
+        cflags = _build_type_flags.get(env.build_type, []) + cflags
+        if env.lto != 'off':
+            cflags = builder.lto_flags(env.lto) + cflags
+        cflags = builder.pgo_flags(env.pgo) + cflags
         BuildCommand.__init__(self, builder, env, rule_name, command_var,
                               command, flags=(cflags_name, cflags))
 
@@ -128,6 +265,12 @@ class CcBaseCompiler(BuildCommand):
     def deps_flavor(self):
         return None if self.lang in ('f77', 'f95') else 'gcc'
 
+    @property
+    def phony_deps(self):
+        # Whether we can ask the compiler to emit a phony target for each
+        # dependency in the depfile (i.e. `-MP`).
+        return self.builder.brand in ('gcc', 'clang')
+
     @property
     def num_outputs(self):
         return 1
@@ -140,12 +283,15 @@ class CcBaseCompiler(BuildCommand):
         return [os.path.abspath(i) for i in
                 self.env.getvar('CPATH', '').split(os.pathsep)]
 
-    def _call(self, cmd, input, output, deps=None, flags=None):
+    def _call(self, cmd, input, output, deps=None, flags=None,
+              phony_deps=False):
         result = list(chain(
             cmd, self._always_flags, iterate(flags), ['-c', input]
         ))
         if deps:
             result.extend(['-MMD', '-MF', deps])
+            if phony_deps:
+                result.append('-MP')
         result.extend(['-o', output])
         return result
 
@@ -190,6 +336,9 @@ class CcBaseCompiler(BuildCommand):
                 sum((self._include_dir(i) for i in includes), []) +
                 (self._include_pch(pch) if pch else []))
 
+    def lto_flags(self, mode):
+        return self.builder.lto_flags(mode)
+
     def link_flags(self, mode, defines):
         flags = []
         if ( mode in ['shared_library', 'static_library'] and
@@ -214,6 +363,7 @@ class CcCompiler(CcBaseCompiler):
     def __init__(self, builder, env, name, command, cflags_name, cflags):
         CcBaseCompiler.__init__(self, builder, env, name, name, command,
                                 cflags_name, cflags)
+        self.launcher = compiler_launcher(env, builder.lang, name)
 
     @property
     def accepts_pch(self):
@@ -263,6 +413,9 @@ class CcLinker(BuildCommand):
 
     def __init__(self, builder, env, rule_name, command_var, command, ldflags,
                  ldlibs):
+        if env.lto != 'off':
+            ldflags = builder.lto_flags(env.lto) + ldflags
+        ldflags = builder.pgo_flags(env.pgo, link=True) + ldflags
         BuildCommand.__init__(
             self, builder, env, rule_name, command_var, command,
             flags=('ldflags', ldflags), libs=('ldlibs', ldlibs)
@@ -317,10 +470,20 @@ class CcLinker(BuildCommand):
         # and only define the macros if it does.
         return self.env.platform.has_import_library
 
+    @property
+    def accepts_response_file(self):
+        return True
+
+    def response_file(self, name):
+        return safe_str.jbos('@', name)
+
+    def lto_flags(self, mode):
+        return self.builder.lto_flags(mode)
+
     def sysroot(self, strict=False):
         try:
             # XXX: clang doesn't support -print-sysroot.
-            return shell.execute(
+            return self.env.probe_cache.execute(
                 self.command + self.global_flags + ['-print-sysroot'],
                 stderr=shell.Mode.devnull, env=self.env.variables
             ).rstrip()
@@ -333,7 +496,7 @@ class CcLinker(BuildCommand):
     def search_dirs(self, strict=False):
         try:
             # XXX: Will this work for cross-compilation?
-            output = shell.execute(
+            output = self.env.probe_cache.execute(
                 self.command + self.global_flags + ['-print-search-dirs'],
                 stderr=shell.Mode.devnull, env=self.env.variables
             )
@@ -416,9 +579,8 @@ class CcLinker(BuildCommand):
                 brand = 'bfd'
 
             if brand == 'bfd':
-                deps = chain.from_iterable(recursive_deps(i)
-                                           for i in runtime_libs)
-                dep_paths = [i for i in uniques(i.path.parent() for i in deps)]
+                deps = recursive_deps(runtime_libs)
+                dep_paths = uniques(i.path.parent() for i in deps)
                 if dep_paths:
                     result += ['-Wl,-rpath-link,' +
                                safe_str.join(dep_paths, ':')]
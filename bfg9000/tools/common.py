@@ -92,6 +92,36 @@ def check_which(names, *args, **kwargs):
         return shell.listify(names[0])
 
 
+# Languages whose compilers can be wrapped by a compiler launcher like ccache.
+_launcher_langs = ('c', 'c++', 'objc', 'objc++')
+
+
+def compiler_launcher(env, lang, name):
+    """Get the command to launch the compiler `name` (e.g. `cxx`) with, such
+    as `ccache`, or None if there isn't one. This comes from `<NAME>_LAUNCHER`
+    if it's set, or `--compiler-launcher` otherwise; if the launcher is `auto`,
+    use ccache or sccache if either is installed."""
+
+    if lang not in _launcher_langs:
+        return None
+
+    launcher = env.getvar(name.upper() + '_LAUNCHER', env.compiler_launcher)
+    if not launcher:
+        return None
+
+    if launcher == 'auto':
+        try:
+            cmd = which(['ccache', 'sccache'], env.variables,
+                        kind='compiler launcher')
+        except IOError:
+            return None
+    else:
+        cmd = check_which(launcher, env.variables, kind='compiler launcher')
+
+    var = name + '_launcher'
+    return Command(env, var, var, cmd)
+
+
 def choose_builder(env, lang, candidates, builders, cmd_var, flags_var, flags):
     candidates = listify(candidates)
     try:
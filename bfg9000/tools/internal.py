@@ -1,5 +1,6 @@
 from . import tool
 from .common import SimpleCommand
+from ..iterutils import listify
 from ..platforms import platform_name
 from ..safe_str import jbos, safe_str, shell_literal
 from ..shell import shell_list
@@ -11,8 +12,8 @@ class Bfg9000(SimpleCommand):
         SimpleCommand.__init__(self, env, name='bfg9000', env_var='BFG9000',
                                default=env.bfgdir.append('bfg9000'))
 
-    def _call(self, cmd, builddir):
-        return cmd + ['refresh', builddir]
+    def _call(self, cmd, builddir, check=False):
+        return cmd + ['refresh'] + (['--check'] if check else []) + [builddir]
 
 
 @tool('depfixer')
@@ -38,6 +39,28 @@ class JvmOutput(SimpleCommand):
         return cmd + ['-o', output] + subcmd
 
 
+@tool('jobpool')
+class JobPool(SimpleCommand):
+    def __init__(self, env):
+        SimpleCommand.__init__(self, env, name='jobpool', env_var='JOBPOOL',
+                               default=env.bfgdir.append('bfg9000-jobpool'))
+
+    def _call(self, cmd, pool, subcmd, shell=False):
+        return (cmd + (['--shell'] if shell else []) +
+                ['-j', str(pool.depth), pool.lockfile, '--'] +
+                listify(subcmd))
+
+
+@tool('tocgen')
+class TocGen(SimpleCommand):
+    def __init__(self, env):
+        SimpleCommand.__init__(self, env, name='tocgen', env_var='TOCGEN',
+                               default=env.bfgdir.append('bfg9000-tocgen'))
+
+    def _call(self, cmd, library, output):
+        return cmd + ['-o', output, library]
+
+
 if platform_name() == 'windows':
     @tool('setenv')
     class SetEnv(SimpleCommand):
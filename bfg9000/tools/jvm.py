@@ -55,8 +55,9 @@ class JvmBuilder(object):
 
     @staticmethod
     def check_command(env, command):
-        return shell.execute(command + ['-version'], env=env.variables,
-                             stderr=shell.Mode.stdout)
+        return env.probe_cache.execute(command + ['-version'],
+                                       env=env.variables,
+                                       stderr=shell.Mode.stdout)
 
     @property
     def flavor(self):
@@ -166,6 +167,10 @@ class JarMaker(BuildCommand):
     def has_link_macros(self):
         return False
 
+    @property
+    def accepts_response_file(self):
+        return False
+
     def pre_build(self, build, options, name):
         # Fix up paths for the Class-Path field: escape spaces, use forward
         # slashes on Windows, and prefix Windows drive letters with '/' to
@@ -10,7 +10,15 @@ class LdLinker(object):
         self.env = env
         self.command = command
 
-        if 'GNU ld' in version_output:
+        # Check for mold and LLD first, since they describe themselves as
+        # compatible with GNU ld.
+        if 'mold' in version_output:
+            self.brand = 'mold'
+            self.version = detect_version(version_output)
+        elif 'LLD' in version_output:
+            self.brand = 'lld'
+            self.version = detect_version(version_output)
+        elif 'GNU ld' in version_output:
             self.brand = 'bfd'
             self.version = detect_version(version_output)
         elif 'GNU gold' in version_output:
@@ -29,9 +37,25 @@ class LdLinker(object):
     def flavor(self):
         return 'ld'
 
+    @property
+    def thread_flags(self):
+        # lld and mold already link with multiple threads by default, but gold
+        # needs to be asked (and may have been built without thread support).
+        if self.brand != 'gold':
+            return []
+        try:
+            self.env.probe_cache.execute(
+                self.command + ['--threads', '--version'],
+                stdout=shell.Mode.devnull, stderr=shell.Mode.devnull,
+                env=self.env.variables
+            )
+            return ['--threads']
+        except (OSError, shell.CalledProcessError):
+            return []
+
     def search_dirs(self, sysroot='/', strict=False):
         try:
-            output = shell.execute(
+            output = self.env.probe_cache.execute(
                 self.command + ['--verbose'],
                 stderr=shell.Mode.devnull, env=self.env.variables
             )
@@ -0,0 +1,16 @@
+from itertools import chain
+
+from . import tool
+from .common import SimpleCommand
+from ..iterutils import iterate
+
+
+@tool('llvm_profdata')
+class LlvmProfdata(SimpleCommand):
+    def __init__(self, env):
+        SimpleCommand.__init__(self, env, name='llvm_profdata',
+                               env_var='LLVM_PROFDATA',
+                               default='llvm-profdata')
+
+    def _call(self, cmd, output, inputs):
+        return list(chain(cmd, ['merge', '-o', output], iterate(inputs)))
@@ -2,7 +2,8 @@ import os.path
 from itertools import chain
 
 from . import pkg_config
-from .common import BuildCommand, check_which
+from .common import BuildCommand, check_which, compiler_launcher
+from .. import safe_str
 from .. import shell
 from ..arguments.windows import ArgumentParser
 from ..builtins.write_file import WriteFile
@@ -13,6 +14,17 @@ from ..languages import lang2src
 from ..path import Path, Root
 from ..versioning import detect_version
 
+# The optimization, debug-info, and assertion flags for each build type.
+_build_type_flags = {
+    'debug'         : ['/Od', '/Z7'],
+    'release'       : ['/O2', '/DNDEBUG'],
+    'relwithdebinfo': ['/O2', '/Z7', '/DNDEBUG'],
+    'minsize'       : ['/O1', '/DNDEBUG'],
+}
+
+# Build types that should have the linker produce debug info.
+_debug_build_types = ('debug', 'relwithdebinfo')
+
 
 class MsvcBuilder(object):
     def __init__(self, env, lang, name, command, cflags_name, cflags,
@@ -66,8 +78,8 @@ class MsvcBuilder(object):
 
     @staticmethod
     def check_command(env, command):
-        return shell.execute(command + ['/?'], env=env.variables,
-                             stderr=shell.Mode.stdout)
+        return env.probe_cache.execute(command + ['/?'], env=env.variables,
+                                       stderr=shell.Mode.stdout)
 
     @property
     def flavor(self):
@@ -88,6 +100,11 @@ class MsvcBuilder(object):
 class MsvcBaseCompiler(BuildCommand):
     def __init__(self, builder, env, rule_name, command_var, command,
                  cflags_name, cflags):
+        # Put the build type's flags first so that the user's flags can
+        # override them.
+        cflags = _build_type_flags.get(env.build_type, []) + cflags
+        if env.lto != 'off':
+            cflags = self.lto_flags(env.lto) + cflags
         BuildCommand.__init__(self, builder, env, rule_name, command_var,
                               command, flags=(cflags_name, cflags))
 
@@ -146,6 +163,10 @@ class MsvcBaseCompiler(BuildCommand):
         return sum((self._include_dir(i) for i in includes),
                    self._include_pch(pch) if pch else [])
 
+    def lto_flags(self, mode):
+        # MSVC doesn't distinguish between full and thin LTO.
+        return ['/GL-'] if mode == 'off' else ['/GL']
+
     def link_flags(self, mode, defines):
         return ['/D' + i for i in defines]
 
@@ -173,6 +194,7 @@ class MsvcCompiler(MsvcBaseCompiler):
     def __init__(self, builder, env, name, command, cflags_name, cflags):
         MsvcBaseCompiler.__init__(self, builder, env, name, name, command,
                                   cflags_name, cflags)
+        self.launcher = compiler_launcher(env, builder.lang, name)
 
     @property
     def accepts_pch(self):
@@ -255,6 +277,10 @@ class MsvcLinker(BuildCommand):
     }
 
     def __init__(self, builder, env, rule_name, command, ldflags, ldlibs):
+        if env.build_type in _debug_build_types:
+            ldflags = ['/DEBUG'] + ldflags
+        if env.lto != 'off':
+            ldflags = self.lto_flags(env.lto) + ldflags
         BuildCommand.__init__(
             self, builder, env, rule_name, 'vclink', command,
             flags=('ldflags', ldflags), libs=('ldlibs', ldlibs)
@@ -284,6 +310,16 @@ class MsvcLinker(BuildCommand):
     def has_link_macros(self):
         return True
 
+    @property
+    def accepts_response_file(self):
+        return True
+
+    def response_file(self, name):
+        return safe_str.jbos('@', name)
+
+    def lto_flags(self, mode):
+        return ['/LTCG:OFF'] if mode == 'off' else ['/LTCG']
+
     def search_dirs(self, strict=False):
         lib_path = [os.path.abspath(i) for i in
                     self.env.getvar('LIBRARY_PATH', '').split(os.pathsep)]
@@ -380,6 +416,9 @@ class MsvcSharedLibraryLinker(MsvcLinker):
 class MsvcStaticLinker(BuildCommand):
     def __init__(self, builder, env, command):
         global_flags = shell.split(env.getvar('LIBFLAGS', ''))
+        # `lib` needs to know when it's archiving objects built with /GL.
+        if env.lto != 'off':
+            global_flags = ['/LTCG'] + global_flags
         BuildCommand.__init__(self, builder, env, 'vclib', 'vclib', command,
                               flags=('libflags', global_flags))
 
@@ -400,6 +439,13 @@ class MsvcStaticLinker(BuildCommand):
     def has_link_macros(self):
         return True
 
+    @property
+    def accepts_response_file(self):
+        return True
+
+    def response_file(self, name):
+        return safe_str.jbos('@', name)
+
     def _call(self, cmd, input, output, flags=None):
         return list(chain(
             cmd, iterate(flags), iterate(input), ['/OUT:' + output]
@@ -1,5 +1,9 @@
 import argparse
+import os
+import re
+import shlex
 import subprocess
+import sysconfig
 from collections import namedtuple
 
 from . import tool
@@ -7,12 +11,302 @@ from .common import SimpleCommand
 from .. import shell
 from ..exceptions import PackageResolutionError, PackageVersionError
 from ..file_types import Package
+from ..iterutils import uniques
 from ..objutils import memoize
 from ..path import Path, Root
 from ..versioning import check_version, Version
 
 _PkgConfigOptions = namedtuple('_PkgConfigOptions', ['rpath_dirs'])
 
+_version_segment_ex = re.compile(r'[^A-Za-z0-9]*([0-9]+|[A-Za-z]+)')
+_version_ops = {
+    '<':  lambda x: x < 0,
+    '<=': lambda x: x <= 0,
+    '=':  lambda x: x == 0,
+    '!=': lambda x: x != 0,
+    '>=': lambda x: x >= 0,
+    '>':  lambda x: x > 0,
+}
+
+
+def _rpmvercmp(a, b):
+    """Compare two version strings the way pkg-config does (using RPM's
+    algorithm), returning a negative number, zero, or a positive number if `a`
+    is less than, equal to, or greater than `b`, respectively."""
+
+    if a == b:
+        return 0
+
+    i = j = 0
+    while i < len(a) and j < len(b):
+        m1 = _version_segment_ex.match(a, i)
+        m2 = _version_segment_ex.match(b, j)
+        # If we ran out of segments in either, we're done.
+        if not m1 or not m2:
+            i = len(a) if not m1 else i
+            j = len(b) if not m2 else j
+            break
+
+        one, two = m1.group(1), m2.group(1)
+        isnum = one.isdigit()
+        # Numeric segments are always newer than alpha ones.
+        if two.isdigit() != isnum:
+            return 1 if isnum else -1
+
+        if isnum:
+            one, two = one.lstrip('0'), two.lstrip('0')
+            if len(one) != len(two):
+                return 1 if len(one) > len(two) else -1
+        if one != two:
+            return 1 if one > two else -1
+        i, j = m1.end(), m2.end()
+
+    # Whichever version still has characters left over wins.
+    return (i < len(a)) - (j < len(b))
+
+
+class PcFile(object):
+    """A parsed pkg-config `.pc` file. Variables and fields are expanded as
+    they're read, just like pkg-config itself does."""
+
+    _line_ex = re.compile(r'\s*([A-Za-z0-9_.]+)\s*([:=])\s*(.*?)\s*$')
+    _var_ex = re.compile(r'\$\$|\$\{([^}]*)\}')
+    _requires_ex = re.compile(
+        r'([^\s,<>=!]+)(?:\s*(<=|>=|!=|=|<|>)\s*([^\s,]+))?'
+    )
+    _field_aliases = {'CFlags': 'Cflags'}
+
+    def __init__(self, name, path, sysroot='/'):
+        self.name = name
+        self.path = path
+        self.variables = {
+            'pcfiledir': os.path.dirname(path),
+            'pc_sysrootdir': sysroot,
+        }
+        self.fields = {}
+
+        with open(path) as f:
+            data = f.read()
+
+        # Join continued lines and strip comments.
+        data = re.sub(r'\\\r?\n', '', data)
+        for line in data.splitlines():
+            line = re.sub(r'(?<!\\)#.*', '', line).replace('\\#', '#')
+            m = self._line_ex.match(line)
+            if not m:
+                continue
+
+            key, kind, value = m.groups()
+            value = self._expand(value)
+            if kind == '=':
+                self.variables[key] = value
+            else:
+                self.fields[self._field_aliases.get(key, key)] = value
+
+    def _expand(self, value):
+        def repl(m):
+            if m.group(1) is None:
+                return '$'
+            try:
+                return self.variables[m.group(1)]
+            except KeyError:
+                raise ValueError("undefined variable '{}' in {}"
+                                 .format(m.group(1), self.path))
+        return self._var_ex.sub(repl, value)
+
+    @property
+    def version(self):
+        try:
+            return self.fields['Version']
+        except KeyError:
+            raise ValueError('no version for {}'.format(self.path))
+
+    def requires(self, private=False):
+        fields = ['Requires'] + (['Requires.private'] if private else [])
+        for i in fields:
+            for name, op, version in self._requires_ex.findall(
+                    self.fields.get(i, '')):
+                yield name, op, version
+
+    @memoize
+    def flags(self, field):
+        return shlex.split(self.fields.get(field, ''))
+
+
+class PcResolver(object):
+    """A pure-Python implementation of the parts of pkg-config that bfg9000
+    uses. This avoids spawning several pkg-config processes for every package.
+    Anything it can't handle raises an error so that the caller can fall back
+    to the real pkg-config."""
+
+    def __init__(self, env, command=None):
+        self.env = env
+        self.search_dirs = self._search_dirs(env, command)
+        self._files = {}
+        self._walks = {}
+        self._checked = set()
+
+    @staticmethod
+    def _multiarch():
+        return sysconfig.get_config_var('MULTIARCH')
+
+    @classmethod
+    def _default_dirs(cls, env, command):
+        # Ask pkg-config for its compiled-in search path, since that varies
+        # between distros (e.g. `/usr/lib64/pkgconfig`); otherwise, we might
+        # find a different `.pc` file than pkg-config itself would.
+        if command:
+            try:
+                output = env.probe_cache.execute(
+                    command + ['--variable', 'pc_path', 'pkg-config'],
+                    env=env.variables, stderr=shell.Mode.devnull
+                ).strip()
+                if output:
+                    return output.split(os.pathsep)
+            except (OSError, shell.CalledProcessError):
+                pass
+
+        dirs = []
+        multiarch = cls._multiarch()
+        for i in env.platform.lib_dirs:
+            if multiarch:
+                dirs.append(os.path.join(i, multiarch, 'pkgconfig'))
+            dirs.append(os.path.join(i, 'pkgconfig'))
+            parent = os.path.dirname(i)
+            if parent != os.path.dirname(parent):
+                dirs.append(os.path.join(parent, 'share', 'pkgconfig'))
+        return dirs
+
+    @classmethod
+    def _search_dirs(cls, env, command=None):
+        dirs = [i for i in env.getvar('PKG_CONFIG_PATH', '').split(os.pathsep)
+                if i]
+
+        libdir = env.getvar('PKG_CONFIG_LIBDIR')
+        if libdir is not None:
+            return dirs + [i for i in libdir.split(os.pathsep) if i]
+        return uniques(dirs + [i for i in cls._default_dirs(env, command)
+                               if i])
+
+    def _system_dirs(self, variables):
+        def getvar(name, default=''):
+            return [i for i in variables.get(name, default).split(os.pathsep)
+                    if i]
+
+        include_dirs = getvar('PKG_CONFIG_SYSTEM_INCLUDE_PATH', '/usr/include')
+        for i in ('CPATH', 'C_INCLUDE_PATH', 'CPLUS_INCLUDE_PATH'):
+            include_dirs.extend(getvar(i))
+
+        default_lib_dirs = ['/usr/lib', '/lib']
+        multiarch = self._multiarch()
+        if multiarch:
+            default_lib_dirs = sum(
+                ([os.path.join(i, multiarch), i] for i in default_lib_dirs), []
+            )
+        lib_dirs = getvar('PKG_CONFIG_SYSTEM_LIBRARY_PATH',
+                          os.pathsep.join(default_lib_dirs))
+
+        return ([os.path.normpath(i) for i in include_dirs],
+                [os.path.normpath(i) for i in lib_dirs])
+
+    def load(self, name):
+        if name not in self._files:
+            for i in self.search_dirs:
+                if os.path.exists(os.path.join(i, name + '-uninstalled.pc')):
+                    raise ValueError('uninstalled packages not supported')
+
+                path = os.path.join(i, name + '.pc')
+                if os.path.isfile(path):
+                    self._files[name] = PcFile(name, path)
+                    break
+            else:
+                raise PackageResolutionError("unable to find package '{}'"
+                                             .format(name))
+        return self._files[name]
+
+    def _check_version(self, pc, op, version):
+        key = (pc.name, op, version)
+        if key not in self._checked:
+            if not _version_ops[op](_rpmvercmp(pc.version, version)):
+                raise PackageVersionError(
+                    "{} version {} doesn't meet requirement {}{}"
+                    .format(pc.name, pc.version, op, version)
+                )
+            self._checked.add(key)
+
+    def _walk(self, name, private):
+        # Return the package and everything it requires, with each package
+        # listed before the packages it depends on. This is the order
+        # pkg-config emits flags in, which matters when linking statically.
+        key = (name, private)
+        if key in self._walks:
+            return self._walks[key]
+
+        seen = set()
+        postorder = []
+
+        def visit(pc):
+            seen.add(pc.name)
+            for dep, op, version in reversed(list(pc.requires(private))):
+                dep_pc = self.load(dep)
+                if op:
+                    self._check_version(dep_pc, op, version)
+                if dep not in seen:
+                    visit(dep_pc)
+            postorder.append(pc)
+
+        visit(self.load(name))
+        result = self._walks[key] = postorder[::-1]
+        return result
+
+    def query(self, name, type, static=False, env=None):
+        variables = dict(self.env.variables)
+        variables.update(env or {})
+        if variables.get('PKG_CONFIG_SYSROOT_DIR'):
+            raise ValueError('sysroots not supported')
+
+        if type == 'version':
+            return self.load(name).version
+
+        if type == 'cflags':
+            # Like pkg-config, always include Requires.private for cflags.
+            fields = ['Cflags'] + (['Cflags.private'] if static else [])
+            packages = self._walk(name, True)
+        else:
+            fields = ['Libs'] + (['Libs.private'] if static else [])
+            packages = self._walk(name, static)
+        flags = [j for i in packages for f in fields for j in i.flags(f)]
+
+        include_dirs, lib_dirs = self._system_dirs(variables)
+        if variables.get('PKG_CONFIG_ALLOW_SYSTEM_CFLAGS'):
+            include_dirs = []
+        if variables.get('PKG_CONFIG_ALLOW_SYSTEM_LIBS'):
+            lib_dirs = []
+
+        def is_system(flag, prefix, dirs):
+            return os.path.normpath(flag[len(prefix):]) in dirs
+
+        result = []
+        for i in flags:
+            if i.startswith('-I'):
+                if not is_system(i, '-I', include_dirs) and i not in result:
+                    result.append(i)
+            elif i.startswith('-L'):
+                if ( type in ('lib_dirs', 'ldflags') and
+                     not is_system(i, '-L', lib_dirs) and i not in result ):
+                    result.append(i)
+            elif i.startswith('-l'):
+                if type == 'ldlibs':
+                    # Keep the *last* instance of each library so that static
+                    # libraries come after everything that uses them.
+                    if i in result:
+                        result.remove(i)
+                    result.append(i)
+            elif type in ('cflags', 'ldflags'):
+                if not result or result[-1] != i:
+                    result.append(i)
+        return result
+
 
 @tool('pkg_config')
 class PkgConfig(SimpleCommand):
@@ -28,6 +322,13 @@ class PkgConfig(SimpleCommand):
         SimpleCommand.__init__(self, env, name='pkg_config',
                                env_var='PKG_CONFIG', default='pkg-config')
 
+        # If the user asked for a particular pkg-config, respect that;
+        # otherwise, try to resolve packages ourselves.
+        if env.getvar('PKG_CONFIG') is None and env.platform.name != 'windows':
+            self.resolver = PcResolver(env, self.command)
+        else:
+            self.resolver = None
+
     def _call(self, cmd, name, type, static=False, msvc_syntax=False):
         result = cmd + [name] + self._options[type]
         if static:
@@ -36,13 +337,24 @@ class PkgConfig(SimpleCommand):
             result.append('--msvc-syntax')
         return result
 
+    def query(self, name, type, static=False, msvc_syntax=False, env=None):
+        if self.resolver and not msvc_syntax:
+            try:
+                return self.resolver.query(name, type, static, env)
+            except (IOError, ValueError, PackageResolutionError):
+                pass
+
+        kwargs = {'env': env} if env else {}
+        output = self.run(name, type, static, msvc_syntax, **kwargs).strip()
+        return output if type == 'version' else shell.split(output)
+
 
 class PkgConfigPackage(Package):
     def __init__(self, name, format, specifier, kind, pkg_config):
         self._pkg_config = pkg_config
 
         try:
-            version = Version(self._pkg_config.run(name, 'version').strip())
+            version = Version(self._pkg_config.query(name, 'version'))
         except subprocess.CalledProcessError:
             raise PackageResolutionError("unable to find package '{}'"
                                          .format(name))
@@ -55,7 +367,7 @@ class PkgConfigPackage(Package):
 
     @memoize
     def _call(self, *args, **kwargs):
-        return shell.split(self._pkg_config.run(*args, **kwargs).strip())
+        return self._pkg_config.query(*args, **kwargs)
 
     def cflags(self, compiler, output):
         return self._call(self.name, 'cflags', self.static,
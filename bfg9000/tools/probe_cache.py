@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+
+from .. import shell
+from ..path import which
+
+# Environment variables that can affect the result of probing a toolchain
+# (e.g. the libraries a compiler driver searches, or the `ld` it picks).
+key_vars = ['PATH', 'CC', 'CFLAGS', 'CPATH', 'LDFLAGS', 'LIBRARY_PATH']
+
+
+class ProbeCache(object):
+    """A persistent cache for the output of running toolchain probes (e.g.
+    `cc --version`). Entries are keyed on the command line, how its output is
+    captured, the resolved executable (and its mtime and size), and the values
+    of `key_vars`, so changing any of these will cause the probe to be re-run.
+    Failed probes aren't cached, since they often depend on things we can't
+    see (e.g. whether some other tool has been installed since)."""
+
+    version = 2
+
+    def __init__(self, path=None, user_path=None):
+        self._path = path
+        self._user_path = user_path
+        self._seen = set()
+        self._dirty = False
+
+        self._map = {}
+        for i in (user_path, path):
+            if i:
+                try:
+                    self._map.update(self._load(i))
+                except (IOError, ValueError):
+                    pass
+
+    @classmethod
+    def _load(cls, path):
+        with open(path) as inp:
+            state = json.load(inp)
+        if state['version'] > cls.version:
+            raise ValueError('saved version exceeds expected version')
+        # Older versions used different keys (and cached failures), so just
+        # throw their entries away.
+        if state['version'] < cls.version:
+            return {}
+        return state['data']
+
+    @staticmethod
+    def _key(args, env, kwargs):
+        env = os.environ if env is None else env
+        try:
+            exe = os.path.realpath(which([[args[0]]], env, resolve=True)[0])
+            stat = os.stat(exe)
+        except (IOError, OSError):
+            # If we can't find the executable, don't bother caching anything;
+            # the probe itself will fail in the usual way.
+            return None
+
+        key = json.dumps([
+            list(args), exe, stat.st_mtime, stat.st_size,
+            [env.get(i) for i in key_vars],
+            sorted((k, str(v)) for k, v in kwargs.items())
+        ])
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def execute(self, args, env=None, key_args=None, **kwargs):
+        """Run `args`, returning the cached result if we have one. If the
+        command line contains something that changes from run to run (e.g. a
+        temporary file), pass a stable equivalent as `key_args` to use for
+        looking it up in the cache."""
+
+        key = self._key(key_args or args, env, kwargs)
+        if key is None:
+            return shell.execute(args, env=env, **kwargs)
+
+        if key not in self._map:
+            # If this raises, we won't cache anything, so the probe will be
+            # re-run next time.
+            output = shell.execute(args, env=env, **kwargs)
+            self._map[key] = {'output': output}
+            self._dirty = True
+
+        self._seen.add(key)
+        output = self._map[key]['output']
+        # Multiple outputs (stdout and stderr) come back as a tuple.
+        return tuple(output) if isinstance(output, list) else output
+
+    def save(self):
+        if not self._dirty:
+            return
+
+        if self._path:
+            # Only save the probes we ran this time. Skip ones we didn't see.
+            self._save(self._path, {k: v for k, v in self._map.items()
+                                    if k in self._seen})
+        if self._user_path:
+            try:
+                data = self._load(self._user_path)
+            except (IOError, ValueError):
+                data = {}
+            data.update(self._map)
+            self._save(self._user_path, data)
+        self._dirty = False
+
+    def _save(self, path, data):
+        with open(path, 'w') as out:
+            json.dump({
+                'version': self.version,
+                'data': data,
+            }, out)
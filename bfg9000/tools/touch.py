@@ -0,0 +1,15 @@
+from itertools import chain
+
+from . import tool
+from .common import SimpleCommand
+from ..iterutils import iterate
+
+
+@tool('touch')
+class Touch(SimpleCommand):
+    def __init__(self, env):
+        SimpleCommand.__init__(self, env, name='touch', env_var='TOUCH',
+                               default='touch')
+
+    def _call(self, cmd, files):
+        return list(chain(cmd, iterate(files)))
@@ -63,6 +63,12 @@ if os.getenv('NO_DOPPEL') not in ['1', 'true']:
 if sys.version_info < (3, 4):
     more_requires.append('enum34')
 
+if sys.version_info < (3, 0):
+    more_requires.append('futures')
+
+if sys.version_info < (3, 5):
+    more_requires.append('scandir')
+
 platform_name = platform.system()
 if platform_name == 'Windows':
     more_scripts.extend([
@@ -130,6 +136,8 @@ setup(
             '9k=bfg9000.driver:simple_main',
             'bfg9000-depfixer=bfg9000.depfixer:main',
             'bfg9000-jvmoutput=bfg9000.jvmoutput:main',
+            'bfg9000-jobpool=bfg9000.jobpool:main',
+            'bfg9000-tocgen=bfg9000.tocgen:main',
         ] + more_scripts,
         'bfg9000.backends': [
             'make=bfg9000.backends.make.writer',
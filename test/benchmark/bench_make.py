@@ -0,0 +1,61 @@
+# Micro-benchmark for writing a large Makefile. Run with:
+#
+#   python -m test.benchmark.bench_make [NUM_RULES]
+
+from __future__ import print_function
+
+import hashlib
+import sys
+import timeit
+from six.moves import cStringIO as StringIO
+
+from bfg9000 import safe_str
+from bfg9000.backends.make.syntax import Call, Makefile, Section, var
+from bfg9000.path import Path, Root
+
+
+def make_makefile(num_rules):
+    makefile = Makefile('build.bfg')
+    makefile.variable('CXX', 'c++', Section.command)
+    makefile.variable('CXXFLAGS', ['-O2', '-Wall', '-DNAME="a b"'],
+                      Section.flags)
+    makefile.define('RULE_CXX', [[
+        var('CXX'), var('CXXFLAGS'), '-c', safe_str.literal('$1'), '-o',
+        safe_str.literal('$2')
+    ]])
+
+    objs = []
+    for i in range(num_rules):
+        src = Path('src/dir {}/file{}.cpp'.format(i % 100, i), Root.srcdir)
+        obj = Path('obj/dir {}/file{}.o'.format(i % 100, i))
+        objs.append(obj)
+        makefile.rule(
+            target=[obj, obj.addext('.d')], deps=src,
+            order_only=obj.parent().append('.dir'),
+            recipe=[Call('RULE_CXX', src, obj)],
+            variables={'CXXFLAGS': ['-I', src.parent()]}
+        )
+    makefile.rule(target=Path('all'), deps=objs, phony=True)
+    return makefile
+
+
+def write(makefile):
+    out = StringIO()
+    makefile.write(out)
+    return out.getvalue()
+
+
+def main():
+    num_rules = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    makefile = make_makefile(num_rules)
+
+    # Only write the file once, since some of the work is cached between runs.
+    t = timeit.timeit(lambda: write(makefile), number=1)
+    print('write {} rules: {:.3f}s'.format(num_rules, t))
+    print('sha1: {}'.format(
+        hashlib.sha1(write(makefile).encode('utf-8')).hexdigest()
+    ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# Micro-benchmark for writing a large build.ninja file. Run with:
+#
+#   python -m test.benchmark.bench_ninja [NUM_EDGES]
+
+from __future__ import print_function
+
+import hashlib
+import sys
+import timeit
+from six.moves import cStringIO as StringIO
+
+from bfg9000 import safe_str
+from bfg9000.backends.ninja.syntax import NinjaFile, Section
+from bfg9000.path import Path, Root
+
+
+def make_ninjafile(num_edges):
+    ninjafile = NinjaFile('build.bfg')
+    ninjafile.variable('cxx', 'c++', Section.command)
+    ninjafile.variable('cxxflags', ['-O2', '-Wall', '-DNAME="a b"'],
+                       Section.flags)
+    ninjafile.rule('cxx', command=[
+        safe_str.literal('$cxx'), safe_str.literal('$cxxflags'), '-c',
+        safe_str.literal('$in'), '-o', safe_str.literal('$out')
+    ], depfile=safe_str.literal('$out.d'), deps='gcc')
+
+    objs = []
+    for i in range(num_edges):
+        src = Path('src/dir {}/file{}.cpp'.format(i % 100, i), Root.srcdir)
+        obj = Path('obj/dir {}/file{}.o'.format(i % 100, i))
+        objs.append(obj)
+        ninjafile.build(output=obj, rule='cxx', inputs=src,
+                        variables={'cxxflags': ['-I', src.parent()]})
+    ninjafile.build(output=Path('all'), rule='phony', inputs=objs)
+    return ninjafile
+
+
+def write(ninjafile):
+    out = StringIO()
+    ninjafile.write(out)
+    return out.getvalue()
+
+
+def main():
+    num_edges = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    ninjafile = make_ninjafile(num_edges)
+
+    # Only write the file once, since some of the work is cached between runs.
+    t = timeit.timeit(lambda: write(ninjafile), number=1)
+    print('write {} edges: {:.3f}s'.format(num_edges, t))
+    print('sha1: {}'.format(
+        hashlib.sha1(write(ninjafile).encode('utf-8')).hexdigest()
+    ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# Micro-benchmark for creating, hashing, and writing lots of Path objects, like
+# a configure for a project with many files would. Run with:
+#
+#   python -m test.benchmark.bench_path [NUM_FILES]
+
+from __future__ import print_function
+
+import sys
+import timeit
+from six.moves import cStringIO as StringIO
+
+from bfg9000.backends.make.syntax import Syntax, Writer
+from bfg9000.path import Path, Root
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+def configure(num_files):
+    paths = set()
+    for i in range(num_files):
+        src = Path('src', Root.srcdir).append('dir{}'.format(i % 100)).append(
+            'file{}.cpp'.format(i)
+        )
+        obj = src.reroot().stripext('.o')
+        dep = obj.addext('.d')
+        paths.update((src, obj, dep, obj.parent()))
+    return paths
+
+
+def write(paths):
+    out = Writer(StringIO())
+    for _ in range(3):
+        for i in paths:
+            out.write(i, Syntax.shell)
+
+
+def memory(num_files):
+    tracemalloc.start()
+    paths = configure(num_files)
+    result = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return len(paths), result
+
+
+def main():
+    num_files = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    paths = configure(num_files)
+
+    t = min(timeit.repeat(lambda: configure(num_files), number=1, repeat=3))
+    print('create {} paths: {:.3f}s'.format(len(paths), t))
+    t = min(timeit.repeat(lambda: write(paths), number=1, repeat=3))
+    print('write {} paths x3: {:.3f}s'.format(len(paths), t))
+
+    if tracemalloc:
+        # Paths are interned, so drop ours first; otherwise, `configure()`
+        # would just reuse them and we'd measure almost nothing.
+        paths = None
+        num_paths, size = memory(num_files)
+        print('memory for {} paths: {:.1f} MiB'.format(
+            num_paths, size / 1024.0 / 1024.0
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,10 @@
+#include <iostream>
+
+int main() {
+#ifdef NDEBUG
+  std::cout << "assertions disabled" << std::endl;
+#else
+  std::cout << "assertions enabled" << std::endl;
+#endif
+  return 0;
+}
@@ -0,0 +1,8 @@
+#ifndef INC_LIBRARY_HPP
+#define INC_LIBRARY_HPP
+
+#include <string>
+
+std::string hello();
+
+#endif
@@ -0,0 +1,15 @@
+#include <cstdlib>
+#include <iostream>
+
+int main(int argc, char **argv) {
+  int n = argc > 1 ? std::atoi(argv[1]) : 10;
+  long sum = 0;
+  for(int i = 0; i < n; i++) {
+    if(i % 3 == 0)
+      sum += i;
+    else
+      sum -= 1;
+  }
+  std::cout << sum << std::endl;
+  return 0;
+}
@@ -0,0 +1,6 @@
+#ifndef INC_LIBRARY_HPP
+#define INC_LIBRARY_HPP
+
+void hello();
+
+#endif
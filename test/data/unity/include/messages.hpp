@@ -0,0 +1,9 @@
+#ifndef INC_MESSAGES_HPP
+#define INC_MESSAGES_HPP
+
+void hello();
+void goodbye();
+void first();
+void second();
+
+#endif
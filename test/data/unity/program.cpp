@@ -0,0 +1,9 @@
+#include "messages.hpp"
+
+int main() {
+  hello();
+  first();
+  second();
+  goodbye();
+  return 0;
+}
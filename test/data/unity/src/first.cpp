@@ -0,0 +1,7 @@
+#include "messages.hpp"
+
+#include <iostream>
+
+void first() {
+  std::cout << "first" << std::endl;
+}
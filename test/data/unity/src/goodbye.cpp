@@ -0,0 +1,7 @@
+#include "messages.hpp"
+
+#include <iostream>
+
+void goodbye() {
+  std::cout << "goodbye" << std::endl;
+}
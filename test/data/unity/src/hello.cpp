@@ -0,0 +1,7 @@
+#include "messages.hpp"
+
+#include <iostream>
+
+void hello() {
+  std::cout << "hello" << std::endl;
+}
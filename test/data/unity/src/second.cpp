@@ -0,0 +1,7 @@
+#include "messages.hpp"
+
+#include <iostream>
+
+void second() {
+  std::cout << "second" << std::endl;
+}
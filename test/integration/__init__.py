@@ -18,7 +18,9 @@ examples_dir = os.path.join(this_dir, '..', '..', 'examples')
 test_data_dir = os.path.join(this_dir, '..', 'data')
 test_stage_dir = os.path.join(this_dir, '..', 'stage')
 
-env = Environment(None, None, None, None, None, None, (False, False), None)
+env = Environment(None, None, None, None, None, None, (False, False), None,
+                  None, None, None, 'off', 'off', None, None, None,
+                  False)
 
 Target = namedtuple('Target', ['name', 'path'])
 
@@ -0,0 +1,24 @@
+from . import *
+
+
+class TestBuildType(IntegrationTest):
+    def __init__(self, *args, **kwargs):
+        IntegrationTest.__init__(self, 'build_type', configure=False, *args,
+                                 **kwargs)
+
+    def test_default(self):
+        self.configure()
+        self.build()
+        self.assertOutput([executable('program')], 'assertions enabled\n')
+
+    def test_debug(self):
+        self.configure(extra_args=['--build-type', 'debug'])
+        self.build()
+        self.assertOutput([executable('program-debug')],
+                          'assertions enabled\n')
+
+    def test_release(self):
+        self.configure(extra_args=['--build-type', 'release'])
+        self.build()
+        self.assertOutput([executable('program-release')],
+                          'assertions disabled\n')
@@ -0,0 +1,35 @@
+import json
+import os.path
+
+from . import *
+pjoin = os.path.join
+
+
+@skip_if_backend('msbuild')
+class TestCompileCommands(IntegrationTest):
+    def __init__(self, *args, **kwargs):
+        IntegrationTest.__init__(
+            self, pjoin(examples_dir, '02_library'), *args, **kwargs
+        )
+
+    def test_compile_commands(self):
+        with open(pjoin(self.builddir, 'compile_commands.json')) as f:
+            commands = json.load(f)
+
+        self.assertEqual(
+            sorted(os.path.basename(i['file']) for i in commands),
+            ['library.cpp', 'program.cpp']
+        )
+        for i in commands:
+            self.assertEqual(os.path.realpath(i['directory']),
+                             os.path.realpath(self.builddir))
+            self.assertTrue(os.path.isabs(i['file']))
+            self.assertIn(i['file'], i['arguments'])
+            self.assertIn(i['output'], i['arguments'])
+
+    def test_unchanged(self):
+        filename = pjoin(self.builddir, 'compile_commands.json')
+        mtime = os.path.getmtime(filename)
+        self.wait()
+        self.assertPopen(['bfg9000', 'refresh', self.builddir])
+        self.assertEqual(os.path.getmtime(filename), mtime)
@@ -109,6 +109,26 @@ class TestStaticLibrary(IntegrationTest):
         ])
 
 
+class TestThinArchive(IntegrationTest):
+    def __init__(self, *args, **kwargs):
+        IntegrationTest.__init__(self, 'thin_archive', install=True, *args,
+                                 **kwargs)
+
+    def test_build(self):
+        self.build()
+        self.assertOutput([executable('program')], 'hello, library!\n')
+
+    @skip_if_backend('msbuild')
+    def test_install(self):
+        self.build('install')
+
+        lib = pjoin(self.libdir, static_library('library').path)
+        self.assertDirectory(self.installdir, [lib])
+        # The installed library should always be a real archive.
+        with open(lib, 'rb') as f:
+            self.assertEqual(f.read(8), b'!<arch>\n')
+
+
 class TestDualUseLibrary(IntegrationTest):
     lib_names = ['inner', 'middle', 'outer']
 
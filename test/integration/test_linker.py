@@ -0,0 +1,21 @@
+import os.path
+
+from . import *
+
+
+class TestLinker(IntegrationTest):
+    def __init__(self, *args, **kwargs):
+        IntegrationTest.__init__(
+            self, os.path.join(examples_dir, '02_library'), configure=False,
+            *args, **kwargs
+        )
+
+    def test_auto(self):
+        self.configure(extra_args=['--linker', 'auto'])
+        self.build()
+        self.assertOutput([executable('program')], 'hello, library!\n')
+
+    def test_bfd(self):
+        self.configure(extra_args=['--linker', 'bfd'])
+        self.build()
+        self.assertOutput([executable('program')], 'hello, library!\n')
@@ -0,0 +1,16 @@
+from . import *
+
+
+class TestLto(IntegrationTest):
+    def __init__(self, *args, **kwargs):
+        IntegrationTest.__init__(self, 'lto', configure=False, *args, **kwargs)
+
+    def test_per_target(self):
+        self.configure()
+        self.build()
+        self.assertOutput([executable('program')], 'hello from library!\n')
+
+    def test_global(self):
+        self.configure(extra_args=['--lto', 'full'])
+        self.build()
+        self.assertOutput([executable('program')], 'hello from library!\n')
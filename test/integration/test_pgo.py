@@ -0,0 +1,29 @@
+from . import *
+
+pgo_dir = os.path.join(test_stage_dir, 'pgo-data')
+
+
+@unittest.skipIf(env.builder('c++').flavor != 'cc',
+                 'PGO is only supported for cc-like compilers')
+@skip_if_backend('msbuild')
+class TestPgo(IntegrationTest):
+    def __init__(self, *args, **kwargs):
+        IntegrationTest.__init__(self, 'pgo', configure=False, *args,
+                                 **kwargs)
+
+    def test_build(self):
+        cleandir(pgo_dir, recreate=False)
+        self.configure(extra_args=['--pgo', 'generate', '--pgo-dir', pgo_dir])
+        self.build()
+        self.build('pgo-train')
+        self.assertTrue(os.path.exists(os.path.join(pgo_dir,
+                                                    'profile.stamp')))
+
+        self.configure(extra_args=['--pgo', 'use', '--pgo-dir', pgo_dir])
+        self.build()
+        self.assertOutput([executable('program'), '10'], '12\n')
+
+    def test_use_without_profile(self):
+        cleandir(pgo_dir, recreate=False)
+        with self.assertRaises(SubprocessError):
+            self.configure(extra_args=['--pgo', 'use', '--pgo-dir', pgo_dir])
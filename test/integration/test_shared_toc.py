@@ -0,0 +1,38 @@
+import os.path
+
+from . import *
+pjoin = os.path.join
+
+
+class TestSharedToc(IntegrationTest):
+    def __init__(self, *args, **kwargs):
+        IntegrationTest.__init__(
+            self, pjoin(examples_dir, '02_library'), configure=False,
+            stage_src=True, *args, **kwargs
+        )
+
+    @only_if_backend('ninja')
+    def test_build(self):
+        self.configure(extra_args=['--enable-shared-toc'])
+        self.build()
+        self.assertExists(pjoin(self.builddir, 'liblibrary.so.TOC'))
+        self.assertOutput([executable('program')], 'hello, library!\n')
+
+    @only_if_backend('ninja')
+    def test_no_relink(self):
+        self.configure(extra_args=['--enable-shared-toc'])
+        self.build()
+        program = pjoin(self.builddir, 'program')
+        mtime = os.path.getmtime(program)
+
+        # Change the library's implementation, but not its exported symbols.
+        self.wait()
+        filename = pjoin(self.srcdir, 'library.cpp')
+        with open(filename) as inp:
+            source = inp.read()
+        with open(filename, 'w') as out:
+            out.write(source.replace('hello, library!', 'goodbye, library!'))
+
+        self.build()
+        self.assertEqual(os.path.getmtime(program), mtime)
+        self.assertOutput([executable('program')], 'goodbye, library!\n')
@@ -0,0 +1,81 @@
+import json
+import os.path
+import subprocess
+import sys
+from distutils.spawn import find_executable
+
+from . import *
+pjoin = os.path.join
+
+# These modules are slow to import, and shouldn't be needed just to start up
+# bfg9000 or to regenerate a build (unless we're using MSBuild, which needs
+# lxml).
+slow_modules = ['pkg_resources', 'lxml']
+
+# Set this to the maximum number of seconds each bfg9000 invocation should take
+# to catch regressions in startup time.
+time_budget = os.getenv('BFG9000_STARTUP_BUDGET')
+
+# Run bfg9000 in-process (rather than via the `bfg9000` script, which may
+# import pkg_resources itself depending on how it was installed) and report
+# how long it took and which modules it loaded. The first argument is the path
+# to the real `bfg9000` script, so that bfg9000 can find its helper scripts.
+runner = """
+import json, sys, time
+start = time.time()
+from bfg9000.driver import main
+sys.argv = sys.argv[1:]
+try:
+    result = main()
+except SystemExit as e:
+    result = e.code
+sys.stderr.write(json.dumps({
+    'result': result,
+    'time': time.time() - start,
+    'modules': sorted(sys.modules),
+}) + '\\n')
+"""
+
+
+class TestStartup(IntegrationTest):
+    def __init__(self, *args, **kwargs):
+        IntegrationTest.__init__(
+            self, pjoin(examples_dir, '01_executable'), configure=False,
+            *args, **kwargs
+        )
+
+    def run_bfg9000(self, *args):
+        proc = subprocess.Popen(
+            [sys.executable, '-c', runner, find_executable('bfg9000')] +
+            list(args),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True
+        )
+        err = proc.communicate()[1]
+        stats = json.loads(err.strip().splitlines()[-1])
+        self.assertIn(stats['result'], [0, None], err)
+        for i in slow_modules:
+            if not (i == 'lxml' and self.backend == 'msbuild'):
+                self.assertNotIn(i, stats['modules'])
+        if time_budget:
+            self.assertLess(stats['time'], float(time_budget))
+
+    def test_version(self):
+        self.run_bfg9000('--version')
+
+    def test_configure(self):
+        cleandir(self.builddir)
+        self.run_bfg9000('configure-into', '--backend', self.backend,
+                         self.srcdir, self.builddir)
+
+    def test_configure_default_backend(self):
+        # Picking the default backend shouldn't need to look for third-party
+        # backends (and import pkg_resources to do so).
+        cleandir(self.builddir)
+        self.run_bfg9000('configure-into', self.srcdir, self.builddir)
+
+    def test_refresh(self):
+        cleandir(self.builddir)
+        self.run_bfg9000('configure-into', '--backend', self.backend,
+                         self.srcdir, self.builddir)
+        self.run_bfg9000('refresh', self.builddir)
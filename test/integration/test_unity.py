@@ -0,0 +1,58 @@
+import json
+
+from . import *
+
+
+class TestUnity(IntegrationTest):
+    def __init__(self, *args, **kwargs):
+        IntegrationTest.__init__(self, 'unity', configure=False, *args,
+                                 **kwargs)
+
+    def test_build(self):
+        self.configure()
+        self.build()
+        self.assertOutput([executable('program')],
+                          'hello\nfirst\nsecond\ngoodbye\n')
+        self.assertExists(os.path.join('src', 'hello.unity.cpp'))
+        self.assertNotExists(os.path.join('src', 'first.unity.cpp'))
+
+    def test_batch_size(self):
+        self.configure(extra_args=['--unity-batch-size', '3'])
+        self.build()
+        self.assertOutput([executable('program')],
+                          'hello\nfirst\nsecond\ngoodbye\n')
+        # `library` explicitly sets its batch size, so it shouldn't be
+        # affected.
+        self.assertExists(os.path.join('src', 'hello.unity.cpp'))
+        self.assertExists(os.path.join('src', 'first.unity.cpp'))
+
+    @skip_if_backend('msbuild')
+    def test_compile_commands(self):
+        self.configure()
+        with open(os.path.join(self.builddir, 'compile_commands.json')) as f:
+            commands = json.load(f)
+
+        # Sources batched into a unity file should each get their own entry.
+        self.assertEqual(
+            sorted(os.path.basename(i['file']) for i in commands),
+            ['first.cpp', 'goodbye.cpp', 'hello.cpp', 'program.cpp',
+             'second.cpp']
+        )
+        for i in commands:
+            self.assertIn(i['file'], i['arguments'])
+
+
+class TestUnityGenerated(IntegrationTest):
+    def __init__(self, *args, **kwargs):
+        IntegrationTest.__init__(
+            self, os.path.join(examples_dir, '09_custom_steps'),
+            configure=False, *args, **kwargs
+        )
+
+    def test_build(self):
+        # `goodbye.cpp` is generated, so it shouldn't be batched with
+        # `main.cpp`.
+        self.configure(extra_args=['--unity-batch-size', '2'])
+        self.build(executable('goodbye'))
+        self.assertOutput([executable('goodbye')], 'goodbye from python!\n')
+        self.assertNotExists('main.unity.cpp')
@@ -1,6 +1,15 @@
+import hashlib
+import json
+import os
+import posixpath
+import shutil
+import tempfile
 import unittest
 
-from bfg9000.builtins.find import _filter_from_glob, FindResult
+from bfg9000.builtins import find
+from bfg9000.builtins.find import (_filter_from_glob, _find_files,
+                                   _walk_flat, _walk_recursive, FindCache,
+                                   FindResult)
 
 
 class TestFilterFromGlob(unittest.TestCase):
@@ -45,3 +54,192 @@ class TestFilterFromGlob(unittest.TestCase):
         self.assertEqual(f('foo.hpp', 'foo.hpp', 'f'), FindResult.exclude)
         self.assertEqual(f('foo.cpp', 'foo.cpp', 'f'), FindResult.include)
         self.assertEqual(f('foo.ipp', 'foo.ipp', 'f'), FindResult.not_now)
+
+
+class TestWalk(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.top = self.tmpdir.replace(os.sep, '/')
+        for i in ('a/b', 'a/c', 'd', '.git/objects', 'build/obj'):
+            os.makedirs(os.path.join(self.tmpdir, i))
+        for i in ('file', 'a/file', 'a/b/file', 'd/file', '.git/HEAD',
+                  'build/obj/file'):
+            open(os.path.join(self.tmpdir, i), 'w').close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _join(self, *args):
+        return posixpath.join(self.top, *args)
+
+    def _simple_walk(self, top):
+        # A naive top-down walk to compare against.
+        names = os.listdir(top)
+        dirs = [i for i in names if os.path.isdir(posixpath.join(top, i))]
+        yield (top, [(i, posixpath.join(top, i)) for i in dirs],
+               [(i, posixpath.join(top, i)) for i in names if i not in dirs])
+        for i in dirs:
+            for j in self._simple_walk(posixpath.join(top, i)):
+                yield j
+
+    def test_walk_flat(self):
+        result = list(_walk_flat(self.top))
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0][0], self.top)
+        self.assertEqual(sorted(result[0][1]), [
+            ('.git', self._join('.git')), ('a', self._join('a')),
+            ('build', self._join('build')), ('d', self._join('d')),
+        ])
+        self.assertEqual(result[0][2], [('file', self._join('file'))])
+
+    def test_walk_recursive(self):
+        # `.git` should be listed, but not walked.
+        expected = [i for i in self._simple_walk(self.top)
+                    if '.git' not in i[0]]
+        self.assertIn(('.git', self._join('.git')), expected[0][1])
+        self.assertEqual(list(_walk_recursive(self.top)), expected)
+
+    def test_walk_parallel(self):
+        expected = list(_walk_recursive(self.top))
+        old_threads = find.walk_threads
+        try:
+            find.walk_threads = 2
+            self.assertEqual(list(_walk_recursive(self.top)), expected)
+        finally:
+            find.walk_threads = old_threads
+
+    def test_skip_dirs(self):
+        skip_dirs = {os.path.abspath(self._join('build'))}
+        result = list(_walk_recursive(self.top, skip_dirs))
+        self.assertEqual(sorted(i[0] for i in result), [
+            self.top, self._join('a'), self._join('a', 'b'),
+            self._join('a', 'c'), self._join('d'),
+        ])
+
+    def test_nonexistent(self):
+        self.assertEqual(list(_walk_recursive(self._join('nonexist'))), [])
+        self.assertEqual(list(_walk_flat(self._join('nonexist'))), [])
+
+
+class TestFindCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.top = posixpath.join(self.tmpdir.replace(os.sep, '/'), 'src')
+        self.cache_path = os.path.join(self.tmpdir, 'cache')
+        for i in ('a', 'b'):
+            os.makedirs(os.path.join(self.top, i))
+            open(os.path.join(self.top, i, 'file.cpp'), 'w').close()
+        self._age()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _age(self, *dirs):
+        # Make the directories look old enough to be cached.
+        for i in dirs or ('', 'a', 'b'):
+            os.utime(os.path.join(self.top, i), (1000000000, 1000000000))
+
+    def _find(self, cache, name='*.cpp', key='key'):
+        f = _filter_from_glob('f', name, None, None)
+        return _find_files([self.top], f, False, False, cache=cache,
+                           cache_key=key)[0]
+
+    def test_reuse(self):
+        cache = FindCache(self.cache_path)
+        expected = self._find(cache)
+        self.assertEqual(sorted(expected), [
+            posixpath.join(self.top, 'a', 'file.cpp'),
+            posixpath.join(self.top, 'b', 'file.cpp'),
+        ])
+        cache.save()
+
+        # Sneakily add a file without updating the mtime; the cache shouldn't
+        # notice.
+        open(os.path.join(self.top, 'a', 'new.cpp'), 'w').close()
+        self._age('a')
+        self.assertEqual(self._find(FindCache(self.cache_path)), expected)
+
+    def test_invalidate_dir(self):
+        cache = FindCache(self.cache_path)
+        self._find(cache)
+        cache.save()
+
+        open(os.path.join(self.top, 'a', 'new.cpp'), 'w').close()
+        os.utime(os.path.join(self.top, 'a'), (1000000001, 1000000001))
+        self.assertEqual(sorted(self._find(FindCache(self.cache_path))), [
+            posixpath.join(self.top, 'a', 'file.cpp'),
+            posixpath.join(self.top, 'a', 'new.cpp'),
+            posixpath.join(self.top, 'b', 'file.cpp'),
+        ])
+
+    def test_invalidate_key(self):
+        cache = FindCache(self.cache_path)
+        self._find(cache)
+        cache.save()
+
+        cache = FindCache(self.cache_path)
+        self.assertEqual(self._find(cache, '*.hpp', 'key2'), [])
+
+    def test_discard_old_version(self):
+        cache = FindCache(self.cache_path)
+        self._find(cache)
+        cache.save()
+
+        with open(self.cache_path) as f:
+            state = json.load(f)
+        state['version'] = FindCache.version - 1
+        with open(self.cache_path, 'w') as f:
+            json.dump(state, f)
+
+        open(os.path.join(self.top, 'a', 'new.cpp'), 'w').close()
+        self._age('a')
+        self.assertIn(posixpath.join(self.top, 'a', 'new.cpp'),
+                      self._find(FindCache(self.cache_path)))
+
+    def test_recent_dirs(self):
+        cache = FindCache(self.cache_path)
+        os.utime(os.path.join(self.top, 'a'), None)
+        self._find(cache)
+        cache.save()
+
+        open(os.path.join(self.top, 'a', 'new.cpp'), 'w').close()
+        self.assertIn(posixpath.join(self.top, 'a', 'new.cpp'),
+                      self._find(FindCache(self.cache_path)))
+
+    def test_no_key(self):
+        cache = FindCache(self.cache_path)
+        self._find(cache, key=None)
+        cache.save()
+        self.assertEqual(len(self._find(FindCache(self.cache_path), '*',
+                                        None)), 2)
+
+
+class TestFindDigest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.top = self.tmpdir.replace(os.sep, '/')
+        open(os.path.join(self.tmpdir, 'file.cpp'), 'w').close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _digest(self):
+        digest = hashlib.sha1()
+        f = _filter_from_glob('f', '*.cpp', None, None)
+        _find_files([self.top], f, False, False, digest=digest)
+        return digest.hexdigest()
+
+    def test_unrelated_change(self):
+        before = self._digest()
+        open(os.path.join(self.tmpdir, 'file.txt'), 'w').close()
+        self.assertEqual(self._digest(), before)
+
+    def test_new_match(self):
+        before = self._digest()
+        open(os.path.join(self.tmpdir, 'new.cpp'), 'w').close()
+        self.assertNotEqual(self._digest(), before)
+
+    def test_new_dir(self):
+        before = self._digest()
+        os.mkdir(os.path.join(self.tmpdir, 'sub'))
+        self.assertNotEqual(self._digest(), before)
@@ -0,0 +1,121 @@
+import os
+import shutil
+import tempfile
+import unittest
+from collections import namedtuple
+
+from bfg9000.builtins.link import (_forward_closure, _use_response_file,
+                                   _write_response_file)
+from bfg9000.file_types import ObjectFile, StaticLibrary, WholeArchive
+from bfg9000.path import Path
+
+MockEnv = namedtuple('MockEnv', ['base_dirs'])
+MockLinker = namedtuple('MockLinker', ['flavor'])
+
+
+def lib(name, libs=(), options=()):
+    result = StaticLibrary(Path(name), 'elf', 'c')
+    result.forward_opts = {'options': list(options), 'libs': list(libs),
+                           'packages': []}
+    return result
+
+
+class TestForwardClosure(unittest.TestCase):
+    def test_no_deps(self):
+        a = lib('a')
+        self.assertEqual(_forward_closure(a), ([a], []))
+
+    def test_chain(self):
+        c = lib('c')
+        b = lib('b', [c])
+        a = lib('a', [b])
+        self.assertEqual(_forward_closure(a), ([a, b, c], [b, c]))
+
+    def test_diamond(self):
+        d = lib('d')
+        b = lib('b', [d])
+        c = lib('c', [d])
+        a = lib('a', [b, c])
+        self.assertEqual(_forward_closure(a), ([a, b, d, c], [b, c, d]))
+
+    def test_link_order(self):
+        # `c` is used by `b`, so it has to come after `b`.
+        c = lib('c')
+        b = lib('b', [c])
+        a = lib('a', [c, b])
+        self.assertEqual(_forward_closure(a), ([a, c, b], [b, c]))
+
+    def test_whole_archive(self):
+        b = lib('b')
+        a = lib('a', [WholeArchive(b)])
+        self.assertEqual(_forward_closure(WholeArchive(a))[0], [a, b])
+
+    def test_deep(self):
+        # This used to take exponential time.
+        libs = [lib('lib0')]
+        for i in range(1, 50):
+            libs.append(lib('lib{}'.format(i), [libs[-1]] * 2))
+        self.assertEqual(_forward_closure(libs[-1])[0], libs[::-1])
+
+
+class TestWriteResponseFile(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.rspfile = os.path.join(self.tmpdir, 'sub', 'out.rsp')
+        self.files = [ObjectFile(Path('/foo bar/a.o'), 'elf', 'c'),
+                      ObjectFile(Path('/b.o'), 'elf', 'c')]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def read(self):
+        with open(self.rspfile) as f:
+            return f.read()
+
+    def test_posix(self):
+        _write_response_file(self.rspfile, MockLinker('cc'), self.files,
+                             MockEnv({}))
+        self.assertEqual(self.read(), "'/foo bar/a.o'\n/b.o\n")
+
+    def test_msvc(self):
+        _write_response_file(self.rspfile, MockLinker('msvc'), self.files,
+                             MockEnv({}))
+        self.assertEqual(self.read(), '"/foo bar/a.o"\n/b.o\n')
+
+
+class TestUseResponseFile(unittest.TestCase):
+    class MockRule(object):
+        def __init__(self, files, options=(), lib_options=()):
+            self.linker = namedtuple('Linker', ['accepts_response_file'])(True)
+            self.files = files
+            self.options = list(options)
+            self.lib_options = list(lib_options)
+
+    class MockEnv(object):
+        base_dirs = {}
+
+        def getvar(self, key, default=None):
+            return '20' if key == 'BFG9000_RSP_THRESHOLD' else default
+
+    def setUp(self):
+        self.files = [ObjectFile(Path('/a.o'), 'elf', 'c')]
+
+    def test_short(self):
+        rule = self.MockRule(self.files, ['-g'], ['-lfoo'])
+        self.assertFalse(_use_response_file(rule, self.MockEnv()))
+
+    def test_long_files(self):
+        files = [ObjectFile(Path('/{}.o'.format(i)), 'elf', 'c')
+                 for i in range(10)]
+        self.assertTrue(_use_response_file(self.MockRule(files),
+                                           self.MockEnv()))
+
+    def test_long_libs(self):
+        rule = self.MockRule(self.files, lib_options=[
+            '-l{}'.format(i) for i in range(10)
+        ])
+        self.assertTrue(_use_response_file(rule, self.MockEnv()))
+
+    def test_long_options(self):
+        rule = self.MockRule(self.files, [Path('/some/long/path/option')])
+        self.assertTrue(_use_response_file(rule, self.MockEnv()))
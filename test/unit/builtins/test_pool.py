@@ -0,0 +1,15 @@
+import unittest
+
+from bfg9000.builtins.pool import Pool
+
+
+class TestPool(unittest.TestCase):
+    def test_valid(self):
+        pool = Pool('link', 2)
+        self.assertEqual(pool.name, 'link')
+        self.assertEqual(pool.depth, 2)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, Pool, 'console', 1)
+        self.assertRaises(ValueError, Pool, 'bad name', 1)
+        self.assertRaises(ValueError, Pool, 'link', 0)
@@ -1,3 +1,6 @@
+import os
+import shutil
+import tempfile
 import unittest
 from six.moves import cStringIO as StringIO
 
@@ -41,6 +44,24 @@ class TestEmitDeps(unittest.TestCase):
         emit_deps(instream, outstream)
         self.assertEqual(outstream.getvalue(), 'c:\\baz:\nc:\\quux:\n')
 
+    def test_escaped_newlines(self):
+        instream = StringIO('foo: bar \\\n  baz\\\nquux\n')
+        outstream = StringIO()
+        emit_deps(instream, outstream)
+        self.assertEqual(outstream.getvalue(), 'bar:\nbazquux:\n')
+
+    def test_escaped_spaces(self):
+        instream = StringIO('foo: bar\\ baz\n')
+        outstream = StringIO()
+        emit_deps(instream, outstream)
+        self.assertEqual(outstream.getvalue(), 'bar\\ baz:\n')
+
+    def test_blank_lines(self):
+        instream = StringIO('foo: bar\n\nbar:\n')
+        outstream = StringIO()
+        emit_deps(instream, outstream)
+        self.assertEqual(outstream.getvalue(), 'bar:\n')
+
     def test_trailing_spaces(self):
         instream = StringIO('foo : bar \n')
         outstream = StringIO()
@@ -69,3 +90,27 @@ class TestEmitDeps(unittest.TestCase):
         instream = StringIO('foo: bar')
         outstream = StringIO()
         self.assertRaises(ParseError, emit_deps, instream, outstream)
+
+
+class TestFixDepfiles(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_fix_depfiles(self):
+        files = {'foo.d': 'foo.o: foo.c foo.h\n',
+                 'bar.d': 'bar.o: bar.c\n'}
+        paths = []
+        for name, data in files.items():
+            paths.append(os.path.join(self.tmpdir, name))
+            with open(paths[-1], 'w') as f:
+                f.write(data)
+
+        fix_depfiles(paths)
+        for name, data in files.items():
+            with open(os.path.join(self.tmpdir, name)) as f:
+                self.assertEqual(f.read(), data + fix_deps(data))
+        with open(os.path.join(self.tmpdir, 'foo.d')) as f:
+            self.assertEqual(f.read(), 'foo.o: foo.c foo.h\nfoo.c:\nfoo.h:\n')
@@ -0,0 +1,48 @@
+import unittest
+
+from bfg9000.file_types import *
+from bfg9000.path import Path
+
+
+def lib(name, runtime_deps=()):
+    result = SharedLibrary(Path(name), 'elf', 'c')
+    result.runtime_deps.extend(runtime_deps)
+    return result
+
+
+class TestRecursiveDeps(unittest.TestCase):
+    def test_no_deps(self):
+        self.assertEqual(recursive_deps(lib('a')), [])
+
+    def test_chain(self):
+        c = lib('c')
+        b = lib('b', [c])
+        a = lib('a', [b])
+        self.assertEqual(recursive_deps(a), [b, c])
+        self.assertEqual(recursive_deps(b), [c])
+
+    def test_diamond(self):
+        d = lib('d')
+        b = lib('b', [d])
+        c = lib('c', [d])
+        a = lib('a', [b, c])
+        self.assertEqual(recursive_deps(a), [b, d, c])
+
+    def test_multiple(self):
+        c = lib('c')
+        a = lib('a', [c])
+        b = lib('b', [c])
+        self.assertEqual(recursive_deps([a, b]), [c])
+
+    def test_deep(self):
+        # This used to take exponential time.
+        libs = [lib('lib0')]
+        for i in range(1, 50):
+            libs.append(lib('lib{}'.format(i), [libs[-1]] * 2))
+        self.assertEqual(recursive_deps(libs[-1]), libs[-2::-1])
+
+    def test_attr(self):
+        b = lib('b')
+        a = lib('a', [b])
+        a.linktime_deps.append(lib('c'))
+        self.assertEqual(recursive_deps(a, 'linktime_deps'), [lib('c')])
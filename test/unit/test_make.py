@@ -161,3 +161,54 @@ class TestMakeWriter(unittest.TestCase):
         out.write(path.Path('foo', path.Root.srcdir), Syntax.clean)
         self.assertEqual(out.stream.getvalue(),
                          os.path.join('$(srcdir)', 'foo'))
+
+    # each
+    def test_write_each(self):
+        out = Writer(StringIO())
+        out.write_each(['foo', path.Path('bar baz')], Syntax.dependency,
+                       prefix=safe_str.literal(' | '))
+        self.assertEqual(out.stream.getvalue(), ' | foo bar\\ baz')
+
+    def test_write_each_empty(self):
+        out = Writer(StringIO())
+        out.write_each([], Syntax.dependency, prefix=safe_str.literal(' | '))
+        self.assertEqual(out.stream.getvalue(), '')
+
+    # shell
+    def test_write_shell_silent(self):
+        out = Writer(StringIO())
+        out.write_shell(Silent(['echo', 'foo bar']))
+        self.assertEqual(out.stream.getvalue(), '@echo ' + quoted('foo bar'))
+
+
+class TestFunction(unittest.TestCase):
+    def test_use(self):
+        fn = Function('fn', ['foo', 'bar baz'], path.Path('qux'))
+        self.assertEqual(fn.use(), safe_str.literal(
+            '$(fn foo ' + quoted('bar baz') + ',' + os.path.join('.', 'qux') +
+            ')'
+        ))
+
+    def test_use_quoted(self):
+        fn = Function('fn', 'foo,bar', quoted=True)
+        self.assertEqual(fn.use(), safe_str.literal(quoted('$(fn foo$,bar)')))
+
+    def test_use_no_args(self):
+        self.assertEqual(Function('fn').use(), safe_str.literal(''))
+        self.assertEqual(Function('fn', quoted=True).use(),
+                         safe_str.literal(quoted('')))
+
+    def test_call(self):
+        self.assertEqual(Call('func', 'foo').use(),
+                         safe_str.literal('$(call func,foo)'))
+
+
+class TestMakefile(unittest.TestCase):
+    def test_target_variables(self):
+        makefile = Makefile('build.bfg')
+        makefile.rule(target=[path.Path('foo'), path.Path('bar')],
+                      variables={'VAR': 'value'})
+        out = StringIO()
+        makefile.write(out)
+        self.assertIn('foo: VAR := value\nbar: VAR := value\nfoo bar:\n\n',
+                      out.getvalue())
@@ -131,3 +131,87 @@ class TestNinjaWriter(unittest.TestCase):
         out.write(path.Path('foo', path.Root.srcdir), Syntax.clean)
         self.assertEqual(out.stream.getvalue(),
                          os.path.join('${srcdir}', 'foo'))
+
+    def test_write_path_repeated(self):
+        p = path.Path('foo bar', path.Root.srcdir)
+        out = Writer(StringIO())
+        out.write(p, Syntax.output)
+        out.write(p, Syntax.shell)
+        out.write(p, Syntax.output)
+        expected = os.path.join('${srcdir}', 'foo$ bar')
+        self.assertEqual(out.stream.getvalue(), expected +
+                         quoted(os.path.join('${srcdir}', 'foo bar')) +
+                         expected)
+
+    # each
+    def test_write_each(self):
+        out = Writer(StringIO())
+        out.write_each(['foo', path.Path('bar: baz')], Syntax.output,
+                       prefix=safe_str.literal(' | '))
+        self.assertEqual(out.stream.getvalue(), ' | foo bar$:$ baz')
+
+    def test_write_each_empty(self):
+        out = Writer(StringIO())
+        out.write_each([], Syntax.output, prefix=safe_str.literal(' | '))
+        self.assertEqual(out.stream.getvalue(), '')
+
+    def test_write_newline(self):
+        out = Writer(StringIO())
+        self.assertRaises(ValueError, out.write, 'foo\nbar', Syntax.output)
+
+
+class TestNinjaFile(unittest.TestCase):
+    def test_pool(self):
+        f = NinjaFile('build.bfg')
+        f.pool('link', 2)
+        f.rule('cmd', [['touch', var('out')]], pool='link')
+        f.build('foo', 'cmd', pool='link')
+
+        out = StringIO()
+        f.write(out)
+        self.assertIn('ninja_required_version = 1.1\n', out.getvalue())
+        self.assertIn('pool link\n  depth = 2\n\n', out.getvalue())
+        self.assertIn('rule cmd\n  command = touch ${out}\n  pool = link\n',
+                      out.getvalue())
+        self.assertIn('build foo: cmd\n  pool = link\n', out.getvalue())
+
+    def test_console_pool(self):
+        f = NinjaFile('build.bfg')
+        f.rule('cmd', [['touch', var('out')]])
+        f.build('foo', 'cmd', pool='console')
+
+        out = StringIO()
+        f.write(out)
+        self.assertIn('ninja_required_version = 1.5\n', out.getvalue())
+        self.assertIn('build foo: cmd\n  pool = console\n', out.getvalue())
+
+    def test_duplicate_pool(self):
+        f = NinjaFile('build.bfg')
+        f.pool('link', 2)
+        f.pool('link', 2)
+        self.assertRaises(ValueError, f.pool, 'link', 3)
+
+    def test_unknown_pool(self):
+        f = NinjaFile('build.bfg')
+        self.assertRaises(ValueError, f.rule, 'cmd', [['touch', var('out')]],
+                          pool='link')
+        f.rule('cmd', [['touch', var('out')]])
+        self.assertRaises(ValueError, f.build, 'foo', 'cmd', pool='link')
+
+    def test_rspfile(self):
+        f = NinjaFile('build.bfg')
+        f.rule('cmd', [['link', '@' + var('out') + '.rsp']],
+               rspfile=var('out') + '.rsp', rspfile_content=var('in'))
+
+        out = StringIO()
+        f.write(out)
+        self.assertIn('rule cmd\n  command = link @${out}.rsp\n' +
+                      '  rspfile = ${out}.rsp\n  rspfile_content = ${in}\n',
+                      out.getvalue())
+
+    def test_partial_rspfile(self):
+        f = NinjaFile('build.bfg')
+        self.assertRaises(ValueError, f.rule, 'cmd', [['link']],
+                          rspfile=var('out') + '.rsp')
+        self.assertRaises(ValueError, f.rule, 'cmd', [['link']],
+                          rspfile_content=var('in'))
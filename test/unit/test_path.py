@@ -1,5 +1,11 @@
+import copy
+import gc
 import os
+import pickle
+import shutil
+import tempfile
 import unittest
+import weakref
 
 from bfg9000.path import *
 from bfg9000.platforms import platform_name
@@ -86,12 +92,49 @@ class TestPath(unittest.TestCase):
     def test_install_path_srcdir(self):
         p = Path('foo/bar', Root.srcdir)
         self.assertEqual(install_path(p, InstallRoot.bindir),
-                         Path('bar', InstallRoot.bindir))
+                         Path('bar', InstallRoot.bindir, True))
 
     def test_install_path_builddir(self):
         p = Path('foo/bar', Root.builddir)
         self.assertEqual(install_path(p, InstallRoot.bindir),
-                         Path('foo/bar', InstallRoot.bindir))
+                         Path('foo/bar', InstallRoot.bindir, True))
+
+    def test_interned(self):
+        self.assertIs(Path('foo/bar', Root.srcdir),
+                      Path('foo/./bar', Root.srcdir))
+        self.assertIsNot(Path('foo', Root.srcdir), Path('foo', Root.builddir))
+
+    def test_hash(self):
+        self.assertEqual(len({Path('foo', Root.srcdir),
+                              Path('foo', Root.builddir),
+                              Path('foo', InstallRoot.bindir),
+                              Path('foo', InstallRoot.bindir, True)}), 4)
+
+    def test_immutable(self):
+        p = Path('foo', Root.srcdir)
+        with self.assertRaises(AttributeError):
+            p.suffix = 'bar'
+
+    def test_copy(self):
+        p = Path('foo', InstallRoot.bindir, True)
+        self.assertIs(copy.copy(p), p)
+        self.assertIs(copy.deepcopy(p), p)
+        self.assertIs(pickle.loads(pickle.dumps(p)), p)
+
+    def test_realizer(self):
+        realize = realizer(path_variables)
+        p = Path('foo', Root.srcdir)
+        self.assertEqual(realize(p), os.path.join('$(srcdir)', 'foo'))
+        self.assertIs(realize(p), realize(p))
+
+    def test_realizer_weak(self):
+        realize = realizer(path_variables)
+        p = Path('realizer_weak', Root.srcdir)
+        realize(p)
+        ref = weakref.ref(p)
+        del p
+        gc.collect()
+        self.assertIsNone(ref())
 
 
 class TestCommonPrefix(unittest.TestCase):
@@ -120,3 +163,38 @@ class TestCommonPrefix(unittest.TestCase):
         p = Path('foo/bar')
         q = Path('baz/quux')
         self.assertEqual(commonprefix([p, q]), Path(''))
+
+
+class TestWriteIfChanged(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'file')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, data):
+        with write_if_changed(self.filename) as out:
+            out.write(data)
+
+    def _read(self):
+        with open(self.filename) as inp:
+            return inp.read()
+
+    def test_new(self):
+        self._write('foo')
+        self.assertEqual(self._read(), 'foo')
+
+    def test_unchanged(self):
+        self._write('foo')
+        os.utime(self.filename, (1000000000, 1000000000))
+        self._write('foo')
+        self.assertEqual(os.stat(self.filename).st_mtime, 1000000000)
+
+    def test_changed(self):
+        self._write('foo')
+        os.utime(self.filename, (1000000000, 1000000000))
+        self._write('bar')
+        self.assertEqual(self._read(), 'bar')
+        self.assertNotEqual(os.stat(self.filename).st_mtime, 1000000000)
+        self.assertEqual(os.listdir(self.tmpdir), ['file'])
@@ -0,0 +1,83 @@
+import importlib
+import unittest
+
+from bfg9000 import plugins
+from bfg9000.plugins import *
+
+
+class TestEntryPoint(unittest.TestCase):
+    def test_module(self):
+        ep = EntryPoint('make', 'bfg9000.backends.make.writer')
+        self.assertEqual(ep.module, 'bfg9000.backends.make.writer')
+        self.assertEqual(ep.attrs, [])
+        self.assertEqual(ep.extras, [])
+
+        from bfg9000.backends.make import writer
+        self.assertIs(ep.load(), writer)
+
+    def test_attr(self):
+        ep = EntryPoint('posix', 'bfg9000.platforms.posix:PosixPlatform')
+        self.assertEqual(ep.module, 'bfg9000.platforms.posix')
+        self.assertEqual(ep.attrs, ['PosixPlatform'])
+        self.assertEqual(ep.extras, [])
+
+        from bfg9000.platforms.posix import PosixPlatform
+        self.assertIs(ep.load(), PosixPlatform)
+
+    def test_extras(self):
+        ep = EntryPoint('foo', 'foo.bar:baz.quux [extra1, extra2]')
+        self.assertEqual(ep.module, 'foo.bar')
+        self.assertEqual(ep.attrs, ['baz', 'quux'])
+        self.assertEqual(ep.extras, ['extra1', 'extra2'])
+
+    def test_missing_extra(self):
+        ep = EntryPoint('make', 'bfg9000.backends.make.writer [extra]')
+        old = plugins.extra_modules
+        try:
+            plugins.extra_modules = {'extra': ['nonexistent_module']}
+            self.assertRaises(ImportError, ep.load)
+        finally:
+            plugins.extra_modules = old
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, EntryPoint, 'foo', 'foo bar')
+
+
+class TestGetEntryPoint(unittest.TestCase):
+    def test_builtin(self):
+        ep = get_entry_point('bfg9000.backends', 'make')
+        self.assertEqual(ep.name, 'make')
+        self.assertEqual(ep.module, 'bfg9000.backends.make.writer')
+
+    def test_nonexistent(self):
+        self.assertEqual(get_entry_point('bfg9000.backends', 'nonexist'),
+                         None)
+
+    def test_list(self):
+        names = [i.name for i in list_entry_points('bfg9000.backends')]
+        self.assertEqual(names[0:3], ['ninja', 'make', 'msbuild'])
+
+
+class TestBuiltinEntryPoints(unittest.TestCase):
+    def test_matches_setup(self):
+        # Make sure our copy of the entry points stays in sync with setup.py.
+        try:
+            import pkg_resources
+            entry_map = pkg_resources.get_entry_map('bfg9000')
+        except Exception:
+            raise unittest.SkipTest('bfg9000 is not installed')
+
+        for group, entries in builtin_entry_points.items():
+            self.assertEqual(
+                {k: EntryPoint(k, v).module for k, v in entries.items()},
+                {k: v.module_name for k, v in entry_map[group].items()}
+            )
+
+    def test_backend_priority(self):
+        # `default_backend()` relies on our backends being listed in order of
+        # priority.
+        priorities = [
+            importlib.import_module(EntryPoint(k, v).module).priority
+            for k, v in builtin_entry_points['bfg9000.backends'].items()
+        ]
+        self.assertEqual(priorities, sorted(priorities, reverse=True))
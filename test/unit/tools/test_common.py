@@ -0,0 +1,65 @@
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from bfg9000.tools.common import compiler_launcher
+
+
+class MockEnvironment(object):
+    def __init__(self, variables, compiler_launcher=None):
+        self.variables = variables
+        self.compiler_launcher = compiler_launcher
+
+    def getvar(self, key, default=None):
+        return self.variables.get(key, default)
+
+
+class TestCompilerLauncher(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def make_exe(self, name):
+        filename = os.path.join(self.tmpdir, name)
+        with open(filename, 'w') as f:
+            f.write('#!/bin/sh\n')
+        os.chmod(filename, os.stat(filename).st_mode | stat.S_IEXEC)
+
+    def test_none(self):
+        env = MockEnvironment({'PATH': self.tmpdir})
+        self.assertEqual(compiler_launcher(env, 'c++', 'cxx'), None)
+
+    def test_option(self):
+        self.make_exe('ccache')
+        env = MockEnvironment({'PATH': self.tmpdir}, 'ccache')
+        launcher = compiler_launcher(env, 'c++', 'cxx')
+        self.assertEqual(launcher.command, ['ccache'])
+        self.assertEqual(launcher.command_var, 'cxx_launcher')
+
+    def test_env_var(self):
+        self.make_exe('ccache')
+        self.make_exe('sccache')
+        env = MockEnvironment({'PATH': self.tmpdir, 'CC_LAUNCHER': 'sccache'},
+                              'ccache')
+        self.assertEqual(compiler_launcher(env, 'c', 'cc').command,
+                         ['sccache'])
+        self.assertEqual(compiler_launcher(env, 'c++', 'cxx').command,
+                         ['ccache'])
+
+    @unittest.skipIf(os.name == 'nt', 'requires POSIX')
+    def test_auto(self):
+        env = MockEnvironment({'PATH': self.tmpdir}, 'auto')
+        self.assertEqual(compiler_launcher(env, 'c++', 'cxx'), None)
+
+        self.make_exe('sccache')
+        self.assertEqual(compiler_launcher(env, 'c++', 'cxx').command,
+                         ['sccache'])
+
+    def test_unsupported_lang(self):
+        self.make_exe('ccache')
+        env = MockEnvironment({'PATH': self.tmpdir}, 'ccache')
+        self.assertEqual(compiler_launcher(env, 'f95', 'fc'), None)
@@ -0,0 +1,224 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from bfg9000 import shell
+from bfg9000.exceptions import PackageResolutionError, PackageVersionError
+from bfg9000.tools.pkg_config import _rpmvercmp, PcFile, PcResolver
+
+
+class MockPlatform(object):
+    lib_dirs = []
+
+
+class MockProbeCache(object):
+    def __init__(self, output=None):
+        self.output = output
+        self.calls = []
+
+    def execute(self, args, **kwargs):
+        self.calls.append(args)
+        if self.output is None:
+            raise shell.CalledProcessError(1, args)
+        return self.output
+
+
+class MockEnvironment(object):
+    def __init__(self, variables, probe_output=None):
+        self.variables = variables
+        self.platform = MockPlatform()
+        self.probe_cache = MockProbeCache(probe_output)
+
+    def getvar(self, key, default=None):
+        return self.variables.get(key, default)
+
+
+class PcTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write_pc(self, name, data):
+        path = os.path.join(self.tmpdir, name + '.pc')
+        with open(path, 'w') as f:
+            f.write(data)
+        return path
+
+
+class TestRpmVerCmp(unittest.TestCase):
+    def assertOrder(self, *versions):
+        for a, b in zip(versions, versions[1:]):
+            self.assertLess(_rpmvercmp(a, b), 0, (a, b))
+            self.assertGreater(_rpmvercmp(b, a), 0, (b, a))
+
+    def test_equal(self):
+        for i in ('1.0', '1.2.3a', '2.0~rc1', '1.0-git20200101'):
+            self.assertEqual(_rpmvercmp(i, i), 0)
+        self.assertEqual(_rpmvercmp('1.01', '1.1'), 0)
+        self.assertEqual(_rpmvercmp('1.0.', '1.0-'), 0)
+
+    def test_numeric(self):
+        self.assertOrder('1', '1.0', '1.0.0', '1.2', '1.10', '2')
+
+    def test_alpha(self):
+        # Unlike PEP 440, letters aren't pre-releases; they're just compared
+        # as their own segments, which sort before numeric ones.
+        self.assertOrder('1.0', '1.0a', '1.0b', '1.0.1')
+        self.assertOrder('1.2.3', '1.2.3a')
+        self.assertOrder('2.0', '2.0~rc1')
+        self.assertOrder('1.0', '1.0-git20200101', '1.0.1')
+
+    def test_trailing(self):
+        self.assertOrder('1.0', '1.0.')
+
+
+class TestPcFile(PcTestCase):
+    def test_parse(self):
+        path = self.write_pc('foo', (
+            '# comment\n'
+            'prefix=/opt/foo\n'
+            'includedir=${prefix}/include # trailing comment\n'
+            '\n'
+            'Name: foo\n'
+            'Version: 1.2.3\n'
+            'Requires: bar >= 1.0, baz\n'
+            'Requires.private: quux\n'
+            'CFlags: -I${includedir} \\\n'
+            '  -DFOO=$$x\n'
+            'Libs: -L${prefix}/lib -lfoo\n'
+        ))
+        pc = PcFile('foo', path)
+        self.assertEqual(pc.variables['pcfiledir'], self.tmpdir)
+        self.assertEqual(pc.variables['includedir'], '/opt/foo/include')
+        self.assertEqual(pc.version, '1.2.3')
+        self.assertEqual(pc.flags('Cflags'),
+                         ['-I/opt/foo/include', '-DFOO=$x'])
+        self.assertEqual(pc.flags('Libs'), ['-L/opt/foo/lib', '-lfoo'])
+        self.assertEqual(pc.flags('Libs.private'), [])
+        self.assertEqual(list(pc.requires()),
+                         [('bar', '>=', '1.0'), ('baz', '', '')])
+        self.assertEqual(list(pc.requires(True)),
+                         [('bar', '>=', '1.0'), ('baz', '', ''),
+                          ('quux', '', '')])
+
+    def test_undefined_variable(self):
+        path = self.write_pc('foo', 'Libs: -L${libdir}\n')
+        self.assertRaises(ValueError, PcFile, 'foo', path)
+
+    def test_no_version(self):
+        path = self.write_pc('foo', 'Libs: -lfoo\n')
+        with self.assertRaises(ValueError):
+            PcFile('foo', path).version
+
+
+class TestPcResolver(PcTestCase):
+    def setUp(self):
+        PcTestCase.setUp(self)
+        self.write_pc('foo', (
+            'Version: 1.0\n'
+            'Requires: bar >= 2.0\n'
+            'Requires.private: baz\n'
+            'Cflags: -I/opt/foo/include -I/usr/include -pthread\n'
+            'Libs: -L/opt/foo/lib -L/usr/lib -lfoo\n'
+            'Libs.private: -lm\n'
+        ))
+        self.write_pc('bar', (
+            'Version: 2.1\n'
+            'Cflags: -I/opt/bar/include -pthread\n'
+            'Libs: -L/opt/foo/lib -lbar\n'
+        ))
+        self.write_pc('baz', (
+            'Version: 0.1\n'
+            'Requires: bar\n'
+            'Cflags: -DBAZ\n'
+            'Libs: -lbaz\n'
+        ))
+
+    def make_resolver(self, **kwargs):
+        variables = {'PKG_CONFIG_LIBDIR': self.tmpdir}
+        variables.update(kwargs)
+        return PcResolver(MockEnvironment(variables))
+
+    def test_search_dirs(self):
+        env = MockEnvironment({'PKG_CONFIG_PATH': os.pathsep.join(['a', 'b']),
+                               'PKG_CONFIG_LIBDIR': 'c'})
+        self.assertEqual(PcResolver(env).search_dirs, ['a', 'b', 'c'])
+
+    def test_default_search_dirs(self):
+        env = MockEnvironment({'PKG_CONFIG_PATH': 'a'},
+                              os.pathsep.join(['/lib64/pkgconfig', 'b']))
+        self.assertEqual(PcResolver(env, ['pkg-config']).search_dirs,
+                         ['a', '/lib64/pkgconfig', 'b'])
+        self.assertEqual(env.probe_cache.calls, [
+            ['pkg-config', '--variable', 'pc_path', 'pkg-config'],
+        ])
+
+    def test_fallback_search_dirs(self):
+        class Resolver(PcResolver):
+            @staticmethod
+            def _multiarch():
+                return None
+
+        env = MockEnvironment({})
+        env.platform.lib_dirs = ['/usr/lib', '/lib']
+        self.assertEqual(Resolver(env, ['pkg-config']).search_dirs, [
+            '/usr/lib/pkgconfig', '/usr/share/pkgconfig', '/lib/pkgconfig',
+        ])
+
+    def test_version(self):
+        self.assertEqual(self.make_resolver().query('foo', 'version'), '1.0')
+
+    def test_cflags(self):
+        self.assertEqual(self.make_resolver().query('foo', 'cflags'), [
+            '-I/opt/foo/include', '-pthread', '-DBAZ', '-I/opt/bar/include',
+            '-pthread',
+        ])
+
+    def test_system_cflags(self):
+        r = self.make_resolver(PKG_CONFIG_ALLOW_SYSTEM_CFLAGS='1')
+        self.assertEqual(r.query('bar', 'cflags'),
+                         ['-I/opt/bar/include', '-pthread'])
+        self.assertEqual(r.query('foo', 'cflags')[:2],
+                         ['-I/opt/foo/include', '-I/usr/include'])
+
+    def test_ldflags(self):
+        r = self.make_resolver()
+        self.assertEqual(r.query('foo', 'ldflags'), ['-L/opt/foo/lib'])
+        self.assertEqual(r.query('foo', 'lib_dirs'), ['-L/opt/foo/lib'])
+        self.assertEqual(r.query('foo', 'lib_dirs',
+                                 env={'PKG_CONFIG_ALLOW_SYSTEM_LIBS': '1'}),
+                         ['-L/opt/foo/lib', '-L/usr/lib'])
+
+    def test_ldlibs(self):
+        r = self.make_resolver()
+        self.assertEqual(r.query('foo', 'ldlibs'), ['-lfoo', '-lbar'])
+        self.assertEqual(r.query('foo', 'ldlibs', static=True),
+                         ['-lfoo', '-lm', '-lbaz', '-lbar'])
+
+    def test_version_mismatch(self):
+        self.write_pc('bar', 'Version: 1.0\nLibs: -lbar\n')
+        self.assertRaises(PackageVersionError, self.make_resolver().query,
+                          'foo', 'ldlibs')
+
+    def test_rpm_version(self):
+        self.write_pc('bar', 'Version: 2.0~rc1\nLibs: -lbar\n')
+        self.assertEqual(self.make_resolver().query('foo', 'ldlibs'),
+                         ['-lfoo', '-lbar'])
+        self.write_pc('foo', 'Version: 1.0\nRequires: bar >= 2.0rc2\n')
+        self.assertRaises(PackageVersionError, self.make_resolver().query,
+                          'foo', 'ldlibs')
+
+    def test_not_found(self):
+        self.assertRaises(PackageResolutionError, self.make_resolver().query,
+                          'nonexist', 'version')
+
+    def test_unsupported(self):
+        self.write_pc('foo-uninstalled', 'Version: 1.0\n')
+        self.assertRaises(ValueError, self.make_resolver().query, 'foo',
+                          'version')
+        self.assertRaises(ValueError, self.make_resolver(
+            PKG_CONFIG_SYSROOT_DIR='/sysroot'
+        ).query, 'bar', 'cflags')
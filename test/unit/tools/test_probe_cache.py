@@ -0,0 +1,138 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from bfg9000 import shell
+from bfg9000.tools.probe_cache import ProbeCache
+
+python = [os.path.abspath(sys.executable)]
+
+
+class TestProbeCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'cache')
+        self.user_path = os.path.join(self.tmpdir, 'user_cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _overwrite(self, path, output):
+        with open(path) as f:
+            state = json.load(f)
+        for v in state['data'].values():
+            v['output'] = output
+        with open(path, 'w') as f:
+            json.dump(state, f)
+
+    def test_execute(self):
+        cache = ProbeCache()
+        self.assertEqual(cache.execute(python + ['-c', 'print("hi")']),
+                         'hi\n')
+
+    def test_execute_pipes(self):
+        cache = ProbeCache()
+        args = python + ['-c', 'import sys; sys.stderr.write("err")']
+        self.assertEqual(cache.execute(args, stderr=shell.Mode.pipe),
+                         ('', 'err'))
+        self.assertEqual(cache.execute(args, stderr=shell.Mode.pipe),
+                         ('', 'err'))
+
+    def test_execute_error(self):
+        cache = ProbeCache()
+        args = python + ['-c', 'import sys; sys.exit(1)']
+        self.assertRaises(shell.CalledProcessError, cache.execute, args)
+        self.assertRaises(shell.CalledProcessError, cache.execute, args)
+
+    def test_error_not_cached(self):
+        # Fail until the marker file exists, like a probe for a tool that
+        # hasn't been installed yet.
+        marker = os.path.join(self.tmpdir, 'marker')
+        args = python + ['-c', 'import os, sys; sys.exit(not os.path.exists' +
+                         '({!r}))'.format(marker)]
+        cache = ProbeCache(self.path)
+        self.assertRaises(shell.CalledProcessError, cache.execute, args)
+        cache.save()
+
+        open(marker, 'w').close()
+        self.assertEqual(ProbeCache(self.path).execute(args), '')
+
+    def test_capture_mode(self):
+        cache = ProbeCache()
+        args = python + ['-c', 'import sys; sys.stderr.write("err")']
+        self.assertEqual(cache.execute(args, stderr=shell.Mode.pipe),
+                         ('', 'err'))
+        self.assertEqual(cache.execute(args, stderr=shell.Mode.devnull), '')
+
+    def test_key_args(self):
+        cache = ProbeCache()
+        key_args = python + ['-c', 'key']
+        self.assertEqual(cache.execute(python + ['-c', 'print("hi")'],
+                                       key_args=key_args), 'hi\n')
+        self.assertEqual(cache.execute(python + ['-c', 'print("bye")'],
+                                       key_args=key_args), 'hi\n')
+
+    def test_missing_executable(self):
+        cache = ProbeCache()
+        self.assertRaises(OSError, cache.execute,
+                          [os.path.join(self.tmpdir, 'nonexist')])
+
+    def test_persist(self):
+        args = python + ['-c', 'print("hi")']
+        cache = ProbeCache(self.path)
+        cache.execute(args)
+        cache.save()
+
+        self._overwrite(self.path, 'cached\n')
+        self.assertEqual(ProbeCache(self.path).execute(args), 'cached\n')
+
+    def test_persist_user(self):
+        args = python + ['-c', 'print("hi")']
+        cache = ProbeCache(self.path, self.user_path)
+        cache.execute(args)
+        cache.save()
+
+        self._overwrite(self.user_path, 'cached\n')
+        os.remove(self.path)
+        self.assertEqual(ProbeCache(self.path, self.user_path).execute(args),
+                         'cached\n')
+
+    def test_invalidate_env(self):
+        args = python + ['-c', 'print("hi")']
+        env = dict(os.environ)
+        cache = ProbeCache(self.path)
+        cache.execute(args, env=env)
+        cache.save()
+
+        self._overwrite(self.path, 'cached\n')
+        env['CFLAGS'] = '-O2'
+        self.assertEqual(ProbeCache(self.path).execute(args, env=env), 'hi\n')
+
+    def test_discard_old_version(self):
+        args = python + ['-c', 'print("hi")']
+        cache = ProbeCache(self.path)
+        cache.execute(args)
+        cache.save()
+
+        self._overwrite(self.path, 'cached\n')
+        with open(self.path) as f:
+            state = json.load(f)
+        state['version'] = ProbeCache.version - 1
+        with open(self.path, 'w') as f:
+            json.dump(state, f)
+        self.assertEqual(ProbeCache(self.path).execute(args), 'hi\n')
+
+    def test_prune_unseen(self):
+        cache = ProbeCache(self.path)
+        cache.execute(python + ['-c', 'print("foo")'])
+        cache.save()
+
+        cache = ProbeCache(self.path)
+        cache.execute(python + ['-c', 'print("bar")'])
+        cache.save()
+
+        with open(self.path) as f:
+            self.assertEqual(len(json.load(f)['data']), 1)